@@ -0,0 +1,41 @@
+# Generated by Django 4.2.3 on 2026-10-19 17:15
+
+from django.db import migrations, models
+
+
+def mark_existing_bookings_not_canceled(apps, schema_editor):
+    # Every booking used to be created with not_canceled=False and cancelling
+    # wrote the same value, so no existing row was really cancelled.
+    Booking = apps.get_model("bookings", "Booking")
+    Booking.objects.update(not_canceled=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bookings", "0003_booking_not_canceled"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="booking",
+            name="not_canceled",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.RunPython(
+            mark_existing_bookings_not_canceled,
+            migrations.RunPython.noop,
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["user", "check_in"], name="bookings_bo_user_id_d582ae_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["user", "experience_time"],
+                name="bookings_bo_user_id_a96e58_idx",
+            ),
+        ),
+    ]
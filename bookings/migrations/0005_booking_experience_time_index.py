@@ -0,0 +1,19 @@
+# Generated by Django 4.2.3 on 2026-10-19 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("bookings", "0004_booking_indexes_not_canceled_default"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="booking",
+            index=models.Index(
+                fields=["experience", "experience_time", "id"],
+                name="bookings_bo_experie_2407d8_idx",
+            ),
+        ),
+    ]
@@ -46,7 +46,14 @@ class Booking(CommonModel):
         blank=True,
     )
     guests = models.PositiveIntegerField()
-    not_canceled = models.BooleanField(default=False)
+    not_canceled = models.BooleanField(default=True)
 
     def __str__(self) -> str:
         return f"{self.kind.title()} booking for: {self.user}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "check_in"]),
+            models.Index(fields=["user", "experience_time"]),
+            models.Index(fields=["experience", "experience_time", "id"]),
+        ]
@@ -6,6 +6,7 @@ from .models import Booking
 
 from users.serializers import TinyUserSerializer
 from rooms.serializers import TinyRoomSerializer
+from experiences.serializers import TinyExperienceSerializer
 
 
 # Serializer for creating room's bookings
@@ -87,6 +88,7 @@ class PublicBookingSerializer(serializers.ModelSerializer):
 class CheckMyBookingSerializer(serializers.ModelSerializer):
     user = TinyUserSerializer()
     room = TinyRoomSerializer()
+    experience = TinyExperienceSerializer()
 
     class Meta:
         model = Booking
@@ -94,9 +96,11 @@ class CheckMyBookingSerializer(serializers.ModelSerializer):
             "user",
             "id",
             "room",
+            "experience",
             "kind",
             "check_in",
             "check_out",
+            "experience_time",
             "guests",
             "not_canceled",
         )
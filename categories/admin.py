@@ -8,5 +8,7 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display = (
         "name",
         "kind",
+        "room_count",
+        "experience_count",
     )
     list_filter = ("kind",)
@@ -0,0 +1,68 @@
+"""
+How many rooms and experiences each category has, stored on Category.
+
+The signals in categories/signals.py move the counters by one when a room
+or experience is created, deleted or moved to another category.
+QuerySet.update() doesn't send signals, so set-based changes call
+recount() for the categories they touched. The reconcile_category_counts
+command recounts every category.
+
+They're served by /categories/counts, not the cached category lists, so
+a new listing doesn't change the version of common/reference.py.
+"""
+
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from experiences.models import Experience
+from rooms.models import Room
+from .models import Category
+
+FIELDS = {
+    Room: "room_count",
+    Experience: "experience_count",
+}
+
+
+def adjust(model, category_pk, delta):
+    if category_pk is None:
+        return
+    field = FIELDS[model]
+    Category.objects.filter(pk=category_pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+def exact_counts():
+    counts = {}
+    for model, field in FIELDS.items():
+        count = (
+            model.objects.filter(category=OuterRef("pk"))
+            .order_by()
+            .values("category")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        counts[field] = Coalesce(Subquery(count), 0)
+    return counts
+
+
+def recount(category_pks=None):
+    """
+    Count again, in one UPDATE, for these categories or all of them.
+    Returns how many categories had wrong counters.
+    """
+    categories = Category.objects.all()
+    if category_pks is not None:
+        categories = categories.filter(pk__in=category_pks)
+    counts = exact_counts()
+    wrong = categories.annotate(
+        **{f"exact_{field}": count for field, count in counts.items()}
+    ).filter(
+        ~Q(room_count=F("exact_room_count"))
+        | ~Q(experience_count=F("exact_experience_count"))
+    )
+    fixed = list(wrong.values_list("pk", flat=True))
+    if fixed:
+        Category.objects.filter(pk__in=fixed).update(**counts)
+    return len(fixed)
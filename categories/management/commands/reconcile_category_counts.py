@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from categories import counters
+
+
+class Command(BaseCommand):
+    help = (
+        "Count the rooms and experiences of every category again and fix "
+        "the stored counters that drifted (e.g. after loaddata or raw SQL)."
+    )
+
+    def handle(self, *args, **options):
+        fixed = counters.recount()
+        self.stdout.write(self.style.SUCCESS(f"{fixed} categories fixed"))
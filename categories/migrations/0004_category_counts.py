@@ -0,0 +1,43 @@
+# Generated by Django 4.2.3 on 2026-10-19 17:48
+
+from django.db import migrations, models
+
+
+def count_listings(apps, schema_editor):
+    Category = apps.get_model("categories", "Category")
+    counts = {}
+    for field, model in (
+        ("room_count", apps.get_model("rooms", "Room")),
+        ("experience_count", apps.get_model("experiences", "Experience")),
+    ):
+        count = (
+            model.objects.filter(category=models.OuterRef("pk"))
+            .order_by()
+            .values("category")
+            .annotate(count=models.Count("pk"))
+            .values("count")
+        )
+        counts[field] = models.functions.Coalesce(models.Subquery(count), 0)
+    Category.objects.update(**counts)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("categories", "0003_alter_category_options"),
+        ("rooms", "0007_room_cover_photo"),
+        ("experiences", "0005_experience_cover_photo"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="experience_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="category",
+            name="room_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_listings, migrations.RunPython.noop),
+    ]
@@ -17,6 +17,9 @@ class Category(CommonModel):
         max_length=15,
         choices=CategoryKindChoices.choices,
     )
+    # kept up to date by categories.signals (see categories/counters.py)
+    room_count = models.PositiveIntegerField(default=0, editable=False)
+    experience_count = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self) -> str:
         return f"{self.kind.title()}: {self.name}"
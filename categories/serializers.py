@@ -10,3 +10,13 @@ class CategorySerializer(serializers.ModelSerializer):
             "name",
             "kind",
         )
+
+
+class CategoryCountSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Category
+        fields = (
+            "pk",
+            "room_count",
+            "experience_count",
+        )
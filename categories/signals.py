@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters
+from experiences.models import Experience
+from rooms.models import Room
+
+
+@receiver(pre_save, sender=Room)
+@receiver(pre_save, sender=Experience)
+def remember_category(sender, instance, raw, update_fields, **kwargs):
+    # fixtures: run manage.py reconcile_category_counts after loading them
+    if raw or (update_fields is not None and "category" not in update_fields):
+        return
+    if instance._state.adding:
+        instance._counted_category_id = None
+    else:
+        instance._counted_category_id = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("category_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_save, sender=Experience)
+def category_changed(sender, instance, created, **kwargs):
+    if not hasattr(instance, "_counted_category_id"):
+        return
+    previous = instance._counted_category_id
+    del instance._counted_category_id
+    if created or previous != instance.category_id:
+        counters.adjust(sender, previous, -1)
+        counters.adjust(sender, instance.category_id, 1)
+
+
+@receiver(post_delete, sender=Room)
+@receiver(post_delete, sender=Experience)
+def listing_deleted(sender, instance, **kwargs):
+    counters.adjust(sender, instance.category_id, -1)
@@ -1,3 +1,226 @@
-from django.test import TestCase
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+
+from rest_framework.test import APITestCase
+
+from common import reference
+from .models import Category
+from experiences.models import Experience
+from rooms.models import Amenity, Room
+from users.models import User
 
 # Create your tests here.
+
+
+class TestCategories(APITestCase):
+    URL = "/api/v1/categories/"
+
+    def setUp(self):
+        cache.clear()
+        self.cabins = Category.objects.create(
+            name="Cabins", kind=Category.CategoryKindChoices.ROOMS
+        )
+        self.tours = Category.objects.create(
+            name="Tours", kind=Category.CategoryKindChoices.EXPERIENCES
+        )
+
+    def test_list_is_cached(self):
+        self.client.get(self.URL)
+
+        # the version in the shared cache, no query
+        with self.assertNumQueries(0):
+            response = self.client.get(self.URL)
+
+        self.assertEqual(
+            [category["name"] for category in response.json()], ["Cabins", "Tours"]
+        )
+        self.assertIn("max-age=3600", response["Cache-Control"])
+        data = self.client.get(f"{self.URL}room").json()
+        self.assertEqual([category["pk"] for category in data], [self.cabins.pk])
+
+    def test_not_modified(self):
+        etag = self.client.get(self.URL)["ETag"]
+
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_changes_invalidate(self):
+        etag = self.client.get(self.URL)["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f"{self.URL}{self.cabins.pk}", {"name": "Huts"})
+
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["name"], "Huts")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tours.delete()
+        self.assertEqual(len(self.client.get(self.URL).json()), 1)
+
+    def test_get_falls_back_to_the_database(self):
+        self.client.get(self.URL)
+        # the bump of another worker that never reached this one
+        with self.captureOnCommitCallbacks(execute=False):
+            huts = Category.objects.create(
+                name="Huts", kind=Category.CategoryKindChoices.ROOMS
+            )
+
+        with self.assertNumQueries(1):
+            self.assertEqual(reference.categories.get(huts.pk), huts)
+        self.assertEqual(len(self.client.get(self.URL).json()), 3)
+        with self.assertRaises(Category.DoesNotExist):
+            reference.categories.get(999)
+
+    @override_settings(REFERENCE_DATA_LOCAL_TTL=0)
+    def test_local_cache_reloads(self):
+        etag = self.client.get(self.URL)["ETag"]
+        # a change made in another worker, this one's cache never hears of it
+        Category.objects.filter(pk=self.cabins.pk).update(name="Huts")
+
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["name"], "Huts")
+
+    def test_room_writes_use_the_cache(self):
+        user = User.objects.create(username="host")
+        wifi = Amenity.objects.create(name="Wifi")
+        self.client.force_authenticate(user)
+        room = {
+            "name": "Cabin",
+            "country": "Korea",
+            "city": "Seoul",
+            "price": 100,
+            "rooms": 1,
+            "toilets": 1,
+            "description": "Quiet",
+            "address": "Somewhere",
+            "pet_friendly": True,
+            "kind": "entire_place",
+            "category": self.cabins.pk,
+            "amenities": [wifi.pk],
+        }
+
+        response = self.client.post("/api/v1/rooms/", room, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(Room.objects.get().amenities.values_list("pk", flat=True)), [wifi.pk]
+        )
+        for category, detail in (
+            (self.tours.pk, "The category kind should be 'rooms'"),
+            (999, "Category not found"),
+        ):
+            response = self.client.post(
+                "/api/v1/rooms/", {**room, "category": category}, format="json"
+            )
+            self.assertEqual(response.json()["detail"], detail)
+
+
+class TestCategoryCounts(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(
+            username="owner", is_staff=True, is_superuser=True
+        )
+        self.cabins = Category.objects.create(
+            name="Cabins", kind=Category.CategoryKindChoices.ROOMS
+        )
+        self.huts = Category.objects.create(
+            name="Huts", kind=Category.CategoryKindChoices.ROOMS
+        )
+        self.tours = Category.objects.create(
+            name="Tours", kind=Category.CategoryKindChoices.EXPERIENCES
+        )
+
+    def create_room(self, category):
+        return Room.objects.create(
+            name="Room",
+            price=100,
+            rooms=1,
+            toilets=1,
+            description="",
+            address="",
+            kind=Room.RoomKindChoices.PRIVATE_ROOM,
+            owner=self.owner,
+            category=category,
+        )
+
+    def counts(self):
+        return {
+            category.name: (category.room_count, category.experience_count)
+            for category in Category.objects.all()
+        }
+
+    def test_signals_keep_counts(self):
+        rooms = [self.create_room(self.cabins) for _ in range(3)]
+        Experience.objects.create(
+            name="Walk",
+            host=self.owner,
+            price=10,
+            address="",
+            start="10:00",
+            end="12:00",
+            description="",
+            category=self.tours,
+        )
+        rooms[0].category = self.huts
+        rooms[0].save()
+        rooms[1].name = "Renamed"
+        rooms[1].save(update_fields=["name"])
+        rooms[2].delete()
+
+        self.assertEqual(
+            self.counts(), {"Cabins": (1, 0), "Huts": (1, 0), "Tours": (0, 1)}
+        )
+
+    def test_counts_are_not_cached(self):
+        etag = self.client.get("/api/v1/categories/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_room(self.cabins)
+
+        # the cached list has no counters, so it's still valid
+        response = self.client.get("/api/v1/categories/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/v1/categories/counts")
+
+        self.assertEqual(response["Cache-Control"], "no-cache")
+        self.assertEqual(
+            [(c["pk"], c["room_count"]) for c in response.json()],
+            [(self.cabins.pk, 1), (self.huts.pk, 0), (self.tours.pk, 0)],
+        )
+
+    def test_admin_move_recounts(self):
+        rooms = [self.create_room(self.cabins) for _ in range(3)]
+        self.client.force_login(self.owner)
+
+        self.client.post(
+            "/admin/rooms/room/",
+            {
+                "action": "move_to_category",
+                "category": self.huts.pk,
+                "_selected_action": [room.pk for room in rooms[:2]],
+                "index": 0,
+            },
+        )
+
+        self.assertEqual(self.counts()["Cabins"], (1, 0))
+        self.assertEqual(self.counts()["Huts"], (2, 0))
+
+    def test_reconcile(self):
+        self.create_room(self.cabins)
+        Category.objects.update(room_count=7)
+        output = StringIO()
+
+        call_command("reconcile_category_counts", stdout=output)
+
+        self.assertIn("3 categories fixed", output.getvalue())
+        self.assertEqual(self.counts()["Cabins"], (1, 0))
+        self.assertEqual(self.counts()["Huts"], (0, 0))
@@ -4,5 +4,6 @@ from . import views
 urlpatterns = [
     path("", views.Categories.as_view()),
     path("room", views.RoomCategories.as_view()),
+    path("counts", views.CategoryCounts.as_view()),
     path("<int:pk>", views.CategoryDetail.as_view()),
 ]
@@ -1,3 +1,5 @@
+from django.utils.cache import patch_cache_control
+
 from rest_framework.decorators import api_view
 from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
@@ -5,17 +7,16 @@ from rest_framework.views import APIView
 from rest_framework.status import HTTP_204_NO_CONTENT
 from rest_framework.viewsets import ModelViewSet
 
+from common import reference
 from .models import Category
-from .serializers import CategorySerializer
+from .serializers import CategoryCountSerializer, CategorySerializer
 
 # Create your views here.
 
 
 class Categories(APIView):
     def get(self, request):
-        all_categories = Category.objects.all()
-        serializer = CategorySerializer(all_categories, many=True)
-        return Response(serializer.data)
+        return reference.categories.list_response(request, CategorySerializer)
 
     def post(self, request):
         serializer = CategorySerializer(data=request.data)
@@ -29,11 +30,26 @@ class Categories(APIView):
 
 class RoomCategories(APIView):
     def get(self, request):
-        all_room_categories = Category.objects.filter(
-            kind=Category.CategoryKindChoices.ROOMS,
+        return reference.categories.list_response(
+            request,
+            CategorySerializer,
+            keep=lambda category: category.kind == Category.CategoryKindChoices.ROOMS,
         )
-        serializer = CategorySerializer(all_room_categories, many=True)
-        return Response(serializer.data)
+
+
+class CategoryCounts(APIView):
+    """
+    Not in the cached lists above: the counters move with every listing,
+    they would change the ETag all the time and go stale for max-age.
+    """
+
+    def get(self, request):
+        categories = Category.objects.only(
+            "pk", "room_count", "experience_count"
+        ).order_by("pk")
+        response = Response(CategoryCountSerializer(categories, many=True).data)
+        patch_cache_control(response, no_cache=True)
+        return response
 
 
 class CategoryDetail(APIView):
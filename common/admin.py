@@ -1,3 +1,37 @@
 from django.contrib import admin
 
+from .models import BulkJob
+
 # Register your models here.
+
+
+@admin.register(BulkJob)
+class BulkJobAdmin(admin.ModelAdmin):
+    list_display = (
+        "name",
+        "user",
+        "progress",
+        "status",
+        "created_at",
+        "updated_at",
+    )
+    list_filter = ("status",)
+    list_select_related = ("user",)
+    readonly_fields = (
+        "name",
+        "user",
+        "total",
+        "done",
+        "status",
+        "error",
+        "created_at",
+        "updated_at",
+    )
+
+    def progress(self, job):
+        if not job.total:
+            return "-"
+        return f"{job.done}/{job.total} ({job.done * 100 // job.total}%)"
+
+    def has_add_permission(self, request):
+        return False
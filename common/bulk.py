@@ -0,0 +1,124 @@
+"""
+Bulk admin actions that work on the whole selection at once.
+
+An action is a function taking a queryset of the selected objects and
+changing them with one set-based statement (update(), bulk_create()...).
+Selections up to BULK_ACTION_INLINE_LIMIT are handled in the request.
+Bigger ones are split into chunks of BULK_ACTION_CHUNK_SIZE pks and run on
+a background thread, with the progress kept in a BulkJob row.
+"""
+
+import threading
+from functools import partial, wraps
+
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, transaction
+from django.db.models import F
+
+from .models import BulkJob
+
+
+def chunks(pks, size):
+    for i in range(0, len(pks), size):
+        yield pks[i : i + size]
+
+
+def run_job(job_pk, model, pks, apply):
+    try:
+        for chunk in chunks(pks, settings.BULK_ACTION_CHUNK_SIZE):
+            with transaction.atomic():
+                apply(model._default_manager.filter(pk__in=chunk))
+                BulkJob.objects.filter(pk=job_pk).update(done=F("done") + len(chunk))
+        BulkJob.objects.filter(pk=job_pk).update(status=BulkJob.StatusChoices.FINISHED)
+    except Exception as error:
+        BulkJob.objects.filter(pk=job_pk).update(
+            status=BulkJob.StatusChoices.FAILED,
+            error=repr(error),
+        )
+        raise
+
+
+def run_in_background(job_pk, model, pks, apply):
+    def target():
+        try:
+            run_job(job_pk, model, pks, apply)
+        finally:
+            close_old_connections()
+
+    threading.Thread(target=target, daemon=True).start()
+
+
+def run_bulk(request, queryset, apply, name):
+    """Apply to the selection inline or as a BulkJob, returns the job if any"""
+    model = queryset.model
+    # the changelist queryset may be annotated, select by pk only
+    selection = queryset.order_by().values("pk")
+    total = queryset.count()
+    if total <= settings.BULK_ACTION_INLINE_LIMIT:
+        with transaction.atomic():
+            apply(model._default_manager.filter(pk__in=selection))
+        return None
+
+    # freeze the selection, the filters might stop matching halfway through
+    pks = list(queryset.order_by("pk").values_list("pk", flat=True))
+    job = BulkJob.objects.create(name=name, user=request.user, total=len(pks))
+    if settings.BULK_ACTION_BACKGROUND:
+        transaction.on_commit(lambda: run_in_background(job.pk, model, pks, apply))
+    else:
+        run_job(job.pk, model, pks, apply)
+    return job
+
+
+def chosen(model_admin, request, target):
+    """The value of the target field of the action form, None if there's none"""
+    field = model_admin.action_form(auto_id=None).fields[target]
+    try:
+        value = field.clean(request.POST.get(target))
+    except ValidationError:
+        return None
+    return None if value in field.empty_values else value
+
+
+def bulk_action(description, target=None):
+    """
+    Turn `apply(queryset)` into an admin action:
+
+        @bulk_action("Set all price to zero")
+        def reset_prices(rooms):
+            rooms.update(price=0)
+
+    With target, the name of a field the ModelAdmin adds to its action_form,
+    it's `apply(value, queryset)` with the value picked next to the action.
+    """
+
+    def decorator(apply):
+        @admin.action(description=description)
+        @wraps(apply)
+        def action(model_admin, request, queryset):
+            run = apply
+            if target is not None:
+                value = chosen(model_admin, request, target)
+                if value is None:
+                    model_admin.message_user(
+                        request,
+                        f"{description}: choose the {target} first",
+                        messages.WARNING,
+                    )
+                    return
+                run = partial(apply, value)
+            job = run_bulk(request, queryset, run, description)
+            if job is None:
+                model_admin.message_user(request, f"{description}: done")
+            else:
+                model_admin.message_user(
+                    request,
+                    f"{description}: {job.total} objects, "
+                    f"see Bulk jobs for the progress",
+                    messages.INFO,
+                )
+
+        return action
+
+    return decorator
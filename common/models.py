@@ -12,3 +12,32 @@ class CommonModel(models.Model):
 
     class Meta:
         abstract = True
+
+
+class BulkJob(CommonModel):
+    """Progress of a bulk admin action running in the background"""
+
+    class StatusChoices(models.TextChoices):
+        RUNNING = "running", "Running"
+        FINISHED = "finished", "Finished"
+        FAILED = "failed", "Failed"
+
+    name = models.CharField(max_length=150)
+    user = models.ForeignKey(
+        "users.User",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="bulk_jobs",
+    )
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    status = models.CharField(
+        max_length=10,
+        choices=StatusChoices.choices,
+        default=StatusChoices.RUNNING,
+    )
+    error = models.TextField(blank=True)
+
+    def __str__(self) -> str:
+        return f"{self.name} ({self.done}/{self.total})"
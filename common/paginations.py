@@ -0,0 +1,131 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from rest_framework.exceptions import ParseError
+from rest_framework.response import Response
+
+
+def get_page_size(request):
+    """?page_size=, capped at settings.MAX_PAGE_SIZE"""
+    try:
+        page_size = int(request.query_params.get("page_size", settings.PAGE_SIZE))
+    except ValueError:
+        raise ParseError("page_size should be a number")
+    return max(1, min(page_size, settings.MAX_PAGE_SIZE))
+
+
+class KeysetPagination:
+    """
+    Cursor pagination over a unique ordering such as ("experience_time", "pk").
+    Fields starting with "-" are descending, the fields must not be null
+    and the last one should be "pk" so that the ordering has no ties.
+    """
+
+    cursor_query_param = "cursor"
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+        self.next_cursor = None
+
+    def paginate_queryset(self, queryset, request):
+        page_size = get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self.after(self.decode(cursor, queryset.model)))
+        page = list(queryset.order_by(*self.ordering)[: page_size + 1])
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode(page[-1])
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.next_cursor,
+                "results": data,
+            }
+        )
+
+    def after(self, values):
+        # (a, b) > (x, y)  ->  a > x OR (a = x AND b > y)
+        condition = None
+        for field, value in reversed(list(zip(self.ordering, values))):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            beyond = Q(**{f"{name}__{lookup}": value})
+            if condition is None:
+                condition = beyond
+            else:
+                condition = beyond | (Q(**{name: value}) & condition)
+        return condition
+
+    def encode(self, instance):
+        values = []
+        for field in self.ordering:
+            value = getattr(instance, field.lstrip("-"))
+            # keep microseconds, the ORM parses ISO strings back
+            if hasattr(value, "isoformat"):
+                value = value.isoformat()
+            values.append(value)
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    @staticmethod
+    def model_field(model, field):
+        name = field.lstrip("-")
+        return model._meta.pk if name == "pk" else model._meta.get_field(name)
+
+    def decode(self, cursor, model):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        except (ValueError, TypeError):
+            raise ParseError("Invalid cursor")
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ParseError("Invalid cursor")
+        # a cursor is client input, it must not reach the query unchecked
+        try:
+            values = [
+                self.model_field(model, field).to_python(value)
+                for field, value in zip(self.ordering, values)
+            ]
+        except (ValidationError, ValueError, TypeError):
+            raise ParseError("Invalid cursor")
+        if None in values:
+            raise ParseError("Invalid cursor")
+        return values
+
+
+def estimate_count(queryset):
+    """The planner's row estimate on PostgreSQL, None elsewhere"""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin paginator that doesn't count(*) big tables.
+    Small results (under exact_below by the estimate) are still counted exactly.
+    """
+
+    exact_below = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_below:
+            return super().count
+        return estimate
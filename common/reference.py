@@ -0,0 +1,121 @@
+"""
+Small tables that rarely change (categories, amenities, perks), kept whole
+in this process.
+
+Each table has a version number in the shared cache. A save or delete
+bumps it once committed (see common/signals.py), so every worker reloads
+the table the next time it's used. A lookup costs one cache get for the
+version and no query. The version is also the ETag of the list endpoints.
+
+A locmem cache isn't shared, a worker only sees its own bumps. Then the
+copy is also reloaded (under a new version) every REFERENCE_DATA_LOCAL_TTL
+seconds, and get() checks the database before saying a row doesn't exist.
+"""
+
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils.cache import patch_cache_control
+from django.utils.http import quote_etag
+
+from rest_framework.response import Response
+from rest_framework.status import HTTP_304_NOT_MODIFIED
+
+from . import versions
+
+
+def cache_is_local():
+    """True when every worker has a cache of its own"""
+    return isinstance(caches["default"], LocMemCache)
+
+
+class ReferenceTable:
+    def __init__(self, label):
+        self.label = label
+        self.version_key = f"reference:{label.lower()}:version"
+        # (version, {pk: row}, time.monotonic() of the load)
+        self.loaded = (None, {}, 0)
+        self.lock = threading.Lock()
+
+    @property
+    def model(self):
+        return apps.get_model(self.label)
+
+    def get_version(self):
+        return versions.get_version(self.version_key)
+
+    def expired(self, loaded):
+        return (
+            cache_is_local()
+            and time.monotonic() - loaded[2] >= settings.REFERENCE_DATA_LOCAL_TTL
+        )
+
+    def load(self):
+        """(version, {pk: row}) ordered by pk, reloaded when the version moved"""
+        version = self.get_version()
+        loaded = self.loaded
+        if loaded[0] == version and not self.expired(loaded):
+            return loaded[:2]
+        with self.lock:
+            if self.loaded[0] == version and self.expired(self.loaded):
+                # a new version too, so clients don't keep the old list
+                self.invalidate()
+                version = self.get_version()
+            if self.loaded[0] != version:
+                rows = {row.pk: row for row in self.model.objects.order_by("pk")}
+                self.loaded = (version, rows, time.monotonic())
+            return self.loaded[:2]
+
+    def all(self):
+        """Every row, shared with other requests, so read only"""
+        return list(self.load()[1].values())
+
+    def get(self, pk):
+        """Like objects.get(pk=pk), raises DoesNotExist"""
+        try:
+            return self.load()[1][int(pk)]
+        except (TypeError, ValueError):
+            raise self.model.DoesNotExist(f"{self.label} {pk!r} does not exist")
+        except KeyError:
+            # added where the bump doesn't reach us (or not yet), so ask the
+            # database and reload the copy next time if it's there
+            row = self.model.objects.get(pk=pk)
+            self.loaded = (None, {}, 0)
+            return row
+
+    def invalidate(self):
+        versions.bump(self.version_key)
+
+    def invalidate_on_commit(self):
+        transaction.on_commit(self.invalidate)
+
+    def list_response(self, request, serializer_class, keep=None):
+        """
+        A Response of the serialized rows (those keep(row) is true for),
+        304 when the client has this version, browsers and CDNs keep it for
+        REFERENCE_DATA_MAX_AGE.
+        """
+        version, rows = self.load()
+        etag = quote_etag(f"{self.label.lower()}-{version:x}")
+        if etag in request.headers.get("If-None-Match", ""):
+            response = Response(status=HTTP_304_NOT_MODIFIED)
+        else:
+            rows = [row for row in rows.values() if keep is None or keep(row)]
+            response = Response(serializer_class(rows, many=True).data)
+        response["ETag"] = etag
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.REFERENCE_DATA_MAX_AGE,
+        )
+        return response
+
+
+categories = ReferenceTable("categories.Category")
+amenities = ReferenceTable("rooms.Amenity")
+perks = ReferenceTable("experiences.Perk")
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import reference
+
+
+@receiver(post_save, sender="categories.Category")
+@receiver(post_delete, sender="categories.Category")
+def category_changed(sender, **kwargs):
+    reference.categories.invalidate_on_commit()
+
+
+@receiver(post_save, sender="rooms.Amenity")
+@receiver(post_delete, sender="rooms.Amenity")
+def amenity_changed(sender, **kwargs):
+    reference.amenities.invalidate_on_commit()
+
+
+@receiver(post_save, sender="experiences.Perk")
+@receiver(post_delete, sender="experiences.Perk")
+def perk_changed(sender, **kwargs):
+    reference.perks.invalidate_on_commit()
@@ -0,0 +1,28 @@
+"""
+Version numbers in the shared cache, for data cached under a key that
+contains the version: bumping it makes every cached copy stale for every
+worker at once.
+
+A missing version starts from time.time_ns(), never from an old number
+stale data might still be cached under. Bump after the commit (from
+transaction.on_commit), so nobody caches the old rows under the new version.
+"""
+
+import time
+
+from django.core.cache import cache
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
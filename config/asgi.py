@@ -13,4 +13,14 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# after get_asgi_application(), the apps have to be loaded
+from direct_messages.sockets import websocket_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "websocket":
+        await websocket_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
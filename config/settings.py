@@ -120,6 +120,14 @@ else:
     }
 
 
+# Cache
+# locmemcache:// by default, point CACHE_URL at redis/memcached to share it between workers
+
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://"),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -174,8 +182,48 @@ MEDIA_ROOT = "uploads"
 
 MEDIA_URL = "user-uploads/"
 
+# Direct uploads (see medias/storage.py)
+MEDIA_STORAGE = env("MEDIA_STORAGE", default="medias.storage.LocalStorage")
+MEDIA_S3_BUCKET = env("MEDIA_S3_BUCKET", default="")
+MEDIA_S3_ENDPOINT_URL = env("MEDIA_S3_ENDPOINT_URL", default=None)
+MEDIA_PUBLIC_URL = env("MEDIA_PUBLIC_URL", default="")
+MEDIA_UPLOAD_EXPIRES = 60 * 10
+MEDIA_VARIANT_WORKERS = 2
+MEDIA_VARIANTS_BACKGROUND = True
+MEDIA_UPLOAD_MAX_SIZE = {
+    "photo": 10 * 1024 * 1024,
+    "video": 200 * 1024 * 1024,
+}
+
+# Serving MEDIA_URL (see medias/serving.py), e.g. "/protected-media/" behind nginx
+MEDIA_ACCEL_REDIRECT = env("MEDIA_ACCEL_REDIRECT", default="")
+MEDIA_MAX_AGE = 60 * 60
+
 PAGE_SIZE = 3
 
+# categories, amenities and perks lists (see common/reference.py)
+REFERENCE_DATA_MAX_AGE = 60 * 60
+# with a locmemcache:// CACHE_URL other workers never see a change, reload after
+REFERENCE_DATA_LOCAL_TTL = 10
+
+MAX_PAGE_SIZE = 50
+
+# Chat events to WebSockets (see direct_messages/pubsub.py)
+CHAT_PUBSUB_BACKEND = env(
+    "CHAT_PUBSUB_BACKEND", default="direct_messages.pubsub.LocalBackend"
+)
+CHAT_PUBSUB_REDIS_URL = env("CHAT_PUBSUB_REDIS_URL", default="redis://localhost:6379")
+CHAT_SOCKET_QUEUE_SIZE = 64
+# messages sent over sockets are saved in batches (see direct_messages/writer.py)
+CHAT_WRITE_DELAY = 0.005
+CHAT_WRITE_BATCH_SIZE = 500
+
+# Bulk admin actions: small selections run as one statement in the request,
+# bigger ones in chunks on a background thread (see common/bulk.py)
+BULK_ACTION_INLINE_LIMIT = 10000
+BULK_ACTION_CHUNK_SIZE = 1000
+BULK_ACTION_BACKGROUND = True
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         # authenticate in order
@@ -183,7 +231,23 @@ REST_FRAMEWORK = {
         "rest_framework.authentication.TokenAuthentication",
         "config.authentication.TrustMeBroAuthentication",
         "config.authentication.JWTAuthentication",
-    ]
+    ],
+    # views pick a scope with `throttle_scope` ("auth", "booking"), default is "browse"
+    "DEFAULT_THROTTLE_CLASSES": [
+        "config.throttles.UserTokenBucketThrottle",
+        "config.throttles.IPTokenBucketThrottle",
+    ],
+    "DEFAULT_THROTTLE_RATES": {
+        "auth": "10/min",
+        "auth_ip": "30/min",
+        "booking": "60/min",
+        "booking_ip": "120/min",
+        "browse": "600/min",
+        "browse_ip": "1200/min",
+    },
+    # the IP throttle trusts this many X-Forwarded-For hops from the right,
+    # 0 = REMOTE_ADDR only. Render has one proxy in front of the app
+    "NUM_PROXIES": env.int("NUM_PROXIES", default=1 if "RENDER" in os.environ else 0),
 }
 
 CORS_ALLOWED_ORIGINS = [
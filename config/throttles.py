@@ -0,0 +1,121 @@
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketStore:
+    """Thread-safe in-process token buckets, shared by every throttle."""
+
+    PRUNE_INTERVAL = 60
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.last_prune = time.monotonic()
+
+    def consume(self, key, capacity, refill_rate):
+        """
+        Take one token from the bucket at `key`.
+        Return 0 when the request is allowed, otherwise the seconds to wait.
+        """
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / refill_rate
+            # the bucket is full again (= same as missing) after `full_in` seconds
+            full_in = (capacity - tokens) / refill_rate
+            self.buckets[key] = (tokens, now, now + full_in)
+            if now - self.last_prune > self.PRUNE_INTERVAL:
+                self.prune(now)
+        return wait
+
+    def prune(self, now):
+        self.buckets = {
+            key: bucket for key, bucket in self.buckets.items() if bucket[2] > now
+        }
+        self.last_prune = now
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+store = TokenBucketStore()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Scoped token bucket throttle.
+    Views choose their scope with `throttle_scope`, default is "browse".
+    """
+
+    default_scope = "browse"
+    rate_suffix = ""
+
+    def __init__(self):
+        self.wait_time = 0
+
+    def parse_rate(self, rate):
+        num, period = rate.split("/")
+        num_requests = int(num)
+        duration = {"s": 1, "m": 60, "h": 3600, "d": 86400}[period[0]]
+        return num_requests, duration
+
+    def get_rate(self, scope):
+        rate_name = f"{scope}{self.rate_suffix}"
+        try:
+            return api_settings.DEFAULT_THROTTLE_RATES[rate_name]
+        except KeyError:
+            raise ImproperlyConfigured(f"No throttle rate set for '{rate_name}'")
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError(".get_cache_key() must be overridden")
+
+    def allow_request(self, request, view):
+        key = self.get_cache_key(request, view)
+        if key is None:
+            return True
+        scope = getattr(view, "throttle_scope", self.default_scope)
+        rate = self.get_rate(scope)
+        if rate is None:
+            return True
+        num_requests, duration = self.parse_rate(rate)
+        self.wait_time = store.consume(
+            f"{scope}{self.rate_suffix}:{key}",
+            num_requests,
+            num_requests / duration,
+        )
+        return self.wait_time == 0
+
+    def wait(self):
+        return self.wait_time
+
+
+class UserTokenBucketThrottle(TokenBucketThrottle):
+    """Limits every logged in user, anonymous requests are left to the IP throttle."""
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return None
+
+
+class IPTokenBucketThrottle(TokenBucketThrottle):
+    """Limits every client IP (REMOTE_ADDR, or as NUM_PROXIES says), logged in or not."""
+
+    rate_suffix = "_ip"
+
+    def get_cache_key(self, request, view):
+        return f"ip:{self.get_ident(request)}"
@@ -1,5 +1,13 @@
 from django.contrib import admin
-from .models import ChattingRoom, Message
+from .models import ChattingRoom, Membership, Message
+
+
+class MembershipInline(admin.TabularInline):
+    model = Membership
+    fields = ("user", "unread_count", "last_read_message")
+    readonly_fields = ("unread_count", "last_read_message")
+    raw_id_fields = ("user",)
+    extra = 0
 
 
 # Register your models here.
@@ -7,10 +15,13 @@ from .models import ChattingRoom, Message
 class ChattingRoomAdmin(admin.ModelAdmin):
     list_display = (
         "__str__",
+        "last_message_at",
         "created_at",
         "updated_at",
     )
     list_filter = ("created_at",)
+    readonly_fields = ("last_message", "last_message_at")
+    inlines = (MembershipInline,)
 
 
 @admin.register(Message)
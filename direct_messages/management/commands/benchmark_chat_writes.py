@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from asgiref.sync import sync_to_async
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from direct_messages.models import ChattingRoom, Message, record_messages
+from direct_messages.writer import get_writer
+from users.models import User
+
+
+def save_one(room_pk, user_pk, text):
+    """The naive path: a transaction per message, like the HTTP POST"""
+    with transaction.atomic():
+        message = Message.objects.create(room_id=room_pk, user_id=user_pk, text=text)
+        record_messages([message])
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-message transactions with the buffered writer of the "
+        "sockets. Writes to a scratch room and users that are deleted after."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=2000)
+        parser.add_argument(
+            "--senders",
+            type=int,
+            default=50,
+            help="Users sending at the same time, each in turn",
+        )
+
+    def handle(self, *args, **options):
+        users = [
+            User.objects.create(username=f"benchmark-chat-{i}")
+            for i in range(options["senders"])
+        ]
+        room = ChattingRoom.objects.create()
+        room.users.add(*users)
+        try:
+            for name, send in (
+                ("naive", sync_to_async(save_one)),
+                ("buffered", lambda *args: get_writer().write(*args)),
+            ):
+                seconds = asyncio.run(
+                    self.run(send, room.pk, users, options["messages"])
+                )
+                self.stdout.write(
+                    f"{name:>8}: {options['messages']} messages in {seconds:.2f}s, "
+                    f"{options['messages'] / seconds:.0f}/s"
+                )
+        finally:
+            room.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+    async def run(self, send, room_pk, users, count):
+        async def sender(user, share):
+            for i in range(share):
+                await send(room_pk, user.pk, f"message {i}")
+
+        shares = [count // len(users)] * len(users)
+        shares[0] += count % len(users)
+        started = time.perf_counter()
+        await asyncio.gather(*map(sender, users, shares))
+        return time.perf_counter() - started
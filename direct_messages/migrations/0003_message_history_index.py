@@ -0,0 +1,22 @@
+# Generated by Django 4.2.3 on 2026-10-19 17:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "direct_messages",
+            "0002_alter_chattingroom_users_alter_message_room_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="message",
+            index=models.Index(
+                fields=["room", "created_at", "id"],
+                name="direct_mess_room_id_27e9b4_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,138 @@
+# Generated by Django 4.2.3 on 2026-10-19 18:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def backfill(apps, schema_editor):
+    ChattingRoom = apps.get_model("direct_messages", "ChattingRoom")
+    Membership = apps.get_model("direct_messages", "Membership")
+    Message = apps.get_model("direct_messages", "Message")
+    last = Message.objects.filter(room=models.OuterRef("pk")).order_by(
+        "-created_at", "-pk"
+    )
+    ChattingRoom.objects.update(
+        last_message=models.Subquery(last.values("pk")[:1]),
+        last_message_at=models.functions.Coalesce(
+            models.Subquery(last.values("created_at")[:1]),
+            models.F("created_at"),
+        ),
+    )
+    # existing rooms start out read
+    Membership.objects.update(
+        last_message_at=models.Subquery(
+            ChattingRoom.objects.filter(pk=models.OuterRef("chattingroom")).values(
+                "last_message_at"
+            )
+        ),
+        last_read_message=models.Subquery(
+            ChattingRoom.objects.filter(pk=models.OuterRef("chattingroom")).values(
+                "last_message"
+            )
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("direct_messages", "0003_message_history_index"),
+    ]
+
+    operations = [
+        # the m2m table stays, it becomes the Membership model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name="Membership",
+                    fields=[
+                        (
+                            "id",
+                            models.BigAutoField(
+                                auto_created=True,
+                                primary_key=True,
+                                serialize=False,
+                                verbose_name="ID",
+                            ),
+                        ),
+                        (
+                            "chattingroom",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                related_name="memberships",
+                                to="direct_messages.chattingroom",
+                            ),
+                        ),
+                        (
+                            "user",
+                            models.ForeignKey(
+                                on_delete=django.db.models.deletion.CASCADE,
+                                related_name="memberships",
+                                to=settings.AUTH_USER_MODEL,
+                            ),
+                        ),
+                    ],
+                    options={
+                        "db_table": "direct_messages_chattingroom_users",
+                        "unique_together": {("chattingroom", "user")},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name="chattingroom",
+                    name="users",
+                    field=models.ManyToManyField(
+                        related_name="chattingrooms",
+                        through="direct_messages.Membership",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="membership",
+            name="last_message_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="membership",
+            name="last_read_message",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="direct_messages.message",
+            ),
+        ),
+        migrations.AddField(
+            model_name="membership",
+            name="unread_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="chattingroom",
+            name="last_message",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="direct_messages.message",
+            ),
+        ),
+        migrations.AddField(
+            model_name="chattingroom",
+            name="last_message_at",
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="membership",
+            index=models.Index(
+                fields=["user", "-last_message_at"],
+                name="direct_mess_user_id_bf24e6_idx",
+            ),
+        ),
+    ]
@@ -1,24 +1,41 @@
 from django.db import models
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
 from common.models import CommonModel
 
 # Create your models here.
 
 
 class ChattingRoom(CommonModel):
-
     """Room Model Definition"""
 
     users = models.ManyToManyField(
         "users.User",
+        through="direct_messages.Membership",
         related_name="chattingrooms",
     )
+    last_message = models.ForeignKey(
+        "direct_messages.Message",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    last_message_at = models.DateTimeField(default=timezone.now)
 
     def __str__(self) -> str:
         return "Chatting Room"
 
+    @staticmethod
+    def is_member(room_pk, user_pk):
+        # the (chattingroom_id, user_id) unique index of the m2m table
+        return Membership.objects.filter(
+            chattingroom_id=room_pk,
+            user_id=user_pk,
+        ).exists()
 
-class Message(CommonModel):
 
+class Message(CommonModel):
     """Message Model Definition"""
 
     text = models.TextField()
@@ -37,3 +54,140 @@ class Message(CommonModel):
 
     def __str__(self) -> str:
         return f"{self.user} says: {self.text}"
+
+    class Meta:
+        indexes = [
+            # history of a room, newest first (keyset pagination)
+            models.Index(fields=["room", "created_at", "id"]),
+        ]
+
+
+class Membership(models.Model):
+    """A user of a ChattingRoom and how far they've read"""
+
+    chattingroom = models.ForeignKey(
+        "direct_messages.ChattingRoom",
+        on_delete=models.CASCADE,
+        related_name="memberships",
+    )
+    user = models.ForeignKey(
+        "users.User",
+        on_delete=models.CASCADE,
+        related_name="memberships",
+    )
+    last_read_message = models.ForeignKey(
+        "direct_messages.Message",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
+    # kept up to date by record_messages() and the read cursor
+    unread_count = models.PositiveIntegerField(default=0)
+    # copy of chattingroom.last_message_at, so the inbox is one index scan
+    last_message_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # the table of the former auto-created m2m
+        db_table = "direct_messages_chattingroom_users"
+        unique_together = ("chattingroom", "user")
+        indexes = [
+            # inbox of a user, most recent first
+            models.Index(fields=["user", "-last_message_at"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.user} in {self.chattingroom_id}"
+
+
+def record_messages(messages):
+    """
+    Denormalize new messages onto their rooms and members, whatever the
+    number of rooms it's one UPDATE of the rooms and one of the memberships:
+    last message, last_message_at and unread counts.
+    Senders have read everything up to their own last message.
+    A message older than the last one of its room (a late batch) never
+    moves last_message, last_message_at or a read cursor back.
+    """
+    by_room = {}
+    for message in messages:
+        by_room.setdefault(message.room_id, []).append(message)
+    if not by_room:
+        return
+    last_messages, unread, cursors, bumps = [], [], [], []
+    for room_pk, room_messages in by_room.items():
+        room_messages.sort(key=lambda message: (message.created_at, message.pk))
+        last = room_messages[-1]
+        last_messages.append((room_pk, last))
+        senders = {}
+        for index, message in enumerate(room_messages):
+            if message.user_id is not None:
+                senders[message.user_id] = (message, len(room_messages) - index - 1)
+        for user_pk, (message, after) in senders.items():
+            member = Q(chattingroom_id=room_pk, user_id=user_pk)
+            # not when the member has seen a newer message of the room
+            newest = member & Q(last_message_at__lte=message.created_at)
+            unread.append(When(newest, then=Value(after)))
+            # their own message isn't unread for them either way
+            unread.append(When(member, then=F("unread_count")))
+            cursors.append(When(newest, then=Value(message.pk)))
+        bumps.append(
+            When(
+                chattingroom_id=room_pk,
+                then=F("unread_count") + len(room_messages),
+            )
+        )
+
+    ChattingRoom.objects.filter(pk__in=by_room).update(
+        last_message=Case(
+            *[
+                When(
+                    pk=room_pk,
+                    last_message_at__lte=last.created_at,
+                    then=Value(last.pk),
+                )
+                for room_pk, last in last_messages
+            ],
+            default=F("last_message"),
+            output_field=models.BigIntegerField(),
+        ),
+        last_message_at=Case(
+            *[
+                When(
+                    pk=room_pk,
+                    last_message_at__lte=last.created_at,
+                    then=Value(last.created_at),
+                )
+                for room_pk, last in last_messages
+            ],
+            default=F("last_message_at"),
+            output_field=models.DateTimeField(),
+        ),
+        updated_at=timezone.now(),
+    )
+    Membership.objects.filter(chattingroom_id__in=by_room).update(
+        last_message_at=Case(
+            *[
+                When(
+                    chattingroom_id=room_pk,
+                    last_message_at__lte=last.created_at,
+                    then=Value(last.created_at),
+                )
+                for room_pk, last in last_messages
+            ],
+            default=F("last_message_at"),
+            output_field=models.DateTimeField(),
+        ),
+        # the first matching When wins, senders before everyone else
+        unread_count=Case(
+            *unread,
+            *bumps,
+            default=F("unread_count"),
+            output_field=models.PositiveIntegerField(),
+        ),
+        last_read_message=Case(
+            *cursors,
+            default=F("last_read_message"),
+            output_field=models.BigIntegerField(),
+        ),
+    )
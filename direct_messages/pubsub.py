@@ -0,0 +1,153 @@
+"""
+Fan-out of chat events to the WebSocket connections of this worker.
+
+Hub keeps channel -> connections in memory and runs on the event loop of
+the ASGI app. Events published from request threads or other workers go
+through settings.CHAT_PUBSUB_BACKEND:
+- LocalBackend delivers inside this process only (development, tests,
+  a single worker).
+- RedisBackend publishes on Redis so every worker's Hub gets the event
+  (needs the redis package).
+"""
+
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def room_channel(room_pk):
+    return f"room:{room_pk}"
+
+
+def user_channel(user_pk):
+    return f"user:{user_pk}"
+
+
+class Hub:
+    def __init__(self):
+        self.channels = {}
+        self.loop = None
+
+    def subscribe(self, channel, connection):
+        self.loop = asyncio.get_running_loop()
+        self.channels.setdefault(channel, set()).add(connection)
+
+    def unsubscribe(self, channel, connection):
+        connections = self.channels.get(channel)
+        if connections:
+            connections.discard(connection)
+            if not connections:
+                del self.channels[channel]
+
+    def deliver(self, channel, data):
+        """On the loop: hand the encoded event to every subscriber"""
+        for connection in list(self.channels.get(channel, ())):
+            connection.push(data)
+
+    def deliver_threadsafe(self, channel, data):
+        if self.loop is None or self.loop.is_closed():
+            # nobody connected to this worker yet
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.deliver(channel, data)
+        else:
+            self.loop.call_soon_threadsafe(self.deliver, channel, data)
+
+
+class LocalBackend:
+    def __init__(self, hub):
+        self.hub = hub
+
+    async def start(self):
+        pass
+
+    def publish(self, channel, data):
+        self.hub.deliver_threadsafe(channel, data)
+
+
+class RedisBackend:
+    prefix = "chat:"
+    # seconds between reconnects, doubling up to the max
+    retry_delay = 0.5
+    max_retry_delay = 30
+
+    def __init__(self, hub):
+        import redis
+
+        self.hub = hub
+        self.url = settings.CHAT_PUBSUB_REDIS_URL
+        self.client = redis.Redis.from_url(self.url)
+        self.listener = None
+
+    async def start(self):
+        # one subscription per worker, not per connection
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+
+    async def listen(self):
+        """Runs as long as the worker, reconnects when Redis goes away"""
+        delay = self.retry_delay
+        while True:
+            try:
+                async for item in self.subscribe():
+                    delay = self.retry_delay
+                    if item["type"] != "pmessage":
+                        continue
+                    channel = item["channel"].decode()[len(self.prefix) :]
+                    self.hub.deliver(channel, item["data"].decode())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception(
+                    "Lost the chat subscription, reconnecting in %ss", delay
+                )
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.max_retry_delay)
+
+    async def subscribe(self):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.psubscribe(f"{self.prefix}*")
+            async for item in pubsub.listen():
+                yield item
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+    def publish(self, channel, data):
+        self.client.publish(f"{self.prefix}{channel}", data)
+
+
+hub = Hub()
+backend = None
+lock = threading.Lock()
+
+
+def get_backend():
+    global backend
+    with lock:
+        if backend is None:
+            backend = import_string(settings.CHAT_PUBSUB_BACKEND)(hub)
+        return backend
+
+
+def publish(channel, event):
+    get_backend().publish(channel, json.dumps(event, default=str))
+
+
+def publish_on_commit(channel, event):
+    transaction.on_commit(lambda: publish(channel, event))
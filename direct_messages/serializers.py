@@ -0,0 +1,48 @@
+from rest_framework import serializers
+
+from .models import ChattingRoom, Membership, Message
+from users.serializers import TinyUserSerializer
+
+
+class ChattingRoomSerializer(serializers.ModelSerializer):
+    users = TinyUserSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ChattingRoom
+        fields = (
+            "pk",
+            "users",
+            "created_at",
+            "updated_at",
+        )
+
+
+class MessageSerializer(serializers.ModelSerializer):
+    user = TinyUserSerializer(read_only=True)
+
+    class Meta:
+        model = Message
+        fields = (
+            "pk",
+            "text",
+            "user",
+            "created_at",
+        )
+
+
+class InboxSerializer(serializers.ModelSerializer):
+    """A room in the inbox of the user of the Membership"""
+
+    pk = serializers.IntegerField(source="chattingroom_id")
+    users = TinyUserSerializer(source="chattingroom.users", many=True)
+    last_message = MessageSerializer(source="chattingroom.last_message")
+
+    class Meta:
+        model = Membership
+        fields = (
+            "pk",
+            "users",
+            "last_message",
+            "last_message_at",
+            "unread_count",
+        )
@@ -0,0 +1,37 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Membership
+from .pubsub import publish_on_commit, user_channel
+
+
+def publish_membership(room_pk, user_pk, member):
+    # open sockets of the user follow the room from now on (sockets.Memberships)
+    publish_on_commit(
+        user_channel(user_pk),
+        {"type": "membership", "room": room_pk, "member": member},
+    )
+
+
+@receiver(post_save, sender=Membership)
+def membership_saved(sender, instance, created, **kwargs):
+    if created:
+        publish_membership(instance.chattingroom_id, instance.user_id, True)
+
+
+# also room.users.remove() and clear(), they delete Membership rows
+@receiver(post_delete, sender=Membership)
+def membership_deleted(sender, instance, **kwargs):
+    publish_membership(instance.chattingroom_id, instance.user_id, False)
+
+
+# room.users.add() bulk creates, no post_save
+@receiver(m2m_changed, sender=Membership)
+def members_added(sender, instance, action, reverse, pk_set, **kwargs):
+    if action != "post_add":
+        return
+    for pk in pk_set:
+        if reverse:
+            publish_membership(pk, instance.pk, True)
+        else:
+            publish_membership(instance.pk, pk, True)
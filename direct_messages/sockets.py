@@ -0,0 +1,249 @@
+"""
+WebSocket endpoint of the chat, /ws/dms/ on the ASGI app (config/asgi.py).
+
+After connecting, a user gets every event of the rooms they're in:
+    {"type": "message", "room": pk, "message": {...}}
+    {"type": "typing", "room": pk, "user": username}
+    {"type": "presence", "room": pk, "user": username, "online": bool}
+    {"type": "membership", "room": pk, "member": bool}
+and can send {"type": "typing", "room": pk} and
+    {"type": "message", "room": pk, "text": "...", "nonce": "..."}
+which is acked with {"type": "ack", "nonce": "...", "message": {...}}
+once it is saved (see writer.py).
+
+Authenticates with the session cookie or ?token= (rest_framework authtoken).
+An idle connection is one Connection object, one small queue and two
+suspended coroutines, so a worker can hold a lot of them.
+"""
+
+import asyncio
+import json
+import logging
+from http.cookies import SimpleCookie
+from importlib import import_module
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY
+from django.utils.crypto import constant_time_compare
+
+from rest_framework.authtoken.models import Token
+
+from .models import Membership
+from .pubsub import get_backend, hub, publish, room_channel, user_channel
+from .writer import NotAMember, get_writer
+from users.models import User
+
+logger = logging.getLogger(__name__)
+
+PATH = "/ws/dms/"
+
+
+class Connection:
+    __slots__ = ("send", "queue", "user_pk", "username", "rooms", "memberships")
+
+    def __init__(self, send, user, rooms):
+        self.send = send
+        self.queue = asyncio.Queue(settings.CHAT_SOCKET_QUEUE_SIZE)
+        self.user_pk = user.pk
+        self.username = user.username
+        self.rooms = rooms
+        self.memberships = Memberships(self)
+
+    def push(self, data):
+        if self.queue is None:
+            return
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # too slow to keep up, it will reconnect and load the history
+            self.queue = None
+
+    async def write(self):
+        while self.queue is not None:
+            data = await self.queue.get()
+            await self.send({"type": "websocket.send", "text": data})
+        await self.send({"type": "websocket.close", "code": 4408})
+
+    def subscribe(self):
+        hub.subscribe(user_channel(self.user_pk), self.memberships)
+        for room_pk in self.rooms:
+            hub.subscribe(room_channel(room_pk), self)
+
+    def unsubscribe(self):
+        hub.unsubscribe(user_channel(self.user_pk), self.memberships)
+        for room_pk in self.rooms:
+            hub.unsubscribe(room_channel(room_pk), self)
+
+    def join(self, room_pk):
+        if room_pk not in self.rooms:
+            self.rooms.add(room_pk)
+            hub.subscribe(room_channel(room_pk), self)
+
+    def leave(self, room_pk):
+        self.rooms.discard(room_pk)
+        hub.unsubscribe(room_channel(room_pk), self)
+
+
+class Memberships:
+    """
+    Subscriber of the user's channel (see signals.py): rooms joined or left
+    after connecting are followed right away, and the client is told.
+    """
+
+    __slots__ = ("connection",)
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def push(self, data):
+        event = json.loads(data)
+        if event["member"]:
+            self.connection.join(event["room"])
+        else:
+            self.connection.leave(event["room"])
+        self.connection.push(data)
+
+
+def get_headers(scope):
+    return {
+        name.decode("latin1"): value.decode("latin1")
+        for name, value in scope["headers"]
+    }
+
+
+def trusted_origin(origin):
+    return (
+        origin in settings.CSRF_TRUSTED_ORIGINS
+        or origin in settings.CORS_ALLOWED_ORIGINS
+    )
+
+
+@sync_to_async
+def authenticate(scope):
+    """The user of the socket, None if there is none"""
+    headers = get_headers(scope)
+    token = parse_qs(scope.get("query_string", b"").decode()).get("token")
+    if token:
+        try:
+            user = Token.objects.select_related("user").get(key=token[0]).user
+        except Token.DoesNotExist:
+            return None
+        return user if user.is_active else None
+    cookie = SimpleCookie(headers.get("cookie", ""))
+    session_key = cookie.get(settings.SESSION_COOKIE_NAME)
+    if session_key is None:
+        return None
+    # browsers send cookies from any page, only trust our own front ends
+    origin = headers.get("origin")
+    if origin and not trusted_origin(origin):
+        return None
+    session = import_module(settings.SESSION_ENGINE).SessionStore(session_key.value)
+    try:
+        user = User.objects.get(pk=session.get(SESSION_KEY), is_active=True)
+    except (User.DoesNotExist, ValueError, TypeError):
+        return None
+    # like django.contrib.auth.get_user, a new password ends the old sessions
+    session_hash = session.get(HASH_SESSION_KEY)
+    if not session_hash or not constant_time_compare(
+        session_hash, user.get_session_auth_hash()
+    ):
+        return None
+    return user
+
+
+@sync_to_async
+def member_rooms(user_pk):
+    return set(
+        Membership.objects.filter(user_id=user_pk).values_list(
+            "chattingroom_id", flat=True
+        )
+    )
+
+
+def broadcast(connection, event):
+    for room_pk in connection.rooms:
+        publish(room_channel(room_pk), {"room": room_pk, **event})
+
+
+async def handle(connection, text):
+    try:
+        event = json.loads(text)
+        room_pk = int(event["room"])
+    except (TypeError, ValueError, KeyError):
+        connection.push(json.dumps({"type": "error", "detail": "Invalid event"}))
+        return
+    if room_pk not in connection.rooms:
+        connection.push(json.dumps({"type": "error", "detail": "Not a member"}))
+        return
+    if event.get("type") == "typing":
+        await sync_to_async(publish)(
+            room_channel(room_pk),
+            {"type": "typing", "room": room_pk, "user": connection.username},
+        )
+    elif event.get("type") == "message":
+        text = event.get("text")
+        if not isinstance(text, str) or not text.strip():
+            connection.push(json.dumps({"type": "error", "detail": "Empty message"}))
+            return
+        try:
+            message = await get_writer().write(room_pk, connection.user_pk, text)
+        except NotAMember:
+            # left the room since connecting
+            connection.leave(room_pk)
+            connection.push(json.dumps({"type": "error", "detail": "Not a member"}))
+            return
+        except Exception:
+            logger.exception("Couldn't save a message to room %s", room_pk)
+            connection.push(
+                json.dumps(
+                    {
+                        "type": "error",
+                        "nonce": event.get("nonce"),
+                        "detail": "Message not saved",
+                    }
+                )
+            )
+            return
+        connection.push(
+            json.dumps(
+                {"type": "ack", "nonce": event.get("nonce"), "message": message},
+                default=str,
+            )
+        )
+    else:
+        connection.push(json.dumps({"type": "error", "detail": "Unknown type"}))
+
+
+async def websocket_app(scope, receive, send):
+    event = await receive()
+    if event["type"] != "websocket.connect":
+        return
+    if scope["path"] != PATH:
+        await send({"type": "websocket.close", "code": 4404})
+        return
+    user = await authenticate(scope)
+    if user is None:
+        await send({"type": "websocket.close", "code": 4401})
+        return
+    rooms = await member_rooms(user.pk)
+    await get_backend().start()
+    await send({"type": "websocket.accept"})
+
+    connection = Connection(send, user, rooms)
+    connection.subscribe()
+    writer = asyncio.create_task(connection.write())
+    presence = {"type": "presence", "user": connection.username}
+    await sync_to_async(broadcast)(connection, {**presence, "online": True})
+    try:
+        while True:
+            event = await receive()
+            if event["type"] == "websocket.disconnect":
+                break
+            if event["type"] == "websocket.receive" and event.get("text"):
+                await handle(connection, event["text"])
+    finally:
+        connection.unsubscribe()
+        writer.cancel()
+        await sync_to_async(broadcast)(connection, {**presence, "online": False})
@@ -1,3 +1,465 @@
-from django.test import TestCase
+import asyncio
+import json
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APITestCase
+
+from config.asgi import application
+from config.throttles import store
+from .models import ChattingRoom, Membership, Message, record_messages
+from .pubsub import Hub, RedisBackend
+from .writer import get_writer
+from users.models import User
 
 # Create your tests here.
+
+
+class ChatTestCase(APITestCase):
+    def setUp(self):
+        store.clear()
+        self.user = User.objects.create(username="guest")
+        self.host = User.objects.create(username="host")
+        self.room = ChattingRoom.objects.create()
+        self.room.users.add(self.user, self.host)
+        self.client.force_authenticate(self.user)
+
+    def send(self, text, user=None, room=None):
+        message = Message.objects.create(
+            text=text, user=user or self.user, room=room or self.room
+        )
+        record_messages([message])
+        return message
+
+    def unread(self, user, room=None):
+        return Membership.objects.get(
+            user=user, chattingroom=room or self.room
+        ).unread_count
+
+
+class TestChattingRooms(ChatTestCase):
+    URL = "/api/v1/dms/"
+
+    def test_list(self):
+        other = ChattingRoom.objects.create()
+        other.users.add(self.host)
+
+        # memberships with rooms and last messages, users
+        with self.assertNumQueries(2):
+            data = self.client.get(self.URL).json()
+
+        self.assertEqual([room["pk"] for room in data], [self.room.pk])
+        self.assertEqual(len(data[0]["users"]), 2)
+
+    def test_inbox_most_recent_first(self):
+        other = ChattingRoom.objects.create()
+        other.users.add(self.user, self.host)
+        self.send("first", user=self.host)
+        self.send("second", user=self.host, room=other)
+        self.send("third", user=self.host)
+        self.send("fourth")
+
+        with self.assertNumQueries(2):
+            data = self.client.get(self.URL).json()
+
+        self.assertEqual([room["pk"] for room in data], [self.room.pk, other.pk])
+        self.assertEqual(data[0]["last_message"]["text"], "fourth")
+        self.assertEqual(data[0]["last_message"]["user"]["username"], "guest")
+        # answering reads the room
+        self.assertEqual([room["unread_count"] for room in data], [0, 1])
+        self.assertEqual(self.unread(self.host), 1)
+
+    def test_late_older_message_keeps_the_last_one(self):
+        newer = self.send("newer", user=self.host)
+        older = Message.objects.create(
+            text="older",
+            user=self.user,
+            room=self.room,
+        )
+        Message.objects.filter(pk=older.pk).update(
+            created_at=newer.created_at - timedelta(seconds=1)
+        )
+        older.refresh_from_db()
+        # a guest's cursor already past it
+        Membership.objects.filter(user=self.user).update(last_read_message=newer)
+
+        record_messages([older])
+
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.last_message, newer)
+        self.assertEqual(self.room.last_message_at, newer.created_at)
+        membership = Membership.objects.get(user=self.user)
+        self.assertEqual(membership.last_message_at, newer.created_at)
+        self.assertEqual(membership.last_read_message, newer)
+        self.assertEqual(self.unread(self.host), 1)
+
+    def test_create(self):
+        response = self.client.post(self.URL, {"users": [self.host.pk]}, format="json")
+
+        self.assertEqual(response.status_code, 201)
+        room = ChattingRoom.objects.get(pk=response.json()["pk"])
+        self.assertEqual(set(room.users.all()), {self.user, self.host})
+
+        response = self.client.post(self.URL, {"users": [999]}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class TestMessages(ChatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.URL = f"/api/v1/dms/{self.room.pk}/messages"
+
+    def test_history_newest_first(self):
+        messages = [self.send(f"hi {i}") for i in range(5)]
+
+        pks, params = [], {"page_size": 2}
+        while True:
+            # membership, messages with users
+            with self.assertNumQueries(2):
+                data = self.client.get(self.URL, params).json()
+            pks.extend(message["pk"] for message in data["results"])
+            if not data["next"]:
+                break
+            params["cursor"] = data["next"]
+
+        self.assertEqual(pks, [message.pk for message in reversed(messages)])
+
+    def test_post(self):
+        response = self.client.post(self.URL, {"text": "hello"})
+
+        self.assertEqual(response.status_code, 201)
+        message = Message.objects.get()
+        self.assertEqual((message.text, message.user), ("hello", self.user))
+
+    def test_post_counts_unread(self):
+        self.client.post(self.URL, {"text": "hello"})
+        self.client.post(self.URL, {"text": "anyone?"})
+
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.last_message.text, "anyone?")
+        self.assertEqual((self.unread(self.user), self.unread(self.host)), (0, 2))
+
+    def test_only_members(self):
+        self.client.force_authenticate(User.objects.create(username="stranger"))
+
+        self.assertEqual(self.client.get(self.URL).status_code, 404)
+        self.assertEqual(self.client.post(self.URL, {"text": "hi"}).status_code, 404)
+        self.assertEqual(
+            self.client.put(f"/api/v1/dms/{self.room.pk}/read").status_code, 404
+        )
+
+
+class TestRead(ChatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.URL = f"/api/v1/dms/{self.room.pk}/read"
+        self.messages = [self.send(f"hi {i}", user=self.host) for i in range(3)]
+
+    def test_read_all(self):
+        self.assertEqual(self.unread(self.user), 3)
+
+        data = self.client.put(self.URL).json()
+
+        self.assertEqual(data["last_read_message"], self.messages[-1].pk)
+        self.assertEqual(self.unread(self.user), 0)
+
+    def test_read_up_to(self):
+        self.send("mine")
+
+        response = self.client.put(
+            self.URL, {"message": self.messages[0].pk}, format="json"
+        )
+
+        # own messages never count
+        self.assertEqual(response.json()["unread_count"], 2)
+        self.assertEqual(self.unread(self.user), 2)
+
+        other = ChattingRoom.objects.create()
+        other.users.add(self.user)
+        message = self.send("elsewhere", room=other)
+        response = self.client.put(self.URL, {"message": message.pk}, format="json")
+        self.assertEqual(response.status_code, 400)
+
+
+class Socket:
+    """Just enough of an ASGI server to talk to /ws/dms/"""
+
+    def __init__(self, query_string=b"", headers=()):
+        self.inbox = asyncio.Queue()
+        self.outbox = asyncio.Queue()
+        scope = {
+            "type": "websocket",
+            "path": "/ws/dms/",
+            "query_string": query_string,
+            "headers": list(headers),
+        }
+        self.task = asyncio.create_task(
+            application(scope, self.inbox.get, self.outbox.put)
+        )
+
+    async def connect(self):
+        await self.inbox.put({"type": "websocket.connect"})
+        return await self.next()
+
+    async def next(self):
+        return await asyncio.wait_for(self.outbox.get(), 1)
+
+    async def next_json(self):
+        return json.loads((await self.next())["text"])
+
+    async def send_json(self, data):
+        await self.inbox.put({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def close(self):
+        await self.inbox.put({"type": "websocket.disconnect"})
+        await asyncio.wait_for(self.task, 1)
+
+
+class TestSockets(ChatTestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = Token.objects.create(user=self.user).key
+        self.host_token = Token.objects.create(user=self.host).key
+
+    async def connect(self, token):
+        socket = Socket(f"token={token}".encode())
+        self.assertEqual((await socket.connect())["type"], "websocket.accept")
+        # its own presence
+        self.assertEqual((await socket.next_json())["type"], "presence")
+        return socket
+
+    async def test_new_messages_are_pushed(self):
+        socket = await self.connect(self.token)
+
+        def post():
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    f"/api/v1/dms/{self.room.pk}/messages", {"text": "hello"}
+                )
+
+        await sync_to_async(post)()
+
+        event = await socket.next_json()
+        self.assertEqual(event["type"], "message")
+        self.assertEqual(event["room"], self.room.pk)
+        self.assertEqual(event["message"]["text"], "hello")
+        await socket.close()
+
+    async def test_messages_are_acked_once_saved(self):
+        guest = await self.connect(self.token)
+
+        for i in range(3):
+            await guest.send_json(
+                {"type": "message", "room": self.room.pk, "text": f"hi {i}", "nonce": i}
+            )
+        acks = []
+        while len(acks) < 3:
+            event = await guest.next_json()
+            if event["type"] == "ack":
+                acks.append(event)
+
+        self.assertEqual([ack["nonce"] for ack in acks], [0, 1, 2])
+        saved = await sync_to_async(
+            lambda: list(Message.objects.order_by("pk").values_list("pk", "text"))
+        )()
+        self.assertEqual(
+            saved, [(ack["message"]["pk"], f"hi {i}") for i, ack in enumerate(acks)]
+        )
+        self.assertEqual(await sync_to_async(self.unread)(self.host), 3)
+        await guest.close()
+
+    async def test_writes_are_batched(self):
+        other = await sync_to_async(ChattingRoom.objects.create)()
+        await sync_to_async(other.users.add)(self.user, self.host)
+        writer = get_writer()
+        sends = [
+            writer.write(room.pk, user.pk, "hello")
+            for room in (self.room, other)
+            for user in (self.user, self.host)
+        ]
+
+        # the connection lives in the thread of sync_to_async
+        queries = CaptureQueriesContext(connection)
+        await sync_to_async(queries.__enter__)()
+        messages = await asyncio.gather(*sends)
+        await sync_to_async(queries.__exit__)(None, None, None)
+        count = await sync_to_async(lambda: len(queries.captured_queries))()
+
+        # savepoint, members, insert, rooms, memberships, release, users
+        self.assertEqual(count, 7)
+        self.assertEqual(len({message["pk"] for message in messages}), 4)
+        self.assertEqual(await sync_to_async(self.unread)(self.user, other), 1)
+
+    async def test_failed_batch_is_saved_one_by_one(self):
+        writer = get_writer()
+
+        results = await asyncio.gather(
+            writer.write(self.room.pk, self.user.pk, "before"),
+            writer.write(self.room.pk, self.user.pk, None),
+            writer.write(self.room.pk, self.host.pk, "after"),
+            return_exceptions=True,
+        )
+
+        self.assertIsInstance(results[1], IntegrityError)
+        self.assertEqual([results[0]["text"], results[2]["text"]], ["before", "after"])
+        self.assertEqual(await sync_to_async(Message.objects.count)(), 2)
+
+    async def test_publish_errors_keep_the_message(self):
+        with mock.patch(
+            "direct_messages.writer.publish", side_effect=ConnectionError
+        ), self.assertLogs("direct_messages.writer", "ERROR"):
+            message = await get_writer().write(self.room.pk, self.user.pk, "hi")
+
+        self.assertEqual(message["text"], "hi")
+        self.assertEqual(await sync_to_async(Message.objects.count)(), 1)
+
+    async def test_left_the_room_since_connecting(self):
+        socket = await self.connect(self.token)
+        await sync_to_async(
+            Membership.objects.filter(user=self.user, chattingroom=self.room).delete
+        )()
+
+        await socket.send_json({"type": "message", "room": self.room.pk, "text": "hi"})
+
+        self.assertEqual((await socket.next_json())["detail"], "Not a member")
+        self.assertEqual(await sync_to_async(Message.objects.count)(), 0)
+        await socket.close()
+
+    async def test_write_errors_are_sent_back(self):
+        socket = await self.connect(self.token)
+
+        with mock.patch(
+            "direct_messages.writer.save_messages", side_effect=DatabaseError
+        ), self.assertLogs("direct_messages.sockets", "ERROR"):
+            await socket.send_json(
+                {"type": "message", "room": self.room.pk, "text": "hi", "nonce": 7}
+            )
+            event = await socket.next_json()
+
+        self.assertEqual(
+            event, {"type": "error", "nonce": 7, "detail": "Message not saved"}
+        )
+        await socket.close()
+
+    async def test_new_rooms_are_followed_live(self):
+        socket = await self.connect(self.token)
+        other = await sync_to_async(User.objects.create)(username="other")
+
+        def create_room():
+            with self.captureOnCommitCallbacks(execute=True):
+                return self.client.post(
+                    "/api/v1/dms/", {"users": [other.pk]}, format="json"
+                ).json()["pk"]
+
+        room_pk = await sync_to_async(create_room)()
+
+        event = await socket.next_json()
+        self.assertEqual(event, {"type": "membership", "room": room_pk, "member": True})
+        await socket.send_json({"type": "typing", "room": room_pk})
+        event = await socket.next_json()
+        self.assertEqual((event["type"], event["room"]), ("typing", room_pk))
+        await socket.close()
+
+    async def test_typing_and_presence(self):
+        guest = await self.connect(self.token)
+        host = await self.connect(self.host_token)
+        event = await guest.next_json()
+        self.assertEqual((event["type"], event["user"]), ("presence", "host"))
+
+        await host.send_json({"type": "typing", "room": self.room.pk})
+        event = await guest.next_json()
+        self.assertEqual((event["type"], event["user"]), ("typing", "host"))
+
+        await host.close()
+        event = await guest.next_json()
+        self.assertEqual((event["type"], event["online"]), ("presence", False))
+        await guest.close()
+
+    async def test_not_a_member(self):
+        socket = await self.connect(self.token)
+
+        await socket.send_json({"type": "typing", "room": 999})
+
+        self.assertEqual((await socket.next_json())["detail"], "Not a member")
+        await socket.close()
+
+    async def test_anonymous_is_refused(self):
+        socket = Socket(b"token=wrong")
+
+        event = await socket.connect()
+
+        self.assertEqual(event, {"type": "websocket.close", "code": 4401})
+
+    async def test_session_from_other_origin_is_refused(self):
+        await sync_to_async(self.client.force_login)(self.user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={self.client.session.session_key}"
+
+        socket = Socket(headers=[(b"cookie", cookie.encode())])
+        self.assertEqual((await socket.connect())["type"], "websocket.accept")
+        await socket.close()
+
+        socket = Socket(
+            headers=[
+                (b"cookie", cookie.encode()),
+                (b"origin", b"https://evil.example"),
+            ]
+        )
+        self.assertEqual((await socket.connect())["code"], 4401)
+
+    async def test_old_password_session_is_refused(self):
+        await sync_to_async(self.client.force_login)(self.user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={self.client.session.session_key}"
+
+        def change_password():
+            self.user.set_password("new password")
+            self.user.save()
+
+        await sync_to_async(change_password)()
+
+        socket = Socket(headers=[(b"cookie", cookie.encode())])
+        self.assertEqual((await socket.connect())["code"], 4401)
+
+    async def test_inactive_user_is_refused(self):
+        await sync_to_async(self.client.force_login)(self.user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={self.client.session.session_key}"
+        await sync_to_async(User.objects.filter(pk=self.user.pk).update)(
+            is_active=False
+        )
+
+        socket = Socket(f"token={self.token}".encode())
+        self.assertEqual((await socket.connect())["code"], 4401)
+        socket = Socket(headers=[(b"cookie", cookie.encode())])
+        self.assertEqual((await socket.connect())["code"], 4401)
+
+
+class TestRedisBackend(APITestCase):
+    async def test_listener_reconnects(self):
+        attempts = []
+
+        async def subscribe():
+            attempts.append(len(attempts))
+            if len(attempts) == 1:
+                raise ConnectionError("Redis went away")
+            yield {"type": "pmessage", "channel": b"chat:room:1", "data": b"{}"}
+            await asyncio.Event().wait()
+
+        hub = Hub()
+        delivered = asyncio.Queue()
+        hub.deliver = lambda channel, data: delivered.put_nowait((channel, data))
+        backend = RedisBackend(hub)
+        backend.retry_delay = 0
+        backend.subscribe = subscribe
+
+        with self.assertLogs("direct_messages.pubsub", "ERROR"):
+            await backend.start()
+            event = await asyncio.wait_for(delivered.get(), 1)
+
+        self.assertEqual(event, ("room:1", "{}"))
+        self.assertEqual(len(attempts), 2)
+        backend.listener.cancel()
@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .views import ChattingRooms, ChattingRoomMessages, ChattingRoomRead
+
+urlpatterns = [
+    path("", ChattingRooms.as_view()),
+    path("<int:pk>/messages", ChattingRoomMessages.as_view()),
+    path("<int:pk>/read", ChattingRoomRead.as_view()),
+]
@@ -1,3 +1,129 @@
-from django.shortcuts import render
+from django.db import transaction
+from django.db.models import Q
+
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST
+
+from common.paginations import KeysetPagination
+from .models import ChattingRoom, Membership, Message, record_messages
+from .pubsub import publish_on_commit, room_channel
+from .serializers import ChattingRoomSerializer, InboxSerializer, MessageSerializer
+from users.models import User
 
 # Create your views here.
+
+
+class ChattingRooms(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """The inbox, most recent conversation first"""
+        # (user, -last_message_at) index, last message joined in
+        memberships = (
+            Membership.objects.filter(user=request.user)
+            .select_related("chattingroom__last_message__user")
+            .prefetch_related("chattingroom__users")
+            .order_by("-last_message_at", "-pk")
+        )
+        serializer = InboxSerializer(memberships, many=True)
+        return Response(serializer.data)
+
+    def post(self, request):
+        """{"users": [pk, ...]} besides the requesting user"""
+        user_pks = request.data.get("users")
+        if not isinstance(user_pks, list) or not user_pks:
+            raise ParseError("users should be a list of user pks")
+        try:
+            user_pks = {int(pk) for pk in user_pks} - {request.user.pk}
+        except (TypeError, ValueError):
+            raise ParseError("users should be a list of user pks")
+        if not user_pks or User.objects.filter(pk__in=user_pks).count() != len(
+            user_pks
+        ):
+            raise ParseError("Unknown users")
+        with transaction.atomic():
+            room = ChattingRoom.objects.create()
+            room.users.add(request.user, *user_pks)
+        serializer = ChattingRoomSerializer(room)
+        return Response(serializer.data, status=HTTP_201_CREATED)
+
+
+class ChattingRoomMessages(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def check_member(self, pk, user):
+        if not ChattingRoom.is_member(pk, user.pk):
+            raise NotFound
+
+    def get(self, request, pk):
+        self.check_member(pk, request.user)
+        # ?cursor=&page_size=, newest first along (room, created_at, id)
+        paginator = KeysetPagination(ordering=("-created_at", "-pk"))
+        messages = paginator.paginate_queryset(
+            Message.objects.filter(room_id=pk).select_related("user"),
+            request,
+        )
+        serializer = MessageSerializer(messages, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    def post(self, request, pk):
+        self.check_member(pk, request.user)
+        serializer = MessageSerializer(data=request.data)
+        if serializer.is_valid():
+            with transaction.atomic():
+                message = serializer.save(room_id=pk, user=request.user)
+                record_messages([message])
+            serializer = MessageSerializer(message)
+            publish_on_commit(
+                room_channel(pk),
+                {"type": "message", "room": pk, "message": serializer.data},
+            )
+            return Response(serializer.data, status=HTTP_201_CREATED)
+        else:
+            return Response(serializer.errors, status=HTTP_400_BAD_REQUEST)
+
+
+class ChattingRoomRead(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, pk):
+        """
+        Moves the read cursor, to {"message": pk} or to the last message.
+        Only recounts when reading up to a message in the middle.
+        """
+        try:
+            membership = Membership.objects.select_related("chattingroom").get(
+                chattingroom_id=pk,
+                user=request.user,
+            )
+        except Membership.DoesNotExist:
+            raise NotFound
+        message_pk = request.data.get("message")
+        if message_pk is None:
+            membership.last_read_message_id = membership.chattingroom.last_message_id
+            membership.unread_count = 0
+        else:
+            try:
+                message = Message.objects.get(pk=message_pk, room_id=pk)
+            except (Message.DoesNotExist, TypeError, ValueError):
+                raise ParseError("Unknown message")
+            membership.last_read_message = message
+            membership.unread_count = (
+                Message.objects.filter(room_id=pk)
+                .filter(
+                    Q(created_at__gt=message.created_at)
+                    | Q(created_at=message.created_at, pk__gt=message.pk)
+                )
+                .exclude(user=request.user)
+                .count()
+            )
+        membership.save(update_fields=["last_read_message", "unread_count"])
+        return Response(
+            {
+                "last_read_message": membership.last_read_message_id,
+                "unread_count": membership.unread_count,
+            }
+        )
@@ -0,0 +1,162 @@
+"""
+Buffered message writes for the WebSocket path.
+
+Messages sent over sockets of a worker wait in a buffer for at most
+CHAT_WRITE_DELAY seconds (or until CHAT_WRITE_BATCH_SIZE of them), then
+one transaction saves the whole batch: a bulk INSERT of the messages plus
+one UPDATE of the rooms and one of the memberships (record_messages()).
+write() returns once that transaction is committed, so a client is only
+acked for messages that are in the database.
+
+Senders are checked against the memberships of the batch, they might have
+left the room since their socket connected. When the batch fails as a
+whole, its messages are saved again one by one so one bad message only
+fails its own write(). Publishing comes after, a message that couldn't be
+published is still saved and acked (the others load it with the history).
+"""
+
+import asyncio
+import logging
+from functools import reduce
+from operator import or_
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, prefetch_related_objects
+
+from .models import Membership, Message, record_messages
+from .pubsub import publish, room_channel
+from .serializers import MessageSerializer
+
+logger = logging.getLogger(__name__)
+
+
+class NotAMember(Exception):
+    pass
+
+
+def save_messages(messages):
+    """
+    Saves a batch in one transaction, returns for each message the saved
+    Message or NotAMember.
+    """
+    pairs = {(message.room_id, message.user_id) for message in messages}
+    with transaction.atomic():
+        members = set(
+            Membership.objects.filter(
+                reduce(or_, [Q(chattingroom_id=r, user_id=u) for r, u in pairs])
+            ).values_list("chattingroom_id", "user_id")
+        )
+        saved = Message.objects.bulk_create(
+            [
+                message
+                for message in messages
+                if (message.room_id, message.user_id) in members
+            ]
+        )
+        record_messages(saved)
+    return [
+        message if (message.room_id, message.user_id) in members else NotAMember()
+        for message in messages
+    ]
+
+
+def publish_messages(results):
+    """
+    Publishes the saved messages of save_messages() results, returns the
+    results with the messages serialized. Publishing errors are only logged,
+    the messages are in the database already.
+    """
+    saved = [result for result in results if isinstance(result, Message)]
+    prefetch_related_objects(saved, "user")
+    data = MessageSerializer(saved, many=True).data
+    for message, message_data in zip(saved, data):
+        try:
+            publish(
+                room_channel(message.room_id),
+                {"type": "message", "room": message.room_id, "message": message_data},
+            )
+        except Exception:
+            logger.exception("Couldn't publish message %s", message.pk)
+    data = iter(data)
+    return [next(data) if isinstance(result, Message) else result for result in results]
+
+
+def save_each(messages):
+    results = []
+    for message in messages:
+        # a copy, the failed batch may have given it a pk
+        message = Message(
+            room_id=message.room_id, user_id=message.user_id, text=message.text
+        )
+        try:
+            results.extend(save_messages([message]))
+        except Exception as error:
+            results.append(error)
+    return results
+
+
+class MessageWriter:
+    def __init__(self, delay, batch_size):
+        self.loop = asyncio.get_running_loop()
+        self.delay = delay
+        self.batch_size = batch_size
+        self.buffer = []
+        self.full = asyncio.Event()
+        self.flusher = None
+
+    async def write(self, room_pk, user_pk, text):
+        """Buffers one message, returns its serialized data once committed"""
+        future = self.loop.create_future()
+        self.buffer.append(
+            (Message(room_id=room_pk, user_id=user_pk, text=text), future)
+        )
+        if self.flusher is None:
+            self.flusher = asyncio.create_task(self.flush_later())
+        if len(self.buffer) >= self.batch_size:
+            self.full.set()
+        return await future
+
+    async def flush_later(self):
+        try:
+            await asyncio.wait_for(self.full.wait(), self.delay)
+        except asyncio.TimeoutError:
+            pass
+        # what arrives from now on goes to the next batch
+        batch, self.buffer = self.buffer, []
+        self.full.clear()
+        self.flusher = None
+        messages = [message for message, _ in batch]
+        try:
+            results = await sync_to_async(save_messages)(messages)
+        except Exception:
+            # the transaction failed, nothing of the batch is saved
+            results = await sync_to_async(save_each)(messages)
+        try:
+            results = await sync_to_async(publish_messages)(results)
+        except Exception as error:
+            # saved but not serialized, never leave a write() waiting
+            logger.exception("Couldn't load the saved messages")
+            results = [error] * len(batch)
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+writer = None
+
+
+def get_writer():
+    """The writer of the running event loop"""
+    global writer
+    if writer is None or writer.loop is not asyncio.get_running_loop():
+        writer = MessageWriter(
+            settings.CHAT_WRITE_DELAY,
+            settings.CHAT_WRITE_BATCH_SIZE,
+        )
+    return writer
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.3 on 2026-10-19 17:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        (
+            "experiences",
+            "0003_alter_experience_category_alter_experience_host_and_more",
+        ),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="experience",
+            name="max_guests",
+            field=models.PositiveIntegerField(default=10),
+        ),
+        migrations.AddIndex(
+            model_name="experience",
+            index=models.Index(
+                fields=["city", "price"], name="experiences_city_cc9d69_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="experience",
+            index=models.Index(fields=["price"], name="experiences_price_2dd01a_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="experience",
+            index=models.Index(
+                fields=["start", "end"], name="experiences_start_e1510c_idx"
+            ),
+        ),
+    ]
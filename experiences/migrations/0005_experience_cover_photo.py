@@ -0,0 +1,37 @@
+# Generated by Django 4.2.3 on 2026-10-19 17:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_cover_photos(apps, schema_editor):
+    Experience = apps.get_model("experiences", "Experience")
+    Photo = apps.get_model("medias", "Photo")
+    first = (
+        Photo.objects.filter(experience=models.OuterRef("pk"))
+        .order_by("position", "pk")
+        .values("pk")[:1]
+    )
+    Experience.objects.update(cover_photo=models.Subquery(first))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("medias", "0005_alter_photo_options_photo_position"),
+        ("experiences", "0004_experience_max_guests_search_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="experience",
+            name="cover_photo",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="medias.photo",
+            ),
+        ),
+        migrations.RunPython(set_cover_photos, migrations.RunPython.noop),
+    ]
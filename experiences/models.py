@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.exceptions import ObjectDoesNotExist
 from common.models import CommonModel
 
 # Create your models here.
@@ -30,6 +31,7 @@ class Experience(CommonModel):
     )
     start = models.TimeField()
     end = models.TimeField()
+    max_guests = models.PositiveIntegerField(default=10)
     description = models.TextField()
     perks = models.ManyToManyField(
         "experiences.Perk",
@@ -42,19 +44,34 @@ class Experience(CommonModel):
         on_delete=models.SET_NULL,
         related_name="experiences",
     )
+    # the first of photos, kept up to date by medias.signals
+    cover_photo = models.ForeignKey(
+        "medias.Photo",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
 
     def __str__(self) -> str:
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["city", "price"]),
+            models.Index(fields=["price"]),
+            models.Index(fields=["start", "end"]),
+        ]
+
     def rating(experience):
-        count = experience.reviews.count()
-        if count == 0:
+        # list views annotate the average in the same query (avg_rating)
+        if hasattr(experience, "avg_rating"):
+            return round(experience.avg_rating or 0, 1)
+        # otherwise the histogram has it, no scan over the reviews
+        try:
+            return experience.rating_histogram.average
+        except ObjectDoesNotExist:
             return 0
-        else:
-            total_rating = 0
-            for review in experience.reviews.all().values("rating"):
-                total_rating += review["rating"]
-            return round(total_rating / count, 1)
 
 
 class Perk(CommonModel):
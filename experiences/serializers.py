@@ -4,6 +4,9 @@ from .models import Perk, Experience
 from users.serializers import TinyUserSerializer
 from categories.serializers import CategorySerializer
 from medias.serializers import PhotoSerializer, VideoSerializer
+from wishlists.liked import liked_for
+from reviews.models import RatingHistogram
+from reviews.serializers import RatingHistogramSerializer
 
 
 class PerkSerializer(serializers.ModelSerializer):
@@ -19,7 +22,9 @@ class PerkSerializer(serializers.ModelSerializer):
 
 class ExperienceListSerializer(serializers.ModelSerializer):
     is_host = serializers.SerializerMethodField()
+    is_liked = serializers.SerializerMethodField()
     videos = VideoSerializer(read_only=True)
+    cover_photo = PhotoSerializer(read_only=True)
     rating = serializers.SerializerMethodField()
 
     class Meta:
@@ -28,6 +33,7 @@ class ExperienceListSerializer(serializers.ModelSerializer):
             "pk",
             "rating",
             "is_host",
+            "is_liked",
             "country",
             "city",
             "name",
@@ -37,11 +43,15 @@ class ExperienceListSerializer(serializers.ModelSerializer):
             "end",
             "description",
             "videos",
+            "cover_photo",
         )
 
     def get_is_host(self, experience):
         request = self.context["request"]
-        return experience.host == request.user
+        return experience.host_id == request.user.pk
+
+    def get_is_liked(self, experience):
+        return experience.pk in liked_for(self.context).experiences
 
     def get_rating(self, experience):
         return experience.rating()
@@ -51,7 +61,9 @@ class ExperienceDetailSerializer(serializers.ModelSerializer):
     host = TinyUserSerializer(read_only=True)
     category = CategorySerializer(read_only=True)
     is_host = serializers.SerializerMethodField()
+    is_liked = serializers.SerializerMethodField()
     rating = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
     videos = VideoSerializer(
         read_only=True,
     )
@@ -70,7 +82,26 @@ class ExperienceDetailSerializer(serializers.ModelSerializer):
 
     def get_is_host(self, experience):
         request = self.context["request"]
-        return experience.host == request.user
+        return experience.host_id == request.user.pk
+
+    def get_is_liked(self, experience):
+        return experience.pk in liked_for(self.context).experiences
 
     def get_rating(self, experience):
         return experience.rating()
+
+    def get_rating_histogram(self, experience):
+        return RatingHistogramSerializer(RatingHistogram.of(experience)).data
+
+
+class TinyExperienceSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Experience
+        fields = (
+            "pk",
+            "name",
+            "country",
+            "city",
+            "price",
+            "rating",
+        )
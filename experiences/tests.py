@@ -1,3 +1,225 @@
-from django.test import TestCase
+import base64
+import json
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+from config.throttles import store
+from . import models
+from users.models import User
+from reviews.models import Review
+from medias.models import Photo, Video
+from bookings.models import Booking
 
 # Create your tests here.
+
+
+class ExperienceTestCase(APITestCase):
+    def setUp(self):
+        store.clear()
+        self.host = User.objects.create(username="host")
+
+    def create_experience(self, **kwargs):
+        fields = {
+            "name": "Experience",
+            "host": self.host,
+            "price": 10,
+            "address": "Seoul",
+            "start": "10:00",
+            "end": "12:00",
+            "description": "",
+        }
+        fields.update(kwargs)
+        return models.Experience.objects.create(**fields)
+
+
+class TestExperiences(ExperienceTestCase):
+    URL = "/api/v1/experiences/"
+
+    def setUp(self):
+        super().setUp()
+        guest = User.objects.create(username="guest")
+        for i in range(3):
+            experience = self.create_experience(name=f"Experience {i}")
+            Video.objects.create(experience=experience, file="http://video.com")
+            Review.objects.create(
+                user=guest,
+                experience=experience,
+                payload="",
+                rating=3 + i,
+            )
+            Review.objects.create(
+                user=guest,
+                experience=experience,
+                payload="",
+                rating=4,
+            )
+        self.create_experience(name="No video, no reviews")
+
+    def test_list_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.URL)
+
+        # the list has no ordering, look experiences up by name
+        data = {experience["name"]: experience for experience in response.json()}
+        self.assertEqual(len(data), 4)
+        self.assertEqual(data["Experience 0"]["rating"], 3.5)
+        self.assertEqual(data["Experience 0"]["videos"]["file"], "http://video.com")
+        self.assertEqual(data["No video, no reviews"]["rating"], 0)
+        self.assertIsNone(data["No video, no reviews"]["videos"])
+
+    def test_is_host(self):
+        self.client.force_authenticate(self.host)
+
+        data = self.client.get(self.URL).json()
+
+        self.assertTrue(all(experience["is_host"] for experience in data))
+
+
+class TestExperienceDetail(ExperienceTestCase):
+    def test_detail_queries(self):
+        experience = self.create_experience()
+        perk = models.Perk.objects.create(name="Lunch")
+        experience.perks.add(perk)
+        Photo.objects.create(experience=experience, file="http://photo.com")
+
+        # experience, perks, photos
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/v1/experiences/{experience.pk}/")
+
+        data = response.json()
+        self.assertEqual(data["perks"][0]["name"], "Lunch")
+        self.assertEqual(len(data["photos"]), 1)
+        self.assertEqual(data["host"]["username"], "host")
+
+
+class TestExperienceSearch(ExperienceTestCase):
+    URL = "/api/v1/experiences/"
+
+    def setUp(self):
+        super().setUp()
+        self.lunch = models.Perk.objects.create(name="Lunch")
+        self.drinks = models.Perk.objects.create(name="Drinks")
+        self.morning = self.create_experience(
+            name="Morning",
+            city="Busan",
+            price=30,
+            start="09:00",
+            end="11:00",
+            max_guests=2,
+        )
+        self.morning.perks.add(self.lunch, self.drinks)
+        self.evening = self.create_experience(
+            name="Evening",
+            price=80,
+            start="18:00",
+            end="21:00",
+        )
+        self.evening.perks.add(self.lunch)
+
+    def search(self, **params):
+        response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200)
+        # the results have no ordering
+        return {experience["name"] for experience in response.json()}
+
+    def test_city_and_price(self):
+        self.assertEqual(self.search(city="Busan"), {"Morning"})
+        self.assertEqual(self.search(min_price=50), {"Evening"})
+        self.assertEqual(self.search(max_price=50), {"Morning"})
+
+    def test_time_window(self):
+        self.assertEqual(self.search(start="08:00", end="12:00"), {"Morning"})
+        self.assertEqual(self.search(start="17:00"), {"Evening"})
+
+    def test_all_perks(self):
+        perks = f"{self.lunch.pk},{self.drinks.pk}"
+
+        self.assertEqual(self.search(perks=perks), {"Morning"})
+        self.assertEqual(self.search(perks=self.lunch.pk), {"Morning", "Evening"})
+
+    def test_sold_out_date(self):
+        day = timezone.localdate() + timedelta(days=3)
+        Booking.objects.create(
+            user=self.host,
+            kind=Booking.BookingKindChoices.EXPERIENCES,
+            experience=self.morning,
+            experience_time=timezone.make_aware(datetime.combine(day, time(9))),
+            guests=2,
+        )
+
+        self.assertEqual(self.search(date=day.isoformat()), {"Evening"})
+        next_day = (day + timedelta(days=1)).isoformat()
+        self.assertEqual(self.search(date=next_day, guests=2), {"Morning", "Evening"})
+
+    def test_invalid_parameters(self):
+        response = self.client.get(self.URL, {"start": "noon"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class TestExperienceBookings(ExperienceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.experience = self.create_experience()
+        self.URL = f"/api/v1/experiences/{self.experience.pk}/bookings"
+        tomorrow = timezone.now() + timedelta(days=1)
+        # two bookings share every experience_time
+        for i in range(6):
+            Booking.objects.create(
+                user=self.host,
+                kind=Booking.BookingKindChoices.EXPERIENCES,
+                experience=self.experience,
+                experience_time=tomorrow + timedelta(hours=i // 2),
+                guests=1,
+            )
+        Booking.objects.create(
+            user=self.host,
+            kind=Booking.BookingKindChoices.EXPERIENCES,
+            experience=self.experience,
+            experience_time=timezone.now() - timedelta(days=1),
+            guests=1,
+        )
+
+    def test_cursor_pagination(self):
+        seen = []
+        params = {"page_size": 4}
+        while True:
+            data = self.client.get(self.URL, params).json()
+            seen.extend(booking["pk"] for booking in data["results"])
+            if not data["next"]:
+                break
+            params["cursor"] = data["next"]
+
+        upcoming = Booking.objects.filter(
+            experience_time__gte=timezone.now(),
+        ).order_by("experience_time", "pk")
+        self.assertEqual(seen, [booking.pk for booking in upcoming])
+
+    def test_page_size_is_capped(self):
+        with self.settings(MAX_PAGE_SIZE=5):
+            data = self.client.get(self.URL, {"page_size": 100}).json()
+
+        self.assertEqual(len(data["results"]), 5)
+        self.assertIsNotNone(data["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.URL, {"cursor": "nope"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_malformed_cursor_values(self):
+        for values in (
+            ["tomorrow", 1],
+            [timezone.now().isoformat(), "one"],
+            [timezone.now().isoformat(), None],
+            [{"a": 1}, [1]],
+        ):
+            cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+            response = self.client.get(self.URL, {"cursor": cursor})
+
+            self.assertEqual(response.status_code, 400, values)
+            self.assertEqual(response.json()["detail"], "Invalid cursor")
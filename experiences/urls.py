@@ -6,6 +6,7 @@ urlpatterns = [
     path("<int:pk>/", views.ExperienceDetail.as_view()),
     path("<int:pk>/perks", views.ExperiencePerks.as_view()),
     path("<int:pk>/reviews", views.ExperienceReviews.as_view()),
+    path("<int:pk>/reviews/summary", views.ExperienceReviewSummary.as_view()),
     path("<int:pk>/photos", views.ExperiencePhotos.as_view()),
     path("<int:pk>/video", views.ExperienceVideo.as_view()),
     path("<int:pk>/bookings", views.ExperienceBookings.as_view()),
@@ -1,4 +1,8 @@
+from datetime import date, datetime, time, timedelta
+
 from django.db import transaction
+from django.db.models import Avg, Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.utils import timezone
 
@@ -11,12 +15,15 @@ from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnl
 
 from .models import Perk, Experience
 from categories.models import Category
+from common import reference
 from .serializers import (
     PerkSerializer,
     ExperienceListSerializer,
     ExperienceDetailSerializer,
 )
-from reviews.serializers import ReviewSerializer
+from reviews.models import RatingHistogram
+from reviews.serializers import ReviewSerializer, RatingHistogramSerializer
+from reviews.views import review_feed
 from medias.serializers import PhotoSerializer, VideoSerializer
 from bookings.serializers import (
     PublicBookingSerializer,
@@ -24,15 +31,14 @@ from bookings.serializers import (
 )
 from medias.models import Video
 from bookings.models import Booking
+from common.paginations import KeysetPagination
 
 # Create your views here.
 
 
 class Perks(APIView):
     def get(self, request):
-        all_perks = Perk.objects.all()
-        serializer = PerkSerializer(all_perks, many=True)
-        return Response(serializer.data)
+        return reference.perks.list_response(request, PerkSerializer)
 
     def post(self, request):
         serializer = PerkSerializer(data=request.data)
@@ -76,8 +82,71 @@ class PerkDetail(APIView):
 class Experiences(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+    def search(self, request, experiences):
+        """
+        ?city=&min_price=&max_price=
+        &start=10:00&end=18:00  (experience happens inside these hours)
+        &date=2024-12-24&guests=2  (still has room for the guests on that day)
+        &perks=1,2,3  (has all of these perks)
+        """
+        params = request.query_params
+        try:
+            city = params.get("city")
+            if city:
+                experiences = experiences.filter(city=city)
+            if params.get("min_price"):
+                experiences = experiences.filter(price__gte=int(params["min_price"]))
+            if params.get("max_price"):
+                experiences = experiences.filter(price__lte=int(params["max_price"]))
+            if params.get("start"):
+                experiences = experiences.filter(
+                    start__gte=time.fromisoformat(params["start"])
+                )
+            if params.get("end"):
+                experiences = experiences.filter(
+                    end__lte=time.fromisoformat(params["end"])
+                )
+            if params.get("date"):
+                day = date.fromisoformat(params["date"])
+                guests = int(params.get("guests", 1))
+                day_start = timezone.make_aware(datetime.combine(day, time.min))
+                # 그날 예약된 인원을 합쳐서 자리가 남은 experience만
+                booked_guests = (
+                    Booking.objects.filter(
+                        experience=OuterRef("pk"),
+                        kind=Booking.BookingKindChoices.EXPERIENCES,
+                        not_canceled=True,
+                        experience_time__gte=day_start,
+                        experience_time__lt=day_start + timedelta(days=1),
+                    )
+                    .values("experience")
+                    .annotate(total=Sum("guests"))
+                    .values("total")
+                )
+                experiences = experiences.alias(
+                    booked_guests=Coalesce(Subquery(booked_guests), 0),
+                ).filter(booked_guests__lte=F("max_guests") - guests)
+            if params.get("perks"):
+                perk_pks = {int(pk) for pk in params["perks"].split(",")}
+                # perk 개수와 상관없이 through 테이블을 한 번만 본다
+                matches = (
+                    Experience.perks.through.objects.filter(perk_id__in=perk_pks)
+                    .values("experience_id")
+                    .annotate(matched=Count("perk_id"))
+                    .filter(matched=len(perk_pks))
+                    .values("experience_id")
+                )
+                experiences = experiences.filter(pk__in=matches)
+        except ValueError:
+            raise ParseError("Invalid search parameters")
+        return experiences
+
     def get(self, request):
-        experiences = Experience.objects.all()
+        experiences = self.search(request, Experience.objects.all())
+        # rating, video, 커버 사진을 한 쿼리로 가져온다
+        experiences = experiences.select_related("videos", "cover_photo").annotate(
+            avg_rating=Avg("reviews__rating"),
+        )
         serializer = ExperienceListSerializer(
             experiences,
             many=True,
@@ -92,7 +161,7 @@ class Experiences(APIView):
             if not category_pk:
                 raise ParseError("Category is required")
             try:
-                category = Category.objects.get(pk=category_pk)
+                category = reference.categories.get(category_pk)
                 if category.kind == Category.CategoryKindChoices.ROOMS:
                     raise ParseError("The category kind should be 'experiences'")
             except Category.DoesNotExist:
@@ -104,9 +173,7 @@ class Experiences(APIView):
                         category=category,
                     )
                     perks = request.data.get("perks")
-                    for perk_pk in perks:
-                        perk = Perk.objects.get(pk=perk_pk)
-                        new_experience.perks.add(perk)
+                    new_experience.perks.add(*[reference.perks.get(pk) for pk in perks])
             except Perk.DoesNotExist:
                 raise ParseError("Perk not found")
             except Exception as e:
@@ -125,7 +192,16 @@ class ExperienceDetail(APIView):
 
     def get_object(self, pk):
         try:
-            experience = Experience.objects.get(pk=pk)
+            experience = (
+                Experience.objects.select_related(
+                    "host",
+                    "category",
+                    "videos",
+                    "rating_histogram",
+                )
+                .prefetch_related("perks", "photos")
+                .get(pk=pk)
+            )
             return experience
         except Experience.DoesNotExist:
             raise NotFound
@@ -151,7 +227,7 @@ class ExperienceDetail(APIView):
             category_pk = request.data.get("category")
             if category_pk:
                 try:
-                    category = Category.objects.get(pk=category_pk)
+                    category = reference.categories.get(category_pk)
                     if category.kind == Category.CategoryKindChoices.ROOMS:
                         raise ParseError("The category kind should be experiences")
                 except Category.DoesNotExist:
@@ -166,10 +242,10 @@ class ExperienceDetail(APIView):
                         updated_experience = serializer.save()
                     perks_list = request.data.get("perks")
                     if perks_list:
-                        updated_experience.perks.clear()
-                        for perk_pk in perks_list:
-                            perk = Perk.objects.get(pk=perk_pk)
-                            updated_experience.perks.add(perk)
+                        updated_experience.perks.set(
+                            [reference.perks.get(pk) for pk in perks_list],
+                            clear=True,
+                        )
             except Perk.DoesNotExist:
                 raise ParseError("Perk not found")
             except Exception as e:
@@ -230,19 +306,7 @@ class ExperienceReviews(APIView):
 
     def get(self, request, pk):
         experience = self.get_object(pk)
-        try:
-            page = request.query_params.get("page", 1)
-            page = int(page)
-        except ValueError:
-            page = 1
-        start = (page - 1) * settings.PAGE_SIZE
-        end = start + settings.PAGE_SIZE
-        reviews = experience.reviews.all()[start:end]
-        serializer = ReviewSerializer(
-            reviews,
-            many=True,
-        )
-        return Response(serializer.data)
+        return review_feed(request, experience.reviews.all())
 
     def post(self, request, pk):
         experience = self.get_object(pk)
@@ -258,6 +322,18 @@ class ExperienceReviews(APIView):
             return Response(serializer.errors)
 
 
+class ExperienceReviewSummary(APIView):
+    def get(self, request, pk):
+        try:
+            experience = Experience.objects.select_related("rating_histogram").get(
+                pk=pk
+            )
+        except Experience.DoesNotExist:
+            raise NotFound
+        serializer = RatingHistogramSerializer(RatingHistogram.of(experience))
+        return Response(serializer.data)
+
+
 class ExperiencePhotos(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
@@ -312,6 +388,7 @@ class ExperienceVideo(APIView):
 
 class ExperienceBookings(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
+    throttle_scope = "booking"
 
     def get_object(self, pk):
         try:
@@ -321,14 +398,6 @@ class ExperienceBookings(APIView):
             raise NotFound
 
     def get(self, request, pk):
-        try:
-            page = int(request.query_params.get("page", 1))
-        except ValueError:
-            page = 1
-        page_size = settings.PAGE_SIZE
-        start = (page - 1) * page_size
-        end = start + page_size
-
         experience = self.get_object(pk)
         now = timezone.localtime(timezone.now())
 
@@ -336,31 +405,35 @@ class ExperienceBookings(APIView):
             experience=experience,
             kind=Booking.BookingKindChoices.EXPERIENCES,
             experience_time__gte=now,
-        )[start:end]
-
+        )
+        # ?cursor=&page_size=, (experience, experience_time, id) 인덱스 순서 그대로
+        paginator = KeysetPagination(ordering=("experience_time", "pk"))
+        page = paginator.paginate_queryset(bookings, request)
         serializer = PublicBookingSerializer(
-            bookings,
+            page,
             many=True,
         )
-        return Response(serializer.data)
+        return paginator.get_paginated_response(serializer.data)
 
     def post(self, request, pk):
         experience = self.get_object(pk)
         serializer = CreateExperienceBookingSerializer(data=request.data)
 
         if serializer.is_valid():
-            new_booking = serialzier.save(
+            new_booking = serializer.save(
                 experience=experience,
                 user=request.user,
                 kind=Booking.BookingKindChoices.EXPERIENCES,
             )
-            serialzier = PublicBookingSerializer(new_booking)
-            return Response(serialzier.data)
+            serializer = PublicBookingSerializer(new_booking)
+            return Response(serializer.data)
         else:
             return Response(serializer.errors)
 
 
 class ExperienceBookingDetail(APIView):
+    throttle_scope = "booking"
+
     def get_experience(self, pk):
         try:
             experience = Experience.objects.get(pk=pk)
@@ -0,0 +1,28 @@
+from django.core.checks import Error, register
+
+from . import variants
+
+
+@register()
+def check_image_encoders(app_configs, **kwargs):
+    """Photo variants need Pillow with an encoder for every format"""
+    if not variants.HAS_PILLOW:
+        return [
+            Error(
+                "Pillow isn't installed, photos get no resized variants.",
+                hint="Install the dependencies with poetry install.",
+                id="medias.E001",
+            )
+        ]
+    from PIL import features
+
+    return [
+        Error(
+            f"Pillow can't write {image_format.upper()}, photos get no "
+            f"{image_format} variants.",
+            hint="AVIF needs Pillow 11.3 or later, see pyproject.toml.",
+            id="medias.E002",
+        )
+        for image_format in variants.FORMATS
+        if not features.check(image_format)
+    ]
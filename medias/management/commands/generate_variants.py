@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from medias.models import Photo
+from medias import variants
+
+
+class Command(BaseCommand):
+    help = (
+        "Make the resized variants of photos that don't have them yet. "
+        "Safe to run again, finished variants are reused."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Render photos that have variants again, restoring missing files",
+        )
+
+    def handle(self, *args, **options):
+        photos = Photo.objects.order_by("pk")
+        if not options["all"]:
+            photos = photos.filter(variants={})
+        done = 0
+        for photo_pk in photos.values_list("pk", flat=True).iterator():
+            if variants.generate(photo_pk, force=options["all"]):
+                done += 1
+        self.stdout.write(self.style.SUCCESS(f"{done} photos have variants"))
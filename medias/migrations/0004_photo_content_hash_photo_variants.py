@@ -0,0 +1,22 @@
+# Generated by Django 4.2.3 on 2026-10-19 17:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("medias", "0003_alter_photo_file_alter_video_file"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="photo",
+            name="content_hash",
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="photo",
+            name="variants",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
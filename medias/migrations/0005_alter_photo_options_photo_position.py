@@ -0,0 +1,21 @@
+# Generated by Django 4.2.3 on 2026-10-19 17:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("medias", "0004_photo_content_hash_photo_variants"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="photo",
+            options={"ordering": ("position", "pk")},
+        ),
+        migrations.AddField(
+            model_name="photo",
+            name="position",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -4,7 +4,6 @@ from common.models import CommonModel
 
 # Create your models here.
 class Photo(CommonModel):
-
     """Photo Model for Experience or Room Definition"""
 
     file = models.URLField()
@@ -23,13 +22,39 @@ class Photo(CommonModel):
         on_delete=models.CASCADE,
         related_name="photos",
     )
+    # sha256 of the uploaded bytes and the resized copies made from it,
+    # {"webp": [[320, url], [640, url]], "avif": [...]} (see variants.py)
+    content_hash = models.CharField(max_length=64, blank=True, db_index=True)
+    variants = models.JSONField(default=dict, blank=True)
+    # gallery order, the first photo is the cover of its room/experience
+    position = models.PositiveIntegerField(default=0)
 
     def __str__(self) -> str:
         return "Photo file"
 
+    class Meta:
+        ordering = ("position", "pk")
+
+    @property
+    def target_field(self):
+        return "room" if self.room_id else "experience"
+
+    def siblings(self):
+        """Photos of the same room or experience, this one included"""
+        field = self.target_field
+        return Photo.objects.filter(**{f"{field}_id": getattr(self, f"{field}_id")})
 
-class Video(CommonModel):
 
+def update_cover(field, target_pk):
+    """Copy the first photo onto Room/Experience.cover_photo, one UPDATE"""
+    if target_pk is None:
+        return
+    model = Photo._meta.get_field(field).related_model
+    first = Photo.objects.filter(**{f"{field}_id": target_pk}).values("pk")[:1]
+    model.objects.filter(pk=target_pk).update(cover_photo=models.Subquery(first))
+
+
+class Video(CommonModel):
     """Video Model only for Experience Definition"""
 
     file = models.URLField()
@@ -0,0 +1,56 @@
+"""
+What the process pool of variants.py runs.
+
+The workers don't set up Django, they only get picklable arguments (the
+storage included) and read the original and write the variants
+themselves, so the bytes never go through the web worker.
+"""
+
+import hashlib
+import io
+
+
+def variant_key(digest, width, image_format):
+    return f"photos/variants/{digest}/{width}.{image_format}"
+
+
+def digest_of(storage, key):
+    return hashlib.sha256(storage.read(key)).hexdigest()
+
+
+def render(data, widths, formats):
+    """
+    {(width, format): bytes}, formats is {format: save() options}.
+    Never upscales, small originals get one variant at their own width.
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+    results = {}
+    for width in sorted({min(width, image.width) for width in widths}):
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.LANCZOS)
+        for image_format, options in formats.items():
+            output = io.BytesIO()
+            resized.save(output, image_format.upper(), **options)
+            results[(width, image_format)] = output.getvalue()
+    return results
+
+
+def make_variants(storage, key, widths, formats):
+    """
+    Render the original under key and save the variant files that are
+    missing: (digest, {(width, format): variant key}).
+    """
+    data = storage.read(key)
+    digest = hashlib.sha256(data).hexdigest()
+    keys = {}
+    for (width, image_format), output in render(data, widths, formats).items():
+        variant = variant_key(digest, width, image_format)
+        if storage.size(variant) is None:
+            storage.save(variant, output, f"image/{image_format}")
+        keys[(width, image_format)] = variant
+    return digest, keys
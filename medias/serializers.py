@@ -1,17 +1,42 @@
-from rest_framework.serializers import ModelSerializer
+from rest_framework.serializers import (
+    CharField,
+    IntegerField,
+    ModelSerializer,
+    Serializer,
+    SerializerMethodField,
+)
 
 from .models import Photo, Video
 
 
 class PhotoSerializer(ModelSerializer):
+    # {"webp": "url 320w, url 640w", "avif": ...} for <source srcset>
+    srcset = SerializerMethodField()
+    thumbnail = SerializerMethodField()
+
     class Meta:
         model = Photo
         fields = (
             "pk",
             "file",
             "description",
+            "position",
+            "srcset",
+            "thumbnail",
         )
 
+    def get_srcset(self, photo):
+        return {
+            image_format: ", ".join(f"{url} {width}w" for width, url in variants)
+            for image_format, variants in photo.variants.items()
+        }
+
+    def get_thumbnail(self, photo):
+        # the smallest webp, falls back to the original
+        if photo.variants.get("webp"):
+            return photo.variants["webp"][0][1]
+        return photo.file
+
 
 class VideoSerializer(ModelSerializer):
     class Meta:
@@ -20,3 +45,20 @@ class VideoSerializer(ModelSerializer):
             "pk",
             "file",
         )
+
+
+class UploadTicketSerializer(Serializer):
+    """The body of GetUploadURL"""
+
+    kind = CharField(default="photo")
+    target = CharField()
+    target_pk = IntegerField()
+    size = IntegerField()
+    content_type = CharField()
+
+
+class CompleteUploadSerializer(Serializer):
+    """The body of CompleteUpload"""
+
+    ticket = CharField()
+    description = CharField(max_length=150, default="", allow_blank=True)
@@ -0,0 +1,170 @@
+"""
+Serves LocalStorage files under MEDIA_URL.
+
+Single byte ranges (Range, If-Range) are answered with 206 so that video
+scrubbing only fetches what it plays. Under WSGI the file object goes to
+the server's file_wrapper (sendfile() with gunicorn's sync workers). Under
+ASGI there is no file_wrapper and Django would read a sync iterator into a
+list before sending anything, so the file is streamed as an async iterator
+of CHUNK_SIZE reads. With MEDIA_ACCEL_REDIRECT set, nginx sends the file
+instead (X-Accel-Redirect) and does ranges itself. Upload keys are uuids or
+content hashes and are never rewritten, so those responses are cacheable
+forever.
+"""
+
+import asyncio
+import mimetypes
+import re
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from django.views.decorators.http import require_safe
+
+from .storage import LocalStorage, get_storage
+
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+IMMUTABLE = re.compile(r"(^|/)[0-9a-f]{32,64}(/|\.|$)")
+
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeFile:
+    """A file that ends after length bytes, keeps fileno() for sendfile"""
+
+    def __init__(self, file, start, length):
+        file.seek(start)
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+async def read_chunks(file, length):
+    """length bytes of file, CHUNK_SIZE at a time, read off the event loop"""
+    while length > 0:
+        chunk = await asyncio.to_thread(file.read, min(CHUNK_SIZE, length))
+        if not chunk:
+            break
+        length -= len(chunk)
+        yield chunk
+
+
+def parse_range(header, size):
+    """(start, end) of a single byte range, None to send everything"""
+    match = RANGE.match(header.replace(" ", ""))
+    if not match or not any(match.groups()):
+        # several ranges or other units, a full response is fine
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        start = max(size - int(last), 0)
+        end = size - 1
+    if start > end or start >= size:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def cache_headers(response, key, etag, modified):
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(modified)
+    response["Accept-Ranges"] = "bytes"
+    if IMMUTABLE.search(key):
+        response["Cache-Control"] = "public, max-age=31536000, immutable"
+    else:
+        response["Cache-Control"] = f"public, max-age={settings.MEDIA_MAX_AGE}"
+
+
+@require_safe
+def serve(request, path):
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage) or path.endswith(".part"):
+        raise Http404
+    try:
+        file_path = storage.path(path)
+        stat = file_path.stat()
+    except (ValueError, OSError):
+        raise Http404
+    if not file_path.is_file():
+        raise Http404
+
+    size, modified = stat.st_size, int(stat.st_mtime)
+    etag = quote_etag(f"{modified:x}-{size:x}")
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        not_modified = etag in [tag.strip() for tag in if_none_match.split(",")]
+    else:
+        since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+        not_modified = since is not None and modified <= since
+    if not_modified:
+        response = HttpResponseNotModified()
+        cache_headers(response, path, etag, modified)
+        return response
+
+    byte_range = None
+    if "Range" in request.headers:
+        # If-Range: only the part of the same version, otherwise the whole file
+        if_range = request.headers.get("If-Range")
+        if not if_range or if_range in (etag, http_date(modified)):
+            try:
+                byte_range = parse_range(request.headers["Range"], size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+
+    if settings.MEDIA_ACCEL_REDIRECT:
+        # nginx: location <prefix> { internal; alias <MEDIA_ROOT>/; }
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.MEDIA_ACCEL_REDIRECT + path
+        cache_headers(response, path, etag, modified)
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    status = 206 if byte_range else 200
+    file = open(file_path, "rb")
+    if isinstance(request, ASGIRequest):
+        file.seek(start)
+        response = StreamingHttpResponse(
+            read_chunks(file, end - start + 1),
+            status=status,
+            content_type=content_type,
+        )
+        response._resource_closers.append(file.close)
+    elif byte_range:
+        response = FileResponse(
+            RangeFile(file, start, end - start + 1),
+            status=status,
+            content_type=content_type,
+        )
+    else:
+        response = FileResponse(file, content_type=content_type)
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = end - start + 1
+    cache_headers(response, path, etag, modified)
+    return response
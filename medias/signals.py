@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Photo, update_cover
+
+
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+def photo_changed(sender, instance, **kwargs):
+    update_cover("room", instance.room_id)
+    update_cover("experience", instance.experience_id)
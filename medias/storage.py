@@ -0,0 +1,208 @@
+"""
+Where uploaded media bytes live.
+
+Clients never send the bytes through the API: GetUploadURL hands out a
+short-lived ticket for one object of an exact size, the client PUTs the
+file to ticket["url"], and then completes the upload so the Photo or
+Video row is created.
+
+settings.MEDIA_STORAGE picks the backend:
+- LocalStorage keeps files under MEDIA_ROOT and accepts the PUT itself
+  (LocalUpload view), for development and tests.
+- S3Storage signs PUT URLs for any S3 compatible bucket (needs boto3).
+"""
+
+import os
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+UPLOAD_SALT = "medias.upload"
+
+
+class Storage:
+    def upload_ticket(self, key, size, content_type, expires_in):
+        """{"url", "method", "headers"} for uploading exactly size bytes"""
+        raise NotImplementedError
+
+    def size(self, key):
+        """Size of the stored object, None if it isn't there (yet)"""
+        raise NotImplementedError
+
+    def url(self, key):
+        raise NotImplementedError
+
+    def key(self, url):
+        """Inverse of url(), None for files that aren't in this storage"""
+        raise NotImplementedError
+
+    def read(self, key):
+        raise NotImplementedError
+
+    def save(self, key, data, content_type):
+        raise NotImplementedError
+
+
+class LocalStorage(Storage):
+    chunk_size = 64 * 1024
+
+    def __init__(self, location=None, base_url=None):
+        self.location = Path(location or settings.MEDIA_ROOT)
+        self.base_url = base_url or "/" + settings.MEDIA_URL.strip("/") + "/"
+
+    def path(self, key):
+        path = (self.location / key).resolve()
+        if self.location.resolve() not in path.parents:
+            raise ValueError("Key outside of the storage")
+        return path
+
+    def upload_ticket(self, key, size, content_type, expires_in):
+        token = signing.dumps(
+            {"key": key, "size": size, "type": content_type},
+            salt=UPLOAD_SALT,
+        )
+        return {
+            "url": reverse("local-upload", kwargs={"token": token}),
+            "method": "PUT",
+            "headers": {"Content-Type": content_type},
+        }
+
+    def read_token(self, token):
+        """The signed upload of a LocalUpload URL, raises signing.BadSignature"""
+        return signing.loads(
+            token,
+            salt=UPLOAD_SALT,
+            max_age=settings.MEDIA_UPLOAD_EXPIRES,
+        )
+
+    def write(self, key, stream, size):
+        """Copy exactly size bytes from stream, the key is written once"""
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".part")
+        written = 0
+        try:
+            with open(partial, "xb") as file:
+                while written < size:
+                    chunk = stream.read(min(self.chunk_size, size - written))
+                    if not chunk:
+                        break
+                    file.write(chunk)
+                    written += len(chunk)
+            if written != size or stream.read(1):
+                raise ValueError("Size doesn't match the ticket")
+            # link() fails if an upload already finished under this key
+            os.link(partial, path)
+        finally:
+            if partial.exists():
+                partial.unlink()
+
+    def size(self, key):
+        try:
+            return self.path(key).stat().st_size
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def url(self, key):
+        return self.base_url + key
+
+    def key(self, url):
+        if url.startswith(self.base_url):
+            return url[len(self.base_url) :]
+        return None
+
+    def read(self, key):
+        return self.path(key).read_bytes()
+
+    def save(self, key, data, content_type):
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(path.name + ".part")
+        partial.write_bytes(data)
+        os.replace(partial, path)
+
+
+class S3Storage(Storage):
+    def __init__(self):
+        import boto3
+
+        self.bucket = settings.MEDIA_S3_BUCKET
+        self.public_url = settings.MEDIA_PUBLIC_URL.rstrip("/")
+        self.endpoint_url = settings.MEDIA_S3_ENDPOINT_URL
+        self.client = boto3.client("s3", endpoint_url=self.endpoint_url)
+
+    def __getstate__(self):
+        # sent to the variants pool, which makes its own client
+        state = self.__dict__.copy()
+        del state["client"]
+        return state
+
+    def __setstate__(self, state):
+        import boto3
+
+        self.__dict__.update(state)
+        self.client = boto3.client("s3", endpoint_url=self.endpoint_url)
+
+    def upload_ticket(self, key, size, content_type, expires_in):
+        # Content-Length is signed too, the bucket refuses any other size
+        url = self.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "ContentType": content_type,
+                "ContentLength": size,
+            },
+            ExpiresIn=expires_in,
+        )
+        return {
+            "url": url,
+            "method": "PUT",
+            "headers": {"Content-Type": content_type},
+        }
+
+    def size(self, key):
+        from botocore.exceptions import ClientError
+
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+        except ClientError:
+            return None
+
+    def url(self, key):
+        return f"{self.public_url}/{key}"
+
+    def key(self, url):
+        if url.startswith(self.public_url + "/"):
+            return url[len(self.public_url) + 1 :]
+        return None
+
+    def read(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def save(self, key, data, content_type):
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=data,
+            ContentType=content_type,
+            # variants are named after their content
+            CacheControl="public, max-age=31536000, immutable",
+        )
+
+
+@lru_cache(maxsize=None)
+def get_storage():
+    return import_string(settings.MEDIA_STORAGE)()
+
+
+@receiver(setting_changed)
+def reset_storage(setting, **kwargs):
+    if setting in ("MEDIA_STORAGE", "MEDIA_ROOT", "MEDIA_URL"):
+        get_storage.cache_clear()
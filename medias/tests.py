@@ -1,3 +1,380 @@
-from django.test import TestCase
+import io
+import tempfile
+import tracemalloc
+import unittest
+import unittest.mock
+
+from django.core.cache import cache
+from django.test import AsyncClient, override_settings
+
+from rest_framework.test import APITestCase
+
+from config.throttles import store
+from .models import Photo, Video
+from .serializers import PhotoSerializer
+from .storage import get_storage
+from . import checks, rendering, serving, variants
+from users.models import User
+from rooms.models import Room
+from experiences.models import Experience
 
 # Create your tests here.
+
+
+class MediaTestCase(APITestCase):
+    def setUp(self):
+        store.clear()
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(
+            MEDIA_ROOT=directory.name,
+            MEDIA_STORAGE="medias.storage.LocalStorage",
+        )
+        media.enable()
+        self.addCleanup(media.disable)
+        self.media_root = directory.name
+
+        self.user = User.objects.create(username="host")
+        self.room = Room.objects.create(
+            name="Room",
+            price=100,
+            rooms=1,
+            toilets=1,
+            description="",
+            address="",
+            kind=Room.RoomKindChoices.PRIVATE_ROOM,
+            owner=self.user,
+        )
+        self.experience = Experience.objects.create(
+            name="Experience",
+            host=self.user,
+            price=10,
+            address="",
+            start="10:00",
+            end="12:00",
+            description="",
+        )
+        self.client.force_authenticate(self.user)
+
+
+class TestDirectUpload(MediaTestCase):
+    URL = "/api/v1/medias/photos/get-url"
+
+    def get_ticket(self, **data):
+        data = {
+            "kind": "photo",
+            "target": "room",
+            "target_pk": self.room.pk,
+            "size": 4,
+            "content_type": "image/jpeg",
+            **data,
+        }
+        return self.client.post(self.URL, data, format="json")
+
+    def upload(self, ticket, content, content_type="image/jpeg"):
+        return self.client.generic(
+            ticket["upload"]["method"],
+            ticket["upload"]["url"],
+            content,
+            content_type=content_type,
+        )
+
+    def complete(self, ticket, **data):
+        return self.client.post(
+            "/api/v1/medias/uploads/complete",
+            {"ticket": ticket["ticket"], **data},
+            format="json",
+        )
+
+    def test_photo_upload(self):
+        ticket = self.get_ticket().json()
+
+        # nothing uploaded yet
+        self.assertEqual(self.complete(ticket).status_code, 400)
+
+        self.assertEqual(self.upload(ticket, b"jpeg").status_code, 200)
+        response = self.complete(ticket, description="Front door")
+
+        self.assertEqual(response.status_code, 201)
+        photo = Photo.objects.get()
+        self.assertEqual(photo.room, self.room)
+        self.assertEqual(photo.description, "Front door")
+        self.assertTrue(photo.file.startswith("/user-uploads/photos/"))
+        # completing twice doesn't duplicate
+        self.assertEqual(self.complete(ticket).status_code, 200)
+        self.assertEqual(Photo.objects.count(), 1)
+
+    def test_video_upload(self):
+        ticket = self.get_ticket(
+            kind="video",
+            target="experience",
+            target_pk=self.experience.pk,
+            content_type="video/mp4",
+        ).json()
+
+        self.upload(ticket, b"mp4!", content_type="video/mp4")
+        response = self.complete(ticket)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Video.objects.get().experience, self.experience)
+        response = self.complete(ticket)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["pk"], Video.objects.get().pk)
+
+    def test_complete_validates_the_body(self):
+        ticket = self.get_ticket().json()
+        self.upload(ticket, b"jpeg")
+
+        for data in ({"description": ["a"]}, {"description": "a" * 151}):
+            self.assertEqual(self.complete(ticket, **data).status_code, 400)
+        self.assertEqual(self.get_ticket(content_type=["image/jpeg"]).status_code, 400)
+        self.assertFalse(Photo.objects.exists())
+
+    def test_upload_must_match_ticket(self):
+        ticket = self.get_ticket().json()
+
+        self.assertEqual(self.upload(ticket, b"too long").status_code, 400)
+        self.assertEqual(self.upload(ticket, b"png!", "image/png").status_code, 400)
+        self.assertEqual(self.upload(ticket, b"jpeg").status_code, 200)
+        # upload URLs work once
+        self.assertEqual(self.upload(ticket, b"jpeg").status_code, 403)
+
+    def test_ticket_limits(self):
+        with override_settings(MEDIA_UPLOAD_MAX_SIZE={"photo": 3, "video": 3}):
+            self.assertEqual(self.get_ticket().status_code, 400)
+        self.assertEqual(self.get_ticket(content_type="text/html").status_code, 400)
+        self.assertEqual(self.get_ticket(target="experience").status_code, 200)
+        self.assertEqual(self.get_ticket(kind="video").status_code, 400)
+
+    def test_only_owner(self):
+        other = User.objects.create(username="other")
+        ticket = self.get_ticket().json()
+        self.client.force_authenticate(other)
+
+        self.assertEqual(self.get_ticket().status_code, 403)
+        self.assertEqual(self.complete(ticket).status_code, 403)
+
+    def test_tampered_upload_url(self):
+        ticket = self.get_ticket().json()
+        ticket["upload"]["url"] = ticket["upload"]["url"][:-2] + "xx"
+
+        self.assertEqual(self.upload(ticket, b"jpeg").status_code, 403)
+
+
+class TestPhotoVariants(MediaTestCase):
+    def test_srcset(self):
+        photo = Photo(
+            file="/user-uploads/photos/a.jpg",
+            variants={
+                "webp": [[320, "/v/320.webp"], [640, "/v/640.webp"]],
+                "avif": [[320, "/v/320.avif"]],
+            },
+        )
+
+        data = PhotoSerializer(photo).data
+
+        self.assertEqual(data["srcset"]["webp"], "/v/320.webp 320w, /v/640.webp 640w")
+        self.assertEqual(data["srcset"]["avif"], "/v/320.avif 320w")
+        self.assertEqual(data["thumbnail"], "/v/320.webp")
+
+    def test_without_variants(self):
+        data = PhotoSerializer(Photo(file="http://photo.com/1")).data
+
+        self.assertEqual(data["srcset"], {})
+        self.assertEqual(data["thumbnail"], "http://photo.com/1")
+
+    def test_missing_encoders_fail_the_checks(self):
+        with unittest.mock.patch.object(variants, "HAS_PILLOW", False):
+            self.assertEqual(
+                [error.id for error in checks.check_image_encoders(None)],
+                ["medias.E001"],
+            )
+
+        with unittest.mock.patch(
+            "PIL.features.check", lambda feature: feature != "avif"
+        ):
+            self.assertEqual(
+                [error.id for error in checks.check_image_encoders(None)],
+                ["medias.E002"],
+            )
+
+    @unittest.skipUnless(variants.HAS_PILLOW, "needs Pillow")
+    def test_generate_once_per_content(self):
+        from PIL import Image
+
+        output = io.BytesIO()
+        Image.new("RGB", (800, 400), "red").save(output, "PNG")
+        storage = get_storage()
+        storage.save("photos/a.png", output.getvalue(), "image/png")
+        storage.save("photos/b.png", output.getvalue(), "image/png")
+        first = Photo.objects.create(file=storage.url("photos/a.png"), room=self.room)
+        second = Photo.objects.create(file=storage.url("photos/b.png"), room=self.room)
+
+        # the pool reads the original, not this process
+        with unittest.mock.patch.object(
+            type(storage), "read", side_effect=AssertionError
+        ):
+            generated = variants.generate(first.pk)
+        self.assertEqual([width for width, url in generated["webp"]], [320, 640, 800])
+
+        # same bytes, hashed in the pool but no second render
+        pool = variants.get_pool()
+        with unittest.mock.patch.object(pool, "submit", wraps=pool.submit) as submit:
+            self.assertEqual(variants.generate(second.pk), generated)
+        self.assertEqual(
+            [call.args[0] for call in submit.call_args_list],
+            [rendering.digest_of],
+        )
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(second.content_hash, first.content_hash)
+        self.assertEqual(second.variants, generated)
+
+
+class TestServeMedia(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.key = "videos/0123456789abcdef0123456789abcdef.mp4"
+        get_storage().save(self.key, bytes(range(100)), "video/mp4")
+        self.URL = f"/user-uploads/{self.key}"
+
+    def read(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.client.get(self.URL)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "video/mp4")
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertEqual(self.read(response), bytes(range(100)))
+
+    def test_ranges(self):
+        response = self.client.get(self.URL, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/100")
+        self.assertEqual(response["Content-Length"], "10")
+        self.assertEqual(self.read(response), bytes(range(10, 20)))
+
+        response = self.client.get(self.URL, HTTP_RANGE="bytes=-5")
+        self.assertEqual(self.read(response), bytes(range(95, 100)))
+
+        response = self.client.get(self.URL, HTTP_RANGE="bytes=90-")
+        self.assertEqual(response["Content-Range"], "bytes 90-99/100")
+
+        response = self.client.get(self.URL, HTTP_RANGE="bytes=200-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */100")
+
+    def test_if_range(self):
+        etag = self.client.get(self.URL)["ETag"]
+
+        response = self.client.get(self.URL, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+        response = self.client.get(
+            self.URL, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"old"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.read(response)), 100)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.URL)["ETag"]
+
+        response = self.client.get(self.URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_accel_redirect(self):
+        with override_settings(MEDIA_ACCEL_REDIRECT="/protected-media/"):
+            response = self.client.get(self.URL)
+
+        self.assertEqual(response["X-Accel-Redirect"], f"/protected-media/{self.key}")
+        self.assertEqual(response.content, b"")
+
+    async def test_asgi_streams_in_bounded_chunks(self):
+        key = "videos/fedcba9876543210fedcba9876543210.mp4"
+        size = 8 * 1024 * 1024
+        get_storage().save(key, bytes(size), "video/mp4")
+
+        tracemalloc.start()
+        try:
+            response = await AsyncClient().get(
+                f"/user-uploads/{key}", headers={"Range": f"bytes=1-{size - 2}"}
+            )
+            received = 0
+            # the way the ASGI handler reads it
+            async for chunk in response:
+                self.assertLessEqual(len(chunk), serving.CHUNK_SIZE)
+                received += len(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(received, size - 2)
+        # a few chunks in flight, never the whole range
+        self.assertLess(peak, 1024 * 1024)
+
+    def test_outside_media_root(self):
+        self.assertEqual(self.client.get("/user-uploads/../manage.py").status_code, 404)
+        self.assertEqual(self.client.get("/user-uploads/missing.jpg").status_code, 404)
+
+
+class TestCoverPhoto(MediaTestCase):
+    def photo(self, name):
+        return Photo.objects.create(file=f"http://photo.com/{name}", room=self.room)
+
+    def cover(self):
+        self.room.refresh_from_db()
+        return self.room.cover_photo
+
+    def test_first_photo_is_the_cover(self):
+        first = self.photo("first")
+        second = self.photo("second")
+        self.assertEqual(self.cover(), first)
+
+        response = self.client.put(
+            f"/api/v1/medias/photo/{second.pk}",
+            {"cover": True},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.cover(), second)
+        self.assertEqual(list(self.room.photos.all()), [second, first])
+
+        second.delete()
+        self.assertEqual(self.cover(), first)
+        first.delete()
+        self.assertIsNone(self.cover())
+
+    def test_only_owner_reorders(self):
+        photo = self.photo("first")
+        self.client.force_authenticate(User.objects.create(username="other"))
+
+        response = self.client.put(
+            f"/api/v1/medias/photo/{photo.pk}",
+            {"position": 3},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_lists_show_only_the_cover(self):
+        self.photo("first")
+        self.photo("second")
+        Photo.objects.create(file="http://photo.com/e", experience=self.experience)
+
+        # rooms with covers and ratings, liked rooms and experiences
+        with self.assertNumQueries(3):
+            room = self.client.get("/api/v1/rooms/").json()[0]
+        experience = self.client.get("/api/v1/experiences/").json()[0]
+
+        self.assertNotIn("photos", room)
+        self.assertEqual(room["cover_photo"]["file"], "http://photo.com/first")
+        self.assertEqual(experience["cover_photo"]["file"], "http://photo.com/e")
+        detail = self.client.get(f"/api/v1/rooms/{self.room.pk}/").json()
+        self.assertEqual(len(detail["photos"]), 2)
@@ -1,8 +1,10 @@
 from django.urls import path
 
-from .views import PhotoDetial, GetUploadURL
+from .views import PhotoDetial, GetUploadURL, CompleteUpload, LocalUpload
 
 urlpatterns = [
     path("photos/get-url", GetUploadURL.as_view()),
+    path("uploads/complete", CompleteUpload.as_view()),
+    path("uploads/<str:token>", LocalUpload.as_view(), name="local-upload"),
     path("photo/<int:pk>", PhotoDetial.as_view()),
 ]
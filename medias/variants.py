@@ -0,0 +1,132 @@
+"""
+Resized WebP/AVIF copies of uploaded photos for srcset.
+
+Resizing runs in a process pool (rendering.py), never in a request thread,
+and the pool reads the original and writes the variants itself. Variants are
+named after the sha256 of the original, photos/variants/<hash>/<width>.<format>,
+so the same image uploaded twice is processed once, and running it again
+only fills in what's missing.
+"""
+
+import importlib.util
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+from . import rendering
+from .models import Photo
+from .storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+WIDTHS = (320, 640, 1280)
+
+FORMATS = {
+    "webp": {"quality": 80, "method": 6},
+    "avif": {"quality": 60},
+}
+
+# medias.checks refuses to start without it (or without an AVIF encoder)
+HAS_PILLOW = importlib.util.find_spec("PIL") is not None
+
+pool = None
+pending = {}
+lock = threading.RLock()
+
+
+def get_pool():
+    global pool
+    with lock:
+        if pool is None:
+            # fork() of a web worker running threads can deadlock the child
+            pool = ProcessPoolExecutor(
+                max_workers=settings.MEDIA_VARIANT_WORKERS,
+                mp_context=multiprocessing.get_context("forkserver"),
+            )
+        return pool
+
+
+def variants_of(keys):
+    storage = get_storage()
+    variants = {}
+    for (width, image_format), key in sorted(keys.items()):
+        variants.setdefault(image_format, []).append([width, storage.url(key)])
+    return variants
+
+
+def save_variants(digest, keys):
+    variants = variants_of(keys)
+    # every photo with this content, uploaded meanwhile or before
+    Photo.objects.filter(content_hash=digest).update(variants=variants)
+    return variants
+
+
+def generate(photo_pk, force=False):
+    """
+    Make the variants of one photo, returns them (or None).
+    force renders again and fills in variant files that went missing.
+    """
+    if not HAS_PILLOW:
+        logger.error("Pillow isn't installed, no variants for photo %s", photo_pk)
+        return None
+    try:
+        photo = Photo.objects.get(pk=photo_pk)
+    except Photo.DoesNotExist:
+        return None
+    storage = get_storage()
+    key = storage.key(photo.file)
+    if key is None:
+        # hosted somewhere else, nothing to resize
+        return None
+    digest = get_pool().submit(rendering.digest_of, storage, key).result()
+    if photo.content_hash != digest:
+        photo.content_hash = digest
+        photo.save(update_fields=["content_hash"])
+
+    done = (
+        Photo.objects.filter(content_hash=digest)
+        .exclude(variants={})
+        .values_list("variants", flat=True)
+        .first()
+    )
+    if done and not force:
+        Photo.objects.filter(pk=photo.pk).update(variants=done)
+        return done
+
+    with lock:
+        future = pending.get(digest)
+        if future is None:
+            future = get_pool().submit(
+                rendering.make_variants, storage, key, WIDTHS, FORMATS
+            )
+            pending[digest] = future
+    try:
+        rendered_digest, keys = future.result()
+    finally:
+        with lock:
+            pending.pop(digest, None)
+    return save_variants(rendered_digest, keys)
+
+
+def generate_in_background(photo_pk):
+    def target():
+        try:
+            generate(photo_pk)
+        except Exception:
+            logger.exception("Variants of photo %s failed", photo_pk)
+        finally:
+            close_old_connections()
+
+    threading.Thread(target=target, daemon=True).start()
+
+
+def schedule(photo_pk):
+    """Generate the variants once the photo is committed"""
+    if settings.MEDIA_VARIANTS_BACKGROUND:
+        transaction.on_commit(lambda: generate_in_background(photo_pk))
+    else:
+        transaction.on_commit(lambda: generate(photo_pk))
@@ -1,12 +1,36 @@
+import mimetypes
+import uuid
+from io import BytesIO
+
+from django.conf import settings
+from django.core import signing
+from django.db import transaction
+from django.db.models import F
 from django.shortcuts import render
 
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.status import HTTP_200_OK
+from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST
 from rest_framework.views import APIView
-from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.exceptions import (
+    NotFound,
+    ParseError,
+    PermissionDenied,
+)
 from rest_framework.response import Response
 
-from .models import Photo
+from .models import Photo, Video
+from .serializers import (
+    CompleteUploadSerializer,
+    PhotoSerializer,
+    UploadTicketSerializer,
+    VideoSerializer,
+)
+from .storage import LocalStorage, get_storage
+from . import variants
+from rooms.models import Room
+from experiences.models import Experience
+
+TICKET_SALT = "medias.ticket"
 
 
 # Create your views here.
@@ -20,18 +44,193 @@ class PhotoDetial(APIView):
         except Photo.DoesNotExist:
             raise NotFound
 
-    def delete(self, request, pk):
-        photo = self.get_object(pk)
+    def check_owner(self, photo, user):
         if photo.room:
-            if photo.room.owner != request.user:
+            if photo.room.owner != user:
                 raise PermissionDenied
         elif photo.experience:
-            if photo.experience.host != request.user:
+            if photo.experience.host != user:
                 raise PermissionDenied
+
+    def put(self, request, pk):
+        """description, position, or {"cover": true} to move it first"""
+        photo = self.get_object(pk)
+        self.check_owner(photo, request.user)
+        serializer = PhotoSerializer(
+            photo,
+            data=request.data,
+            partial=True,
+        )
+        if serializer.is_valid():
+            with transaction.atomic():
+                if request.data.get("cover"):
+                    photo.siblings().exclude(pk=photo.pk).update(
+                        position=F("position") + 1
+                    )
+                    photo = serializer.save(position=0)
+                else:
+                    photo = serializer.save()
+            return Response(PhotoSerializer(photo).data)
+        else:
+            return Response(serializer.errors, status=HTTP_400_BAD_REQUEST)
+
+    def delete(self, request, pk):
+        photo = self.get_object(pk)
+        self.check_owner(photo, request.user)
         photo.delete()
         return Response(status=HTTP_200_OK)
 
 
+def get_target(kind, target, target_pk, user):
+    """The room or experience the media goes to, owned by the user"""
+    if kind == "video" and target != "experience":
+        raise ParseError("Videos are only for experiences")
+    try:
+        if target == "room":
+            owner_id = Room.objects.values_list("owner_id", flat=True).get(pk=target_pk)
+        elif target == "experience":
+            owner_id = Experience.objects.values_list("host_id", flat=True).get(
+                pk=target_pk
+            )
+        else:
+            raise ParseError("target should be room or experience")
+    except (Room.DoesNotExist, Experience.DoesNotExist):
+        raise NotFound
+    if owner_id != user.pk:
+        raise PermissionDenied
+
+
 class GetUploadURL(APIView):
+    """
+    Ticket for uploading one photo or video straight to the storage.
+    {kind: photo|video, target: room|experience, target_pk, size, content_type}
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = UploadTicketSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=HTTP_400_BAD_REQUEST)
+        kind = serializer.validated_data["kind"]
+        content_type = serializer.validated_data["content_type"]
+        size = serializer.validated_data["size"]
+        target = serializer.validated_data["target"]
+        target_pk = serializer.validated_data["target_pk"]
+        if kind not in settings.MEDIA_UPLOAD_MAX_SIZE:
+            raise ParseError("kind should be photo or video")
+        if content_type.split("/")[0] != ("image" if kind == "photo" else "video"):
+            raise ParseError(f"content_type doesn't look like a {kind}")
+        if not 0 < size <= settings.MEDIA_UPLOAD_MAX_SIZE[kind]:
+            raise ParseError(
+                f"size should be at most {settings.MEDIA_UPLOAD_MAX_SIZE[kind]} bytes"
+            )
+        get_target(kind, target, target_pk, request.user)
+
+        extension = mimetypes.guess_extension(content_type) or ""
+        key = f"{kind}s/{uuid.uuid4().hex}{extension}"
+        upload = get_storage().upload_ticket(
+            key, size, content_type, settings.MEDIA_UPLOAD_EXPIRES
+        )
+        ticket = signing.dumps(
+            {
+                "key": key,
+                "kind": kind,
+                "target": target,
+                "target_pk": target_pk,
+                "size": size,
+                "user": request.user.pk,
+            },
+            salt=TICKET_SALT,
+        )
+        return Response(
+            {
+                "upload": upload,
+                "ticket": ticket,
+                "expires_in": settings.MEDIA_UPLOAD_EXPIRES,
+            }
+        )
+
+
+class CompleteUpload(APIView):
+    """Create the Photo or Video once the bytes are in the storage"""
+
+    permission_classes = [IsAuthenticated]
+
     def post(self, request):
+        serializer = CompleteUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=HTTP_400_BAD_REQUEST)
+        try:
+            ticket = signing.loads(
+                serializer.validated_data["ticket"],
+                salt=TICKET_SALT,
+                # the upload may start right before the URL expires
+                max_age=settings.MEDIA_UPLOAD_EXPIRES * 2,
+            )
+        except signing.BadSignature:
+            raise ParseError("Invalid or expired ticket")
+        if ticket["user"] != request.user.pk:
+            raise PermissionDenied
+        get_target(ticket["kind"], ticket["target"], ticket["target_pk"], request.user)
+
+        storage = get_storage()
+        if storage.size(ticket["key"]) != ticket["size"]:
+            raise ParseError("The file wasn't uploaded")
+        url = storage.url(ticket["key"])
+        target = {f"{ticket['target']}_id": ticket["target_pk"]}
+        # completing the same ticket twice gives the same photo or video
+        if ticket["kind"] == "video":
+            if (
+                Video.objects.filter(experience_id=ticket["target_pk"])
+                .exclude(file=url)
+                .exists()
+            ):
+                raise ParseError("Only one video is allowed")
+            video, created = Video.objects.get_or_create(file=url, defaults=target)
+            return Response(
+                VideoSerializer(video).data,
+                status=HTTP_201_CREATED if created else HTTP_200_OK,
+            )
+        photo, created = Photo.objects.get_or_create(
+            file=url,
+            defaults={
+                "description": serializer.validated_data["description"],
+                **target,
+            },
+        )
+        if created:
+            variants.schedule(photo.pk)
+        return Response(
+            PhotoSerializer(photo).data,
+            status=HTTP_201_CREATED if created else HTTP_200_OK,
+        )
+
+
+class LocalUpload(APIView):
+    """
+    The PUT end of LocalStorage tickets, stands in for the object storage.
+    The signed token in the URL is the only credential, like a presigned URL.
+    """
+
+    authentication_classes = []
+    permission_classes = []
+    throttle_classes = []
+
+    def put(self, request, token):
+        storage = get_storage()
+        if not isinstance(storage, LocalStorage):
+            raise NotFound
+        try:
+            upload = storage.read_token(token)
+        except signing.BadSignature:
+            raise PermissionDenied("Invalid or expired upload URL")
+        if request.content_type != upload["type"]:
+            raise ParseError("Content-Type doesn't match the ticket")
+        try:
+            storage.write(upload["key"], request.stream or BytesIO(), upload["size"])
+        except FileExistsError:
+            raise PermissionDenied("Already uploaded")
+        except ValueError as error:
+            raise ParseError(str(error))
         return Response(status=HTTP_200_OK)
@@ -1,5 +1,7 @@
 from django.contrib import admin
-from .models import Review
+
+from common.paginations import EstimatedCountPaginator
+from .models import Review, RatingHistogram
 
 
 class WordFilter(admin.SimpleListFilter):
@@ -16,7 +18,7 @@ class WordFilter(admin.SimpleListFilter):
     def queryset(self, request, reviews):
         word = self.value()
         if word:
-            return reviews.filter(payload__contains=word)
+            return reviews.filter(payload__icontains=word)
         else:
             return reviews
 
@@ -56,3 +58,21 @@ class ReviewAdmin(admin.ModelAdmin):
         "user__is_host",
         "room__category",
     )
+    # icontains, served by the pg_trgm index on UPPER(payload) (migration 0010)
+    search_fields = (
+        "payload",
+        "=user__username",
+    )
+    list_select_related = ("user",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(RatingHistogram)
+class RatingHistogramAdmin(admin.ModelAdmin):
+    list_display = (
+        "__str__",
+        "count",
+        "average",
+    )
+    list_select_related = ("room", "experience")
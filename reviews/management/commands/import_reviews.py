@@ -0,0 +1,174 @@
+import csv
+import json
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from reviews.models import Review, RatingHistogram, ReviewImport
+from users.models import User
+from rooms.models import Room
+from experiences.models import Experience
+
+
+@contextmanager
+def keep_timestamps():
+    """Let bulk_create write the created_at/updated_at we give it"""
+    fields = [
+        field
+        for field in Review._meta.concrete_fields
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        "Import reviews from a CSV or NDJSON file with columns "
+        "user, room, experience, payload, rating, created_at. "
+        "Histograms are rebuilt once at the end. Run it again to resume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=("csv", "ndjson"))
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Forget the progress of an earlier run of this file",
+        )
+
+    def read_rows(self, path, file_format):
+        with open(path, newline="", encoding="utf-8") as file:
+            if file_format == "csv":
+                yield from csv.DictReader(file)
+            else:
+                for line in file:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def to_review(self, row):
+        created_at = self.now
+        if row.get("created_at"):
+            created_at = parse_datetime(row["created_at"])
+            if created_at is None:
+                raise ValueError("Invalid created_at")
+            if timezone.is_naive(created_at):
+                created_at = timezone.make_aware(created_at)
+        return Review(
+            user_id=int(row["user"]),
+            room_id=int(row["room"]) if row.get("room") else None,
+            experience_id=int(row["experience"]) if row.get("experience") else None,
+            payload=row.get("payload") or "",
+            rating=int(row["rating"]),
+            created_at=created_at,
+            updated_at=created_at,
+        )
+
+    def existing(self, model, pks):
+        pks = {pk for pk in pks if pk}
+        if not pks:
+            return set()
+        return set(model.objects.filter(pk__in=pks).values_list("pk", flat=True))
+
+    def write_batch(self, progress, batch, rows_read):
+        """Write valid reviews and the progress in one transaction"""
+        users = self.existing(User, [review.user_id for review in batch])
+        rooms = self.existing(Room, [review.room_id for review in batch])
+        experiences = self.existing(
+            Experience, [review.experience_id for review in batch]
+        )
+        valid = [
+            review
+            for review in batch
+            if review.user_id in users
+            and (review.room_id is None or review.room_id in rooms)
+            and (review.experience_id is None or review.experience_id in experiences)
+        ]
+        with transaction.atomic():
+            Review.objects.bulk_create(valid)
+            progress.rows = rows_read
+            progress.save(update_fields=["rows", "updated_at"])
+        return len(batch) - len(valid)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"]).resolve()
+        if not path.exists():
+            raise CommandError(f"{path} doesn't exist")
+        file_format = options["format"] or (
+            "csv" if path.suffix.lower() == ".csv" else "ndjson"
+        )
+        batch_size = options["batch_size"]
+        self.now = timezone.now()
+
+        progress, _ = ReviewImport.objects.get_or_create(source=str(path))
+        if options["restart"]:
+            progress.rows = 0
+            progress.finished = False
+            progress.save()
+        elif progress.finished:
+            self.stdout.write(f"{path} was already imported ({progress.rows} rows)")
+            return
+        skip = progress.rows
+        if skip:
+            self.stdout.write(f"Resuming after {skip} rows")
+
+        # every target in the file, also the rows of earlier runs
+        room_pks, experience_pks = set(), set()
+        batch, rows_read, skipped = [], 0, 0
+        started = time.monotonic()
+        with keep_timestamps():
+            for row in self.read_rows(path, file_format):
+                rows_read += 1
+                try:
+                    review = self.to_review(row)
+                except (KeyError, TypeError, ValueError):
+                    if rows_read > skip:
+                        skipped += 1
+                    continue
+                if review.room_id:
+                    room_pks.add(review.room_id)
+                if review.experience_id:
+                    experience_pks.add(review.experience_id)
+                if rows_read <= skip:
+                    continue
+                batch.append(review)
+                if len(batch) >= batch_size:
+                    skipped += self.write_batch(progress, batch, rows_read)
+                    batch = []
+                    rate = (rows_read - skip) / (time.monotonic() - started)
+                    self.stdout.write(f"{rows_read} rows ({rate:.0f} rows/s)")
+            if batch:
+                skipped += self.write_batch(progress, batch, rows_read)
+
+        self.stdout.write(
+            f"Rebuilding histograms of {len(room_pks)} rooms "
+            f"and {len(experience_pks)} experiences"
+        )
+        room_pks, experience_pks = sorted(room_pks), sorted(experience_pks)
+        for i in range(0, max(len(room_pks), len(experience_pks)), 1000):
+            RatingHistogram.rebuild(
+                room_pks=room_pks[i : i + 1000],
+                experience_pks=experience_pks[i : i + 1000],
+            )
+
+        progress.rows = rows_read
+        progress.finished = True
+        progress.save()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {path}: {rows_read} rows read, {skipped} skipped"
+            )
+        )
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.3 on 2026-10-19 17:22
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+import django.db.models.deletion
+
+
+def build_histograms(apps, schema_editor):
+    Review = apps.get_model("reviews", "Review")
+    RatingHistogram = apps.get_model("reviews", "RatingHistogram")
+    for target in ("room", "experience"):
+        rows = (
+            Review.objects.filter(**{f"{target}__isnull": False})
+            .values(target)
+            .annotate(
+                count=Count("pk"),
+                rating_sum=Sum("rating"),
+                stars_1=Count("pk", filter=Q(rating__lte=1)),
+                stars_2=Count("pk", filter=Q(rating=2)),
+                stars_3=Count("pk", filter=Q(rating=3)),
+                stars_4=Count("pk", filter=Q(rating=4)),
+                stars_5=Count("pk", filter=Q(rating__gte=5)),
+            )
+        )
+        RatingHistogram.objects.bulk_create(
+            [
+                RatingHistogram(**{f"{target}_id": row.pop(target)}, **row)
+                for row in rows
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("rooms", "0006_alter_room_amenities"),
+        ("experiences", "0004_experience_max_guests_search_indexes"),
+        ("reviews", "0005_alter_review_rating"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RatingHistogram",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("rating_sum", models.PositiveIntegerField(default=0)),
+                ("stars_1", models.PositiveIntegerField(default=0)),
+                ("stars_2", models.PositiveIntegerField(default=0)),
+                ("stars_3", models.PositiveIntegerField(default=0)),
+                ("stars_4", models.PositiveIntegerField(default=0)),
+                ("stars_5", models.PositiveIntegerField(default=0)),
+                (
+                    "experience",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rating_histogram",
+                        to="experiences.experience",
+                    ),
+                ),
+                (
+                    "room",
+                    models.OneToOneField(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="rating_histogram",
+                        to="rooms.room",
+                    ),
+                ),
+            ],
+        ),
+        migrations.RunPython(build_histograms, migrations.RunPython.noop),
+    ]
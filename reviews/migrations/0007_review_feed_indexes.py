@@ -0,0 +1,25 @@
+# Generated by Django 4.2.3 on 2026-10-19 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reviews", "0006_ratinghistogram"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["room", "created_at"], name="reviews_rev_room_id_60a6db_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["experience", "created_at"],
+                name="reviews_rev_experie_64493a_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.3 on 2026-10-19 17:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reviews", "0007_review_feed_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReviewImport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("source", models.CharField(max_length=255, unique=True)),
+                ("rows", models.PositiveIntegerField(default=0)),
+                ("finished", models.BooleanField(default=False)),
+            ],
+            options={
+                "abstract": False,
+            },
+        ),
+    ]
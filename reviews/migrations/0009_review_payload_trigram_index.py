@@ -0,0 +1,30 @@
+# Generated by Django 4.2.3 on 2026-10-19 18:02
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    # pg_trgm makes payload ILIKE '%word%' an index scan, sqlite has no such thing
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS reviews_review_payload_trgm "
+        "ON reviews_review USING gin (payload gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS reviews_review_payload_trgm")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reviews", "0008_reviewimport"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.3 on 2026-10-20 09:12
+
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.db import migrations, models
+from django.db.models.functions import Cast, Upper
+
+# payload__icontains compiles to UPPER("payload"::text) LIKE UPPER(%s) on
+# PostgreSQL, the planner only uses an index on that same expression
+PAYLOAD_SEARCH_INDEX = GinIndex(
+    OpClass(Upper(Cast("payload", models.TextField())), name="gin_trgm_ops"),
+    name="reviews_payload_upper_trgm",
+)
+
+
+def create_upper_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Review = apps.get_model("reviews", "Review")
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # never chosen for icontains, see above
+    schema_editor.execute("DROP INDEX IF EXISTS reviews_review_payload_trgm")
+    schema_editor.add_index(Review, PAYLOAD_SEARCH_INDEX)
+
+
+def drop_upper_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Review = apps.get_model("reviews", "Review")
+    schema_editor.remove_index(Review, PAYLOAD_SEARCH_INDEX)
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS reviews_review_payload_trgm "
+        "ON reviews_review USING gin (payload gin_trgm_ops)"
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("reviews", "0009_review_payload_trigram_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_upper_index, drop_upper_index),
+    ]
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, F, Q, Sum
+from django.core.exceptions import ObjectDoesNotExist
 from common.models import CommonModel
 
 
@@ -31,3 +33,146 @@ class Review(CommonModel):
 
     def __str__(self) -> str:
         return f"{self.user} / {self.rating}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["room", "created_at"]),
+            models.Index(fields=["experience", "created_at"]),
+        ]
+
+    def save(self, *args, **kwargs):
+        # the histograms change in the same transaction as the review
+        with transaction.atomic():
+            old = None
+            if self.pk:
+                old = (
+                    Review.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values("rating", "room_id", "experience_id")
+                    .first()
+                )
+            new = {
+                "rating": self.rating,
+                "room_id": self.room_id,
+                "experience_id": self.experience_id,
+            }
+            super().save(*args, **kwargs)
+            if old != new:
+                if old:
+                    RatingHistogram.record(old, -1)
+                RatingHistogram.record(new, 1)
+
+
+class RatingHistogram(models.Model):
+    """1 to 5 star counts of a Room or an Experience, kept in step with Review"""
+
+    STARS = (1, 2, 3, 4, 5)
+
+    room = models.OneToOneField(
+        "rooms.Room",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="rating_histogram",
+    )
+    experience = models.OneToOneField(
+        "experiences.Experience",
+        null=True,
+        blank=True,
+        on_delete=models.CASCADE,
+        related_name="rating_histogram",
+    )
+    count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.room or self.experience} / {self.average}"
+
+    @property
+    def average(self):
+        if not self.count:
+            return 0
+        return round(self.rating_sum / self.count, 1)
+
+    @classmethod
+    def of(cls, target):
+        """The target's histogram, an empty one when it has no reviews"""
+        try:
+            return target.rating_histogram
+        except ObjectDoesNotExist:
+            return cls()
+
+    @classmethod
+    def star_field(cls, rating):
+        # ratings outside 1~5 are counted in the nearest bucket
+        return f"stars_{min(max(rating, 1), 5)}"
+
+    @classmethod
+    def record(cls, review, delta):
+        """Add (delta=1) or take away (delta=-1) one review with F() updates"""
+        changes = {
+            "count": F("count") + delta,
+            "rating_sum": F("rating_sum") + delta * review["rating"],
+            cls.star_field(review["rating"]): F(cls.star_field(review["rating"]))
+            + delta,
+        }
+        for target in ("room_id", "experience_id"):
+            if not review[target]:
+                continue
+            updated = cls.objects.filter(**{target: review[target]}).update(**changes)
+            if updated or delta < 0:
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        **{target: review[target]},
+                        count=1,
+                        rating_sum=review["rating"],
+                        **{cls.star_field(review["rating"]): 1},
+                    )
+            except IntegrityError:
+                # somebody created it first
+                cls.objects.filter(**{target: review[target]}).update(**changes)
+
+    @classmethod
+    def rebuild(cls, room_pks=(), experience_pks=()):
+        """Recount the histograms of these targets from their reviews"""
+        with transaction.atomic():
+            for target, pks in (("room", room_pks), ("experience", experience_pks)):
+                pks = list(pks)
+                if not pks:
+                    continue
+                cls.objects.filter(**{f"{target}__in": pks}).delete()
+                rows = (
+                    Review.objects.filter(**{f"{target}__in": pks})
+                    .values(target)
+                    .annotate(
+                        count=Count("pk"),
+                        rating_sum=Sum("rating"),
+                        stars_1=Count("pk", filter=Q(rating__lte=1)),
+                        stars_2=Count("pk", filter=Q(rating=2)),
+                        stars_3=Count("pk", filter=Q(rating=3)),
+                        stars_4=Count("pk", filter=Q(rating=4)),
+                        stars_5=Count("pk", filter=Q(rating__gte=5)),
+                    )
+                )
+                cls.objects.bulk_create(
+                    [cls(**{f"{target}_id": row.pop(target)}, **row) for row in rows],
+                    batch_size=1000,
+                )
+
+
+class ReviewImport(CommonModel):
+    """Progress of an import_reviews run, so that an interrupted one can resume"""
+
+    source = models.CharField(max_length=255, unique=True)
+    rows = models.PositiveIntegerField(default=0)
+    finished = models.BooleanField(default=False)
+
+    def __str__(self) -> str:
+        return f"{self.source} / {self.rows} rows"
@@ -1,6 +1,6 @@
 from rest_framework import serializers
 
-from .models import Review
+from .models import Review, RatingHistogram
 from users.serializers import TinyUserSerializer
 
 
@@ -10,8 +10,23 @@ class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
         fields = (
+            "pk",
             "user",
             "payload",
             "rating",
             "created_at",
         )
+
+
+class RatingHistogramSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RatingHistogram
+        fields = (
+            "count",
+            "average",
+            "stars_1",
+            "stars_2",
+            "stars_3",
+            "stars_4",
+            "stars_5",
+        )
@@ -0,0 +1,17 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Review, RatingHistogram
+
+
+@receiver(post_delete, sender=Review)
+def review_deleted(sender, instance, **kwargs):
+    # also runs for queryset deletes and cascades, inside their transaction
+    RatingHistogram.record(
+        {
+            "rating": instance.rating,
+            "room_id": instance.room_id,
+            "experience_id": instance.experience_id,
+        },
+        -1,
+    )
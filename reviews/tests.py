@@ -1,3 +1,281 @@
-from django.test import TestCase
+import json
+import re
+from importlib import import_module
+from io import StringIO
+import tempfile
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+from django.db.backends.postgresql.base import DatabaseWrapper
+from django.test.utils import CaptureQueriesContext
+
+from rest_framework.test import APITestCase
+
+from config.throttles import store
+from django.contrib.admin import site
+
+from .admin import ReviewAdmin
+from .models import Review, RatingHistogram, ReviewImport
+from users.models import User
+from rooms.models import Room
+from experiences.models import Experience
 
 # Create your tests here.
+
+
+class ReviewTestCase(APITestCase):
+    def setUp(self):
+        store.clear()
+        self.user = User.objects.create(username="guest")
+        self.room = Room.objects.create(
+            name="Room",
+            price=100,
+            rooms=1,
+            toilets=1,
+            description="",
+            address="",
+            kind=Room.RoomKindChoices.PRIVATE_ROOM,
+            owner=self.user,
+        )
+        self.experience = Experience.objects.create(
+            name="Experience",
+            host=self.user,
+            price=10,
+            address="",
+            start="10:00",
+            end="12:00",
+            description="",
+        )
+
+    def review(self, rating, **kwargs):
+        kwargs.setdefault("room", self.room)
+        kwargs.setdefault("payload", "")
+        return Review.objects.create(
+            user=self.user,
+            rating=rating,
+            **kwargs,
+        )
+
+
+class TestRatingHistogram(ReviewTestCase):
+    def histogram(self):
+        histogram = RatingHistogram.objects.get(room=self.room)
+        return [getattr(histogram, f"stars_{n}") for n in RatingHistogram.STARS]
+
+    def test_create_update_delete(self):
+        first = self.review(5)
+        self.review(3)
+        self.review(3)
+        self.assertEqual(self.histogram(), [0, 0, 2, 0, 1])
+
+        first.rating = 1
+        first.save()
+        self.assertEqual(self.histogram(), [1, 0, 2, 0, 0])
+
+        first.delete()
+        Review.objects.filter(rating=3).delete()
+        self.assertEqual(self.histogram(), [0, 0, 0, 0, 0])
+
+    def test_moving_a_review(self):
+        review = self.review(4)
+
+        review.room = None
+        review.experience = self.experience
+        review.save()
+
+        self.assertEqual(self.histogram(), [0, 0, 0, 0, 0])
+        histogram = RatingHistogram.objects.get(experience=self.experience)
+        self.assertEqual(histogram.stars_4, 1)
+
+    def test_rebuild(self):
+        self.review(2)
+        self.review(5)
+        RatingHistogram.objects.all().delete()
+
+        RatingHistogram.rebuild(room_pks=[self.room.pk])
+
+        self.assertEqual(self.histogram(), [0, 1, 0, 0, 1])
+        self.assertEqual(self.room.rating(), 3.5)
+
+
+class TestReviewSummary(ReviewTestCase):
+    def test_room_summary(self):
+        self.review(4)
+        self.review(5)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/v1/rooms/{self.room.pk}/reviews/summary")
+
+        data = response.json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual(data["average"], 4.5)
+        self.assertEqual(data["stars_5"], 1)
+
+    def test_no_reviews(self):
+        response = self.client.get(
+            f"/api/v1/experiences/{self.experience.pk}/reviews/summary"
+        )
+
+        self.assertEqual(response.json()["count"], 0)
+
+    def test_detail_histogram(self):
+        self.review(2, room=None, experience=self.experience)
+
+        response = self.client.get(f"/api/v1/experiences/{self.experience.pk}/")
+
+        data = response.json()
+        self.assertEqual(data["rating"], 2)
+        self.assertEqual(data["rating_histogram"]["stars_2"], 1)
+
+
+class TestReviewFeed(ReviewTestCase):
+    def setUp(self):
+        super().setUp()
+        for rating in (3, 5, 1, 5, 2):
+            self.review(rating)
+        self.URL = f"/api/v1/rooms/{self.room.pk}/reviews"
+
+    def read_feed(self, **params):
+        pks = []
+        while True:
+            data = self.client.get(self.URL, params).json()
+            pks.extend(review["pk"] for review in data["results"])
+            if not data["next"]:
+                return pks
+            params["cursor"] = data["next"]
+
+    def test_sorts(self):
+        reviews = self.room.reviews.all()
+
+        self.assertEqual(
+            self.read_feed(page_size=2),
+            [review.pk for review in reviews.order_by("-created_at", "-pk")],
+        )
+        self.assertEqual(
+            self.read_feed(page_size=2, sort="highest"),
+            [review.pk for review in reviews.order_by("-rating", "-created_at", "-pk")],
+        )
+        self.assertEqual(
+            self.read_feed(page_size=2, sort="lowest"),
+            [review.pk for review in reviews.order_by("rating", "-created_at", "-pk")],
+        )
+
+    def test_users_are_joined(self):
+        # room, reviews with users
+        with self.assertNumQueries(2):
+            response = self.client.get(self.URL, {"page_size": 5})
+
+        self.assertEqual(response.json()["results"][0]["user"]["username"], "guest")
+
+    def test_wrong_sort(self):
+        response = self.client.get(self.URL, {"sort": "random"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class TestImportReviews(ReviewTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "reviews.ndjson"
+        rows = [
+            {"user": self.user.pk, "room": self.room.pk, "payload": "a", "rating": 5},
+            {"user": self.user.pk, "room": self.room.pk, "payload": "b", "rating": 3},
+            {"user": 999, "room": self.room.pk, "payload": "c", "rating": 4},
+            {"user": self.user.pk, "rating": "bad"},
+            {
+                "user": self.user.pk,
+                "experience": self.experience.pk,
+                "payload": "d",
+                "rating": 4,
+                "created_at": "2020-01-02T03:04:05+00:00",
+            },
+        ]
+        self.path.write_text("\n".join(json.dumps(row) for row in rows))
+
+    def run_import(self, **options):
+        call_command("import_reviews", str(self.path), stdout=StringIO(), **options)
+
+    def test_import(self):
+        self.run_import(batch_size=2)
+
+        self.assertEqual(Review.objects.count(), 3)
+        review = Review.objects.get(payload="d")
+        self.assertEqual(review.created_at.year, 2020)
+        self.assertEqual(RatingHistogram.of(self.room).count, 2)
+        self.assertEqual(RatingHistogram.of(self.experience).stars_4, 1)
+        self.assertTrue(ReviewImport.objects.get().finished)
+
+        # finished files are not imported twice
+        self.run_import()
+        self.assertEqual(Review.objects.count(), 3)
+
+    def test_resume(self):
+        # an earlier run stopped after the first two rows
+        ReviewImport.objects.create(source=str(self.path.resolve()), rows=2)
+
+        self.run_import(batch_size=2)
+
+        self.assertEqual(
+            list(Review.objects.values_list("payload", flat=True)),
+            ["d"],
+        )
+        self.assertEqual(RatingHistogram.of(self.experience).count, 1)
+
+
+class TestReviewAdmin(ReviewTestCase):
+    URL = "/admin/reviews/review/"
+
+    def setUp(self):
+        super().setUp()
+        self.user.is_staff = self.user.is_superuser = True
+        self.user.save()
+        self.client.force_login(self.user)
+
+    def count_queries(self, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.URL, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow(self):
+        self.review(4, payload="Great room")
+        few = self.count_queries({})
+
+        for rating in range(1, 6):
+            self.review(rating, payload="so so")
+
+        self.assertEqual(self.count_queries({}), few)
+
+    def test_word_filter_ignores_case(self):
+        self.review(4, payload="Great room")
+        self.review(2, payload="so so")
+
+        response = self.client.get(self.URL, {"word": "great"})
+
+        self.assertEqual(response.context["cl"].result_count, 1)
+
+    def test_search_matches_the_trigram_index(self):
+        # compiled for PostgreSQL, no server needed
+        postgres = DatabaseWrapper(
+            {**connection.settings_dict, "ENGINE": "django.db.backends.postgresql"}
+        )
+        index = import_module(
+            "reviews.migrations.0010_review_payload_upper_trigram_index"
+        ).PAYLOAD_SEARCH_INDEX
+        with postgres.schema_editor(collect_sql=True, atomic=False) as editor:
+            index_sql = str(index.create_sql(Review, editor))
+        request = self.client.get(self.URL, {"q": "great"}).wsgi_request
+        changelist = ReviewAdmin(Review, site).get_changelist_instance(request)
+        query_sql, _ = changelist.queryset.query.get_compiler(
+            connection=postgres
+        ).as_sql()
+
+        def normalize(sql):
+            return re.sub(r'[()"]', "", sql).replace("reviews_review.", "")
+
+        indexed = re.search(r"gin \((.*) gin_trgm_ops\)", index_sql).group(1)
+        self.assertIn(f"{normalize(indexed)} LIKE", normalize(query_sql))
+        self.assertEqual(normalize(indexed), "UPPERpayload::text")
@@ -1,3 +1,22 @@
-from django.shortcuts import render
+from rest_framework.exceptions import ParseError
 
-# Create your views here.
+from .serializers import ReviewSerializer
+from common.paginations import KeysetPagination
+
+# ?sort= for the review feeds, pk last so the ordering has no ties
+REVIEW_SORTS = {
+    "newest": ("-created_at", "-pk"),
+    "highest": ("-rating", "-created_at", "-pk"),
+    "lowest": ("rating", "-created_at", "-pk"),
+}
+
+
+def review_feed(request, reviews):
+    """?sort=newest|highest|lowest&cursor=&page_size="""
+    sort = request.query_params.get("sort", "newest")
+    if sort not in REVIEW_SORTS:
+        raise ParseError("sort should be 'newest', 'highest' or 'lowest'")
+    paginator = KeysetPagination(ordering=REVIEW_SORTS[sort])
+    page = paginator.paginate_queryset(reviews.select_related("user"), request)
+    serializer = ReviewSerializer(page, many=True)
+    return paginator.get_paginated_response(serializer.data)
@@ -1,20 +1,76 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.helpers import ActionForm
+from django.db import transaction
+from django.db.models import Avg, Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from categories import counters
+from categories.models import Category
+from common import reference
+from common.bulk import bulk_action
+from common.paginations import EstimatedCountPaginator
+from . import facets
 from .models import Room, Amenity
 
 # Register your models here.
 
 
-@admin.action(description="Set all price to zero")
-def reset_prices(model_admin, request, rooms):
-    for room in rooms.all():
-        room.price = 0
-        room.save()
+@bulk_action("Set all price to zero")
+def reset_prices(rooms):
+    rooms.update(price=0)
+    # update()는 signal을 보내지 않는다.
+    transaction.on_commit(facets.invalidate)
+
+
+@bulk_action("Move to category", target="category")
+def move_to_category(category_pk, rooms):
+    previous = set(rooms.values_list("category_id", flat=True).distinct())
+    rooms.update(category_id=category_pk)
+    counters.recount(previous | {category_pk})
+    transaction.on_commit(facets.invalidate)
+
+
+@bulk_action("Add amenity", target="amenity")
+def add_amenity(amenity_pk, rooms):
+    through = Room.amenities.through
+    through.objects.bulk_create(
+        [
+            through(room_id=room_pk, amenity_id=amenity_pk)
+            for room_pk in rooms.values_list("pk", flat=True)
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    transaction.on_commit(facets.invalidate)
+
+
+class RoomActionForm(ActionForm):
+    category = forms.TypedChoiceField(
+        label="Category:", coerce=int, required=False, empty_value=None
+    )
+    amenity = forms.TypedChoiceField(
+        label="Amenity:", coerce=int, required=False, empty_value=None
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # 쿼리 없이 common.reference의 사본에서 고른다.
+        self.fields["category"].choices = [("", "---------")] + [
+            (category.pk, category.name)
+            for category in reference.categories.all()
+            if category.kind == Category.CategoryKindChoices.ROOMS
+        ]
+        self.fields["amenity"].choices = [("", "---------")] + [
+            (amenity.pk, amenity.name) for amenity in reference.amenities.all()
+        ]
 
 
 @admin.register(Room)
 class RoomAdmin(admin.ModelAdmin):
     # 위의 액션을 Admin패널에 추가해준다.
-    actions = (reset_prices,)
+    actions = (reset_prices, move_to_category, add_amenity)
+    action_form = RoomActionForm
     list_display = (
         "pk",
         "name",
@@ -39,9 +95,36 @@ class RoomAdmin(admin.ModelAdmin):
         "=price",
         "owner__username",
     )
+    list_select_related = ("owner",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # 페이지의 모든 row를 한 번의 쿼리로: amenity 수와 평점을 미리 계산한다.
+        amenities = (
+            Room.amenities.through.objects.filter(room_id=OuterRef("pk"))
+            .values("room_id")
+            .annotate(count=Count("*"))
+            .values("count")
+        )
+        return (
+            super()
+            .get_queryset(request)
+            .annotate(
+                amenity_count=Coalesce(
+                    Subquery(amenities, output_field=IntegerField()), 0
+                ),
+                avg_rating=Avg("reviews__rating"),
+            )
+        )
 
+    @admin.display(ordering="amenity_count")
     def total_amenities(self, room):
-        return room.amenities.count()
+        return room.amenity_count
+
+    @admin.display(ordering="avg_rating")
+    def rating(self, room):
+        return room.rating()
 
 
 @admin.register(Amenity)
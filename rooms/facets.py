@@ -0,0 +1,159 @@
+"""
+Room search filters and the facet counts shown next to them.
+
+All facets are counted in one statement: a UNION ALL of one GROUP BY per
+facet. Each part applies every filter except the facet's own, so the other
+values of a facet keep their counts while one of them is selected.
+Results are cached per normalized filter set under a version that changes
+whenever rooms do.
+"""
+
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Case, CharField, Count, Q, Value, When
+from django.db.models.functions import Cast
+
+from rest_framework.exceptions import ParseError
+
+from common import versions
+from .models import Room
+
+PRICE_BUCKETS = (0, 50, 100, 200, 500)
+
+TIMEOUT = 60 * 5
+
+VERSION_KEY = "rooms:facets:version"
+
+
+def split_pks(value):
+    return sorted({int(pk) for pk in value.split(",") if pk})
+
+
+def parse_filters(params):
+    """
+    ?kind=private_room,shared_room&category=1,2  (any of them)
+    &amenities=1,2  (has all of them)
+    &pet_friendly=true&min_price=&max_price=&city=&country=
+    """
+    filters = {}
+    try:
+        for name in ("city", "country"):
+            if params.get(name):
+                filters[name] = params[name]
+        if params.get("kind"):
+            filters["kind"] = sorted(set(params["kind"].split(",")))
+        for name in ("category", "amenities"):
+            if params.get(name):
+                filters[name] = split_pks(params[name])
+        if params.get("pet_friendly"):
+            filters["pet_friendly"] = params["pet_friendly"].lower() in ("1", "true")
+        for name in ("min_price", "max_price"):
+            if params.get(name):
+                filters[name] = int(params[name])
+    except ValueError:
+        raise ParseError("Invalid search parameters")
+    return filters
+
+
+def filter_rooms(rooms, filters, skip=()):
+    """Apply the parsed filters, except the ones named in skip"""
+    filters = {name: value for name, value in filters.items() if name not in skip}
+    if "city" in filters:
+        rooms = rooms.filter(city=filters["city"])
+    if "country" in filters:
+        rooms = rooms.filter(country=filters["country"])
+    if "kind" in filters:
+        rooms = rooms.filter(kind__in=filters["kind"])
+    if "category" in filters:
+        rooms = rooms.filter(category_id__in=filters["category"])
+    if "pet_friendly" in filters:
+        rooms = rooms.filter(pet_friendly=filters["pet_friendly"])
+    if "min_price" in filters:
+        rooms = rooms.filter(price__gte=filters["min_price"])
+    if "max_price" in filters:
+        rooms = rooms.filter(price__lte=filters["max_price"])
+    if "amenities" in filters:
+        # amenity 개수와 상관없이 through 테이블을 한 번만 본다
+        matches = (
+            Room.amenities.through.objects.filter(amenity_id__in=filters["amenities"])
+            .values("room_id")
+            .annotate(matched=Count("amenity_id"))
+            .filter(matched=len(filters["amenities"]))
+            .values("room_id")
+        )
+        rooms = rooms.filter(pk__in=matches)
+    return rooms
+
+
+def price_bucket():
+    bounds = list(zip(PRICE_BUCKETS, PRICE_BUCKETS[1:]))
+    return Case(
+        *[When(price__lt=high, then=Value(f"{low}-{high}")) for low, high in bounds],
+        default=Value(f"{PRICE_BUCKETS[-1]}+"),
+        output_field=CharField(),
+    )
+
+
+def grouped(queryset, facet, value):
+    return (
+        queryset.order_by()
+        .annotate(facet=Value(facet), value=value)
+        .values("facet", "value")
+        .annotate(count=Count("pk"))
+    )
+
+
+def count_facets(filters):
+    def without(*names):
+        return filter_rooms(Room.objects.all(), filters, skip=names)
+
+    parts = [
+        grouped(without(), "total", Value("")),
+        grouped(without("kind"), "kind", Cast("kind", CharField())),
+        grouped(without("category"), "category", Cast("category_id", CharField())),
+        grouped(
+            without("pet_friendly"),
+            "pet_friendly",
+            Case(
+                When(pet_friendly=True, then=Value("true")),
+                default=Value("false"),
+                output_field=CharField(),
+            ),
+        ),
+        grouped(without("min_price", "max_price"), "price", price_bucket()),
+        grouped(
+            Room.amenities.through.objects.filter(room__in=without()),
+            "amenities",
+            Cast("amenity_id", CharField()),
+        ),
+    ]
+    facets = {
+        "kind": {},
+        "category": {},
+        "amenities": {},
+        "pet_friendly": {},
+        "price": {},
+    }
+    total = 0
+    for row in parts[0].union(*parts[1:], all=True):
+        if row["facet"] == "total":
+            total = row["count"]
+        elif row["value"] is not None:
+            facets[row["facet"]][row["value"]] = row["count"]
+    return {"count": total, "facets": facets}
+
+
+def invalidate():
+    versions.bump(VERSION_KEY)
+
+
+def get_facets(filters):
+    digest = hashlib.sha1(json.dumps(filters, sort_keys=True).encode()).hexdigest()
+    key = f"rooms:facets:{versions.get_version(VERSION_KEY)}:{digest}"
+    facets = cache.get(key)
+    if facets is None:
+        facets = count_facets(filters)
+        cache.set(key, facets, TIMEOUT)
+    return facets
@@ -1,4 +1,5 @@
 from django.db import models
+from django.core.exceptions import ObjectDoesNotExist
 from common.models import CommonModel
 
 # Create your models here.
@@ -42,19 +43,27 @@ class Room(CommonModel):
         on_delete=models.SET_NULL,
         related_name="rooms",
     )
+    # the first of photos, kept up to date by medias.signals
+    cover_photo = models.ForeignKey(
+        "medias.Photo",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="+",
+    )
 
     def __str__(self):
         return self.name
 
     def rating(room):
-        count = room.reviews.count()
-        if count == 0:
+        # list views annotate the average in the same query (avg_rating)
+        if hasattr(room, "avg_rating"):
+            return round(room.avg_rating or 0, 1)
+        # otherwise the histogram has it, no scan over the reviews
+        try:
+            return room.rating_histogram.average
+        except ObjectDoesNotExist:
             return 0
-        else:
-            total_rating = 0
-            for review in room.reviews.all().values("rating"):
-                total_rating += review["rating"]
-            return round(total_rating / count, 1)
 
 
 class Amenity(CommonModel):
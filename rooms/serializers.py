@@ -1,10 +1,11 @@
 from rest_framework import serializers
 
 from .models import Amenity, Room
-from wishlists.models import Wishlist
+from wishlists.liked import liked_for
 
 from users.serializers import TinyUserSerializer
-from reviews.serializers import ReviewSerializer
+from reviews.models import RatingHistogram
+from reviews.serializers import ReviewSerializer, RatingHistogramSerializer
 from categories.serializers import CategorySerializer
 from medias.serializers import PhotoSerializer
 
@@ -23,7 +24,8 @@ class RoomListSerializer(serializers.ModelSerializer):
     rating = serializers.SerializerMethodField()
     is_owner = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
-    photos = PhotoSerializer(many=True, read_only=True)
+    # 카드에는 사진 한 장만, 전체 사진은 detail에서
+    cover_photo = PhotoSerializer(read_only=True)
 
     class Meta:
         model = Room
@@ -36,7 +38,7 @@ class RoomListSerializer(serializers.ModelSerializer):
             "rating",
             "is_owner",
             "is_liked",
-            "photos",
+            "cover_photo",
         )
 
     def get_rating(self, room):
@@ -44,16 +46,10 @@ class RoomListSerializer(serializers.ModelSerializer):
 
     def get_is_owner(self, room):
         request = self.context["request"]
-        return room.owner == request.user
+        return room.owner_id == request.user.pk
 
     def get_is_liked(self, room):
-        request = self.context["request"]
-        if request.user.is_authenticated:
-            return Wishlist.objects.filter(
-                user=request.user,
-                rooms__pk=room.pk,
-            ).exists()
-        return False
+        return room.pk in liked_for(self.context).rooms
 
 
 class RoomDetailSerializer(serializers.ModelSerializer):
@@ -64,6 +60,7 @@ class RoomDetailSerializer(serializers.ModelSerializer):
     )
     category = CategorySerializer(read_only=True)
     rating = serializers.SerializerMethodField()
+    rating_histogram = serializers.SerializerMethodField()
     is_owner = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
     photos = PhotoSerializer(many=True, read_only=True)
@@ -75,6 +72,9 @@ class RoomDetailSerializer(serializers.ModelSerializer):
     def get_rating(self, room):
         return room.rating()
 
+    def get_rating_histogram(self, room):
+        return RatingHistogramSerializer(RatingHistogram.of(room)).data
+
     def get_is_owner(self, room):
         request = self.context["request"]
         if request:
@@ -82,14 +82,7 @@ class RoomDetailSerializer(serializers.ModelSerializer):
         return False
 
     def get_is_liked(self, room):
-        request = self.context["request"]
-        if request:
-            if request.user.is_authenticated:
-                return Wishlist.objects.filter(
-                    user=request.user,
-                    rooms__pk=room.pk,
-                ).exists()
-        return False
+        return room.pk in liked_for(self.context).rooms
 
 
 class TinyRoomSerializer(serializers.ModelSerializer):
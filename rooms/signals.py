@@ -0,0 +1,18 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from . import facets
+from .models import Room
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def room_changed(sender, **kwargs):
+    transaction.on_commit(facets.invalidate)
+
+
+@receiver(m2m_changed, sender=Room.amenities.through)
+def amenities_changed(sender, action, **kwargs):
+    if action.startswith("post_"):
+        transaction.on_commit(facets.invalidate)
@@ -1,5 +1,13 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
 from rest_framework.test import APITestCase
 from . import models
+from categories.models import Category
+from common.models import BulkJob
+from reviews.models import Review
 from users.models import User
 
 # Create your tests here.
@@ -12,6 +20,7 @@ class TestAmenities(APITestCase):
 
     # 다른 모든 테스트들이 실행되기 전에 수행된는 메소드이다. => 테스트 데이터베이스를 설정할 수 있는 곳이다.
     def setUp(self) -> None:
+        cache.clear()
         # DB에 새로운 Amenity객체를 하나 생성한다.
         models.Amenity.objects.create(
             name=self.NAME,
@@ -191,3 +200,214 @@ class TestRooms(APITestCase):
             400,
             "You are forbidden!",
         )
+
+
+class TestRoomAdmin(APITestCase):
+    URL = "/admin/rooms/room/"
+
+    def setUp(self):
+        self.user = User.objects.create(
+            username="admin", is_staff=True, is_superuser=True
+        )
+        self.amenity = models.Amenity.objects.create(name="Wifi")
+        self.client.force_login(self.user)
+
+    def create_room(self, rating):
+        owner = User.objects.create(username=f"owner{models.Room.objects.count()}")
+        room = models.Room.objects.create(
+            name="Room",
+            price=100,
+            rooms=1,
+            toilets=1,
+            description="",
+            address="",
+            kind=models.Room.RoomKindChoices.PRIVATE_ROOM,
+            owner=owner,
+        )
+        room.amenities.add(self.amenity)
+        Review.objects.create(user=owner, room=room, payload="", rating=rating)
+        return room
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_changelist_queries_do_not_grow(self):
+        self.create_room(4)
+        few = self.count_queries()
+
+        for rating in range(1, 6):
+            self.create_room(rating)
+
+        self.assertEqual(self.count_queries(), few)
+
+    def test_annotated_columns(self):
+        room = self.create_room(4)
+        Review.objects.create(user=self.user, room=room, payload="", rating=5)
+
+        response = self.client.get(self.URL)
+
+        room = response.context["cl"].result_list[0]
+        self.assertEqual(room.amenity_count, 1)
+        self.assertEqual(room.rating(), 4.5)
+
+
+class TestRoomBulkActions(TestRoomAdmin):
+    def setUp(self):
+        super().setUp()
+        self.rooms = [self.create_room(5) for _ in range(5)]
+        self.pks = [room.pk for room in self.rooms]
+
+    def run_action(self, action, pks, **target):
+        return self.client.post(
+            self.URL,
+            {"action": action, "_selected_action": pks, "index": 0, **target},
+        )
+
+    def test_reset_prices_is_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.run_action("reset_prices", self.pks[:3])
+
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            list(models.Room.objects.order_by("pk").values_list("price", flat=True)),
+            [0, 0, 0, 100, 100],
+        )
+
+    def test_category_and_amenity_actions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            category = Category.objects.create(
+                name="Cabins", kind=Category.CategoryKindChoices.ROOMS
+            )
+            pool = models.Amenity.objects.create(name="Pool")
+
+        self.run_action("move_to_category", self.pks[:2], category=category.pk)
+        self.run_action("add_amenity", self.pks, amenity=pool.pk)
+        self.run_action("add_amenity", self.pks, amenity=pool.pk)
+
+        self.assertEqual(category.rooms.count(), 2)
+        self.assertEqual(pool.rooms.count(), 5)
+
+    def test_target_is_required(self):
+        response = self.run_action("add_amenity", self.pks, amenity="")
+
+        self.assertEqual(
+            [str(message) for message in response.wsgi_request._messages],
+            ["Add amenity: choose the amenity first"],
+        )
+        self.assertEqual(self.amenity.rooms.count(), 5)
+        self.assertFalse(models.Amenity.objects.exclude(pk=self.amenity.pk).exists())
+
+    def test_changelist_reads_targets_from_reference(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(
+                name="Huts", kind=Category.CategoryKindChoices.ROOMS
+            )
+        self.client.get(self.URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.URL)
+
+        self.assertContains(response, "Huts")
+        sql = [query["sql"] for query in queries]
+        self.assertFalse([q for q in sql if "categories_category" in q])
+        # only the one of the amenities list filter
+        self.assertEqual(len([q for q in sql if 'FROM "rooms_amenity"' in q]), 1)
+
+    @override_settings(
+        BULK_ACTION_INLINE_LIMIT=2,
+        BULK_ACTION_CHUNK_SIZE=2,
+        BULK_ACTION_BACKGROUND=False,
+    )
+    def test_big_selection_runs_in_chunks(self):
+        self.run_action("reset_prices", self.pks)
+
+        job = BulkJob.objects.get()
+        self.assertEqual(job.status, BulkJob.StatusChoices.FINISHED)
+        self.assertEqual((job.done, job.total), (5, 5))
+        self.assertFalse(models.Room.objects.exclude(price=0).exists())
+
+
+class TestRoomFacets(APITestCase):
+    URL = "/api/v1/rooms/facets"
+
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(username="owner")
+        self.category = Category.objects.create(
+            name="Cabins", kind=Category.CategoryKindChoices.ROOMS
+        )
+        self.wifi = models.Amenity.objects.create(name="Wifi")
+        for price, kind, pet_friendly in (
+            (30, models.Room.RoomKindChoices.PRIVATE_ROOM, True),
+            (80, models.Room.RoomKindChoices.PRIVATE_ROOM, False),
+            (150, models.Room.RoomKindChoices.ENTIRE_PLACE, True),
+            (900, models.Room.RoomKindChoices.SHARED_ROOM, True),
+        ):
+            room = models.Room.objects.create(
+                name="Room",
+                price=price,
+                rooms=1,
+                toilets=1,
+                description="",
+                address="",
+                kind=kind,
+                pet_friendly=pet_friendly,
+                owner=self.owner,
+                category=self.category if price < 100 else None,
+            )
+            if pet_friendly:
+                room.amenities.add(self.wifi)
+
+    def test_all_facets_in_one_query(self):
+        with self.assertNumQueries(1):
+            data = self.client.get(self.URL).json()
+
+        self.assertEqual(data["count"], 4)
+        facets = data["facets"]
+        self.assertEqual(
+            facets["kind"],
+            {"private_room": 2, "entire_place": 1, "shared_room": 1},
+        )
+        self.assertEqual(facets["category"], {str(self.category.pk): 2})
+        self.assertEqual(facets["amenities"], {str(self.wifi.pk): 3})
+        self.assertEqual(facets["pet_friendly"], {"true": 3, "false": 1})
+        self.assertEqual(
+            facets["price"],
+            {"0-50": 1, "50-100": 1, "100-200": 1, "500+": 1},
+        )
+
+    def test_own_filter_is_left_out(self):
+        data = self.client.get(self.URL, {"kind": "private_room"}).json()
+
+        self.assertEqual(data["count"], 2)
+        # other kinds still show how many rooms they would add
+        self.assertEqual(data["facets"]["kind"]["shared_room"], 1)
+        self.assertEqual(data["facets"]["pet_friendly"], {"true": 1, "false": 1})
+
+    def test_cached_per_normalized_query(self):
+        self.client.get(self.URL, {"kind": "shared_room,private_room"})
+
+        with self.assertNumQueries(0):
+            self.client.get(self.URL, {"kind": "private_room,shared_room"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Room.objects.first().delete()
+        data = self.client.get(self.URL, {"kind": "private_room,shared_room"}).json()
+        self.assertEqual(data["count"], 2)
+
+    def test_list_uses_the_same_filters(self):
+        response = self.client.get(
+            "/api/v1/rooms/",
+            {"amenities": self.wifi.pk, "max_price": 200},
+        )
+
+        self.assertEqual(len(response.json()), 2)
+
+    def test_invalid_filter(self):
+        response = self.client.get(self.URL, {"min_price": "cheap"})
+
+        self.assertEqual(response.status_code, 400)
@@ -3,8 +3,10 @@ from . import views
 
 urlpatterns = [
     path("", views.Rooms.as_view()),
+    path("facets", views.RoomFacets.as_view()),
     path("<int:pk>/", views.RoomDetail.as_view()),
     path("<int:pk>/reviews", views.RoomReviews.as_view()),
+    path("<int:pk>/reviews/summary", views.RoomReviewSummary.as_view()),
     path("<int:pk>/photos", views.RoomPhotos.as_view()),
     path("<int:pk>/amenities", views.RoomAmenities.as_view()),
     path("<int:pk>/bookings", views.RoomBookings.as_view()),
@@ -14,11 +14,15 @@ from rest_framework.exceptions import (
 from rest_framework.status import HTTP_204_NO_CONTENT, HTTP_400_BAD_REQUEST
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 
+from .facets import filter_rooms, get_facets, parse_filters
 from .models import Amenity, Room
 from .serializers import AmenitySerializer, RoomListSerializer, RoomDetailSerializer
 from users.models import User
 from categories.models import Category
-from reviews.serializers import ReviewSerializer
+from common import reference
+from reviews.models import RatingHistogram
+from reviews.serializers import ReviewSerializer, RatingHistogramSerializer
+from reviews.views import review_feed
 from medias.serializers import PhotoSerializer
 from bookings.serializers import PublicBookingSerializer, CreateRoomBookingSerializer
 from bookings.models import Booking
@@ -29,12 +33,7 @@ from bookings.models import Booking
 # APIView for Amenities
 class Amenities(APIView):
     def get(self, request):
-        all_amenities = Amenity.objects.all()
-        serializer = AmenitySerializer(
-            all_amenities,
-            many=True,
-        )
-        return Response(serializer.data)
+        return reference.amenities.list_response(request, AmenitySerializer)
 
     def post(self, request):
         serializer = AmenitySerializer(data=request.data)
@@ -90,7 +89,11 @@ class Rooms(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get(self, request):
-        all_rooms = Room.objects.all()
+        all_rooms = filter_rooms(
+            Room.objects.all(), parse_filters(request.query_params)
+        )
+        # rating, 커버 사진을 한 쿼리로 가져온다
+        all_rooms = all_rooms.select_related("cover_photo", "rating_histogram")
         serializer = RoomListSerializer(
             all_rooms,
             many=True,
@@ -105,7 +108,7 @@ class Rooms(APIView):
             if not category_pk:
                 raise ParseError("Category is required")
             try:
-                category = Category.objects.get(pk=category_pk)
+                category = reference.categories.get(category_pk)
                 if category.kind == Category.CategoryKindChoices.EXPERIENCES:
                     raise ParseError("The category kind should be 'rooms'")
             except Category.DoesNotExist:
@@ -117,9 +120,9 @@ class Rooms(APIView):
                         category=category,
                     )
                     amenities = request.data.get("amenities")
-                    for amenity_pk in amenities:
-                        amenity = Amenity.objects.get(pk=amenity_pk)
-                        new_room.amenities.add(amenity)
+                    new_room.amenities.add(
+                        *[reference.amenities.get(pk) for pk in amenities]
+                    )
             except Amenity.DoesNotExist:
                 raise ParseError("Amenity not found")
             except Exception as e:
@@ -136,12 +139,23 @@ class Rooms(APIView):
             )
 
 
+class RoomFacets(APIView):
+    """Counts for every filter value, takes the same parameters as Rooms"""
+
+    def get(self, request):
+        return Response(get_facets(parse_filters(request.query_params)))
+
+
 class RoomDetail(APIView):
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_object(self, pk):
         try:
-            room = Room.objects.get(pk=pk)
+            room = (
+                Room.objects.select_related("owner", "category", "rating_histogram")
+                .prefetch_related("amenities", "photos")
+                .get(pk=pk)
+            )
             return room
         except Room.DoesNotExist:
             raise NotFound
@@ -166,7 +180,7 @@ class RoomDetail(APIView):
             category_pk = request.data.get("category")
             if category_pk:
                 try:
-                    category = Category.objects.get(pk=category_pk)
+                    category = reference.categories.get(category_pk)
                     if category.kind == Category.CategoryKindChoices.EXPERIENCES:
                         raise ParseError("The category kind should be 'rooms'")
                 except Category.DoesNotExist:
@@ -179,10 +193,10 @@ class RoomDetail(APIView):
                         updated_room = serializer.save()
                     amenities_list = request.data.get("amenities")
                     if amenities_list:
-                        updated_room.amenities.clear()
-                        for amenity_pk in amenities_list:
-                            amenity = Amenity.objects.get(pk=amenity_pk)
-                            updated_room.amenities.add(amenity)
+                        updated_room.amenities.set(
+                            [reference.amenities.get(pk) for pk in amenities_list],
+                            clear=True,
+                        )
             except Amenity.DoesNotExist:
                 raise ParseError("Amenity not found")
             except Exception as e:
@@ -214,20 +228,8 @@ class RoomReviews(APIView):
             raise NotFound
 
     def get(self, request, pk):
-        try:
-            page = request.query_params.get("page", 1)
-            page = int(page)
-        except ValueError:
-            page = 1
-        start = (page - 1) * settings.PAGE_SIZE
-        end = start + settings.PAGE_SIZE
         room = self.get_object(pk)
-        reviews = room.reviews.all()[start:end]
-        serializer = ReviewSerializer(
-            reviews,
-            many=True,
-        )
-        return Response(serializer.data)
+        return review_feed(request, room.reviews.all())
 
     def post(self, request, pk):
         room = self.get_object(pk)
@@ -240,6 +242,16 @@ class RoomReviews(APIView):
             return Response(ReviewSerializer.errors)
 
 
+class RoomReviewSummary(APIView):
+    def get(self, request, pk):
+        try:
+            room = Room.objects.select_related("rating_histogram").get(pk=pk)
+        except Room.DoesNotExist:
+            raise NotFound
+        serializer = RatingHistogramSerializer(RatingHistogram.of(room))
+        return Response(serializer.data)
+
+
 class RoomAmenities(APIView):
     def get_object(self, pk):
         try:
@@ -291,6 +303,7 @@ class RoomBookings(APIView):
     # IsAuthenticatedOrReadOnly -> 로그인 필요, GET만 허용
     # IsAuthenticated -> 로그인 필요
     permission_classes = [IsAuthenticatedOrReadOnly]
+    throttle_scope = "booking"
 
     def get_object(self, pk):
         try:
@@ -335,6 +348,8 @@ class RoomBookings(APIView):
 
 
 class RoomBookingsCheck(APIView):
+    throttle_scope = "booking"
+
     def get_object(self, pk):
         try:
             room = Room.objects.get(pk=pk)
@@ -1,3 +1,157 @@
-from django.test import TestCase
+from datetime import timedelta
+
+from django.conf import settings
+from django.test import override_settings
+from django.utils import timezone
+
+from rest_framework.test import APITestCase
+
+from config.throttles import store
+from .models import User
+from rooms.models import Room
+from experiences.models import Experience
+from bookings.models import Booking
+from reviews.models import Review
 
 # Create your tests here.
+
+
+class TestLogInThrottle(APITestCase):
+    URL = "/api/v1/users/log-in"
+
+    def setUp(self):
+        store.clear()
+
+    def test_log_in_is_throttled(self):
+        # "auth_ip" allows 30 requests per minute
+        for _ in range(30):
+            response = self.client.post(self.URL)
+            self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(self.URL)
+
+        self.assertEqual(response.status_code, 429, "Should be throttled")
+        self.assertIn("Retry-After", response.headers)
+
+    def log_in_as(self, forwarded_for):
+        return [
+            self.client.post(
+                self.URL, HTTP_X_FORWARDED_FOR=forwarded_for.format(i)
+            ).status_code
+            for i in range(31)
+        ]
+
+    def test_spoofed_forwarded_for_shares_the_bucket(self):
+        # no proxy, X-Forwarded-For isn't trusted at all
+        self.assertEqual(self.log_in_as("10.0.0.{}")[-1], 429)
+
+    def test_only_the_proxy_hop_is_trusted(self):
+        rest_framework = {**settings.REST_FRAMEWORK, "NUM_PROXIES": 1}
+
+        # the proxy appends the address the request came from
+        with override_settings(REST_FRAMEWORK=rest_framework):
+            statuses = self.log_in_as("10.0.0.{}, 203.0.113.7")
+
+        self.assertEqual(statuses[-1], 429)
+
+    def test_scopes_are_separate(self):
+        for _ in range(31):
+            self.client.post(self.URL)
+
+        response = self.client.get("/api/v1/rooms/amenities/")
+
+        self.assertEqual(response.status_code, 200)
+
+
+class TestMyBookings(APITestCase):
+    URL = "/api/v1/users/bookings"
+
+    def setUp(self):
+        store.clear()
+        self.user = User.objects.create(username="guest")
+        host = User.objects.create(username="host")
+        now = timezone.now()
+        today = timezone.localdate(now)
+        for i in range(2):
+            room = Room.objects.create(
+                name=f"Room {i}",
+                price=100,
+                rooms=1,
+                toilets=1,
+                description="",
+                address="",
+                kind=Room.RoomKindChoices.PRIVATE_ROOM,
+                owner=host,
+            )
+            Review.objects.create(user=self.user, room=room, payload="", rating=4)
+            experience = Experience.objects.create(
+                name=f"Experience {i}",
+                host=host,
+                price=10,
+                address="",
+                start="10:00",
+                end="12:00",
+                description="",
+            )
+            Booking.objects.create(
+                user=self.user,
+                kind=Booking.BookingKindChoices.ROOMS,
+                room=room,
+                check_in=today + timedelta(days=i + 1),
+                check_out=today + timedelta(days=i + 2),
+                guests=1,
+            )
+            Booking.objects.create(
+                user=self.user,
+                kind=Booking.BookingKindChoices.EXPERIENCES,
+                experience=experience,
+                experience_time=now - timedelta(days=i + 1),
+                guests=1,
+            )
+        self.client.force_authenticate(self.user)
+
+    def test_fixed_number_of_queries(self):
+        # bookings, rooms, experiences
+        with self.assertNumQueries(3):
+            response = self.client.get(self.URL)
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_upcoming_bookings(self):
+        response = self.client.get(self.URL, {"status": "upcoming"})
+        data = response.json()
+
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]["room"]["name"], "Room 0")
+        self.assertEqual(data[0]["room"]["rating"], 4)
+
+    def test_past_bookings(self):
+        response = self.client.get(self.URL, {"status": "past", "kind": "experiences"})
+        data = response.json()
+
+        self.assertEqual(len(data), 2)
+        self.assertEqual(data[0]["experience"]["name"], "Experience 0")
+
+    def test_cancelled_bookings(self):
+        booking = Booking.objects.filter(user=self.user).first()
+
+        response = self.client.post(f"{self.URL}/{booking.pk}/cancel")
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get(self.URL, {"status": "cancelled"})
+        data = response.json()
+        self.assertEqual(len(data), 1)
+        self.assertEqual(data[0]["id"], booking.pk)
+
+    def test_wrong_status(self):
+        response = self.client.get(self.URL, {"status": "soon"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_below_one_is_the_first(self):
+        first = self.client.get(self.URL).json()
+
+        for page in (0, -1):
+            response = self.client.get(self.URL, {"page": page})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json(), first)
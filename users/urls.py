@@ -1,7 +1,5 @@
 from django.urls import path
 
-from rest_framework.authtoken.views import obtain_auth_token
-
 from . import views
 
 urlpatterns = [
@@ -11,7 +9,7 @@ urlpatterns = [
     path("sign-up", views.SignUp.as_view()),
     path("log-in", views.LogIn.as_view()),  # Login with Cookies
     path("log-out", views.LogOut.as_view()),
-    path("token-login", obtain_auth_token),  # Login with Token
+    path("token-login", views.TokenLogIn.as_view()),  # Login with Token
     path("jwt-login", views.JWTLogIn.as_view()),  # Login with JWT
     path("github", views.GithubLogIn.as_view()),
     path("kakao", views.KakaoLogIn.as_view()),
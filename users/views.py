@@ -1,11 +1,15 @@
 from django.contrib.auth import authenticate, login, logout
 from django.conf import settings
+from django.db.models import Avg, DateTimeField, Prefetch, Q
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
 
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 from rest_framework.exceptions import ParseError, NotFound
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.authtoken.views import ObtainAuthToken
 
 import jwt
 import requests
@@ -15,6 +19,8 @@ from .models import User
 
 from bookings.models import Booking
 from bookings.serializers import CheckMyBookingSerializer
+from rooms.models import Room
+from experiences.models import Experience
 
 
 class Me(APIView):
@@ -42,6 +48,8 @@ class Me(APIView):
 
 
 class Users(APIView):
+    throttle_scope = "auth"
+
     def post(self, request):
         password = request.data.get("password")
         if not password:
@@ -70,6 +78,7 @@ class PublicUser(APIView):
 
 class ChangePassword(APIView):
     permission_classes = [IsAuthenticated]
+    throttle_scope = "auth"
 
     def put(self, request):
         user = request.user
@@ -86,6 +95,8 @@ class ChangePassword(APIView):
 
 
 class LogIn(APIView):
+    throttle_scope = "auth"
+
     def post(self, request):
         username = request.data.get("username")
         password = request.data.get("password")
@@ -110,7 +121,15 @@ class LogOut(APIView):
         return Response({"ok": "Goodbye! See you!"})
 
 
+class TokenLogIn(ObtainAuthToken):
+    # ObtainAuthToken turns throttling off, put it back
+    throttle_classes = APIView.throttle_classes
+    throttle_scope = "auth"
+
+
 class JWTLogIn(APIView):
+    throttle_scope = "auth"
+
     def post(self, request):
         username = request.data.get("username")
         password = request.data.get("password")
@@ -133,6 +152,8 @@ class JWTLogIn(APIView):
 
 
 class GithubLogIn(APIView):
+    throttle_scope = "auth"
+
     def post(self, request):
         try:
             code = request.data.get("code")
@@ -181,6 +202,8 @@ class GithubLogIn(APIView):
 
 
 class KakaoLogIn(APIView):
+    throttle_scope = "auth"
+
     def post(self, request):
         try:
             code = request.data.get("code")
@@ -228,6 +251,8 @@ class KakaoLogIn(APIView):
 
 
 class SignUp(APIView):
+    throttle_scope = "auth"
+
     def post(self, request):
         try:
             name = request.data.get("name")
@@ -256,33 +281,93 @@ class SignUp(APIView):
 
 
 class MyBookings(APIView):
+    permission_classes = [IsAuthenticated]
+    throttle_scope = "booking"
+
     def get(self, request):
-        user = request.user
         try:
-            bookings = Booking.objects.filter(user=user)
-            serializer = CheckMyBookingSerializer(bookings, many=True)
-            return Response(serializer.data)
-        except Booking.DoesNotExist:
-            return Response()
+            page = int(request.query_params.get("page", 1))
+        except ValueError:
+            page = 1
+        # 음수 slicing은 지원 안된다
+        page = max(page, 1)
+        start = (page - 1) * settings.PAGE_SIZE
+        end = start + settings.PAGE_SIZE
+
+        bookings = Booking.objects.filter(user=request.user)
+
+        # kind=rooms|experiences, 하나만 보면 (user, check_in) / (user, experience_time) 인덱스를 탄다
+        kind = request.query_params.get("kind")
+        if kind == Booking.BookingKindChoices.ROOMS:
+            bookings = bookings.filter(kind=kind)
+            starts_at = "check_in"
+        elif kind == Booking.BookingKindChoices.EXPERIENCES:
+            bookings = bookings.filter(kind=kind)
+            starts_at = "experience_time"
+        elif kind:
+            raise ParseError("kind should be 'rooms' or 'experiences'")
+        else:
+            bookings = bookings.annotate(
+                starts_at=Coalesce(
+                    "experience_time",
+                    Cast("check_in", DateTimeField()),
+                )
+            )
+            starts_at = "starts_at"
+
+        # status=upcoming|past|cancelled
+        now = timezone.localtime(timezone.now())
+        booking_status = request.query_params.get("status")
+        if booking_status == "upcoming":
+            bookings = bookings.filter(
+                Q(kind=Booking.BookingKindChoices.ROOMS, check_in__gte=now.date())
+                | Q(
+                    kind=Booking.BookingKindChoices.EXPERIENCES,
+                    experience_time__gte=now,
+                ),
+                not_canceled=True,
+            ).order_by(starts_at, "pk")
+        elif booking_status == "past":
+            bookings = bookings.filter(
+                Q(kind=Booking.BookingKindChoices.ROOMS, check_in__lt=now.date())
+                | Q(
+                    kind=Booking.BookingKindChoices.EXPERIENCES, experience_time__lt=now
+                ),
+                not_canceled=True,
+            ).order_by(f"-{starts_at}", "-pk")
+        elif booking_status == "cancelled":
+            bookings = bookings.filter(not_canceled=False).order_by(
+                f"-{starts_at}", "-pk"
+            )
+        elif booking_status:
+            raise ParseError("status should be 'upcoming', 'past' or 'cancelled'")
+        else:
+            bookings = bookings.order_by(f"-{starts_at}", "-pk")
+
+        # booking 1번 + room 1번 + experience 1번, rating은 같은 쿼리에서 계산
+        bookings = bookings.select_related("user").prefetch_related(
+            Prefetch(
+                "room",
+                queryset=Room.objects.annotate(avg_rating=Avg("reviews__rating")),
+            ),
+            Prefetch(
+                "experience",
+                queryset=Experience.objects.annotate(avg_rating=Avg("reviews__rating")),
+            ),
+        )[start:end]
+        serializer = CheckMyBookingSerializer(bookings, many=True)
+        return Response(serializer.data)
 
 
 class CancelMyBooking(APIView):
-    def get_object(self, pk):
-        try:
-            return Booking.objects.get(pk=pk)
-        except Booking.DoesNotExist:
-            raise NotFound
+    permission_classes = [IsAuthenticated]
+    throttle_scope = "booking"
 
     def post(self, request, pk):
-        booking = self.get_object(pk)
-        data = {"not_canceled": False}
-        serializer = CheckMyBookingSerializer(booking, data=request.data, partial=True)
-        if serializer.is_valid():
-            canceled_booking = serializer.save()
-            serializer = CheckMyBookingSerializer(canceled_booking)
-            return Response(status=status.HTTP_200_OK)
-        else:
-            return Response(
-                serializer.errors,
-                status=status.HTTP_400_BAD_REQUEST,
-            )
+        canceled = Booking.objects.filter(
+            pk=pk,
+            user=request.user,
+        ).update(not_canceled=False)
+        if not canceled:
+            raise NotFound
+        return Response(status=status.HTTP_200_OK)
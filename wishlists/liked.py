@@ -0,0 +1,82 @@
+"""
+Per-user set of liked room and experience pks, for the is_liked fields.
+
+Kept in this process and in the shared cache under a version number.
+Changing a user's wishlists bumps the version (see invalidate), which makes
+both copies stale for every worker at once.
+"""
+
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from common import versions
+from .models import Wishlist
+
+Liked = namedtuple("Liked", ("rooms", "experiences"))
+
+EMPTY = Liked(frozenset(), frozenset())
+
+LOCAL_MAX_USERS = 10000
+
+TIMEOUT = 60 * 60 * 24
+
+local = OrderedDict()
+lock = threading.Lock()
+
+
+def version_key(user_pk):
+    return f"wishlists:liked:{user_pk}"
+
+
+def load(user_pk):
+    rooms = Wishlist.rooms.through.objects.filter(wishlist__user_id=user_pk)
+    experiences = Wishlist.experiences.through.objects.filter(wishlist__user_id=user_pk)
+    return Liked(
+        frozenset(rooms.values_list("room_id", flat=True)),
+        frozenset(experiences.values_list("experience_id", flat=True)),
+    )
+
+
+def get_liked(user_pk):
+    version = versions.get_version(version_key(user_pk))
+    with lock:
+        entry = local.get(user_pk)
+        if entry and entry[0] == version:
+            local.move_to_end(user_pk)
+            return entry[1]
+    data_key = f"{version_key(user_pk)}:{version}"
+    liked = cache.get(data_key)
+    if liked is None:
+        liked = load(user_pk)
+        cache.set(data_key, liked, TIMEOUT)
+    with lock:
+        local[user_pk] = (version, liked)
+        local.move_to_end(user_pk)
+        if len(local) > LOCAL_MAX_USERS:
+            local.popitem(last=False)
+    return liked
+
+
+def invalidate(user_pk):
+    versions.bump(version_key(user_pk))
+    with lock:
+        local.pop(user_pk, None)
+
+
+def invalidate_on_commit(user_pks):
+    for user_pk in set(user_pks):
+        transaction.on_commit(lambda user_pk=user_pk: invalidate(user_pk))
+
+
+def liked_for(context):
+    """The requesting user's liked set, looked up once per serializer tree"""
+    if "liked" not in context:
+        request = context.get("request")
+        if request and request.user.is_authenticated:
+            context["liked"] = get_liked(request.user.pk)
+        else:
+            context["liked"] = EMPTY
+    return context["liked"]
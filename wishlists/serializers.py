@@ -1,4 +1,5 @@
 from rest_framework.serializers import ModelSerializer
+from rest_framework import serializers
 
 from rooms.serializers import RoomListSerializer
 from .models import Wishlist
@@ -17,3 +18,19 @@ class WishlistSerializer(ModelSerializer):
             "name",
             "rooms",
         )
+
+
+class WishlistSummarySerializer(ModelSerializer):
+    room_count = serializers.IntegerField(read_only=True)
+    experience_count = serializers.IntegerField(read_only=True)
+    cover_photo = serializers.URLField(read_only=True)
+
+    class Meta:
+        model = Wishlist
+        fields = (
+            "pk",
+            "name",
+            "room_count",
+            "experience_count",
+            "cover_photo",
+        )
@@ -0,0 +1,26 @@
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
+
+from .models import Wishlist
+from .liked import invalidate_on_commit
+
+
+@receiver(m2m_changed, sender=Wishlist.rooms.through)
+@receiver(m2m_changed, sender=Wishlist.experiences.through)
+def wishlist_items_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidate_on_commit([instance.user_id])
+    elif action in ("post_add", "post_remove"):
+        # room.wishlists.add(...) -> pk_set are wishlists
+        invalidate_on_commit(
+            Wishlist.objects.filter(pk__in=pk_set).values_list("user_id", flat=True)
+        )
+    elif action == "pre_clear":
+        # after the clear there is no way to know which wishlists it touched
+        invalidate_on_commit(instance.wishlists.values_list("user_id", flat=True))
+
+
+@receiver(post_delete, sender=Wishlist)
+def wishlist_deleted(sender, instance, **kwargs):
+    invalidate_on_commit([instance.user_id])
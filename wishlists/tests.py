@@ -1,3 +1,220 @@
-from django.test import TestCase
+from django.core.cache import cache
+
+from rest_framework.test import APITestCase
+
+from config.throttles import store
+from .models import Wishlist
+from users.models import User
+from rooms.models import Room
+from experiences.models import Experience
+from medias.models import Photo, update_cover
+from reviews.models import Review
 
 # Create your tests here.
+
+
+class WishlistTestCase(APITestCase):
+    def setUp(self):
+        store.clear()
+        cache.clear()
+        self.user = User.objects.create(username="guest")
+        self.host = User.objects.create(username="host")
+        self.wishlist = Wishlist.objects.create(name="Trip", user=self.user)
+        self.rooms = []
+        for i in range(5):
+            room = Room.objects.create(
+                name=f"Room {i}",
+                price=100,
+                rooms=1,
+                toilets=1,
+                description="",
+                address="",
+                kind=Room.RoomKindChoices.PRIVATE_ROOM,
+                owner=self.host,
+            )
+            Photo.objects.create(room=room, file=f"http://photo.com/{i}")
+            Review.objects.create(user=self.user, room=room, payload="", rating=5)
+            self.rooms.append(room)
+        self.experience = Experience.objects.create(
+            name="Experience",
+            host=self.host,
+            price=10,
+            address="",
+            start="10:00",
+            end="12:00",
+            description="",
+        )
+        self.wishlist.rooms.add(*self.rooms)
+        self.wishlist.experiences.add(self.experience)
+        self.client.force_authenticate(self.user)
+
+
+class TestWishlists(WishlistTestCase):
+    URL = "/api/v1/wishlists/"
+
+    def test_summary_is_one_query(self):
+        Wishlist.objects.create(name="Empty", user=self.user)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.URL, {"summary": 1})
+
+        data = response.json()
+        self.assertEqual(data[0]["room_count"], 5)
+        self.assertEqual(data[0]["experience_count"], 1)
+        self.assertEqual(data[0]["cover_photo"], "http://photo.com/0")
+        self.assertEqual(data[1]["room_count"], 0)
+        self.assertIsNone(data[1]["cover_photo"])
+
+    def test_summary_cover_is_the_first_room_cover(self):
+        # moved first in the gallery, the room's cover now
+        Photo.objects.create(
+            room=self.rooms[0], file="http://photo.com/new", position=0
+        )
+        Photo.objects.filter(file="http://photo.com/0").update(position=1)
+        update_cover("room", self.rooms[0].pk)
+
+        summary = self.client.get(self.URL, {"summary": 1}).json()
+        rooms = self.client.get(self.URL).json()[0]["rooms"]
+
+        self.assertEqual(summary[0]["cover_photo"], "http://photo.com/new")
+        self.assertEqual(summary[0]["cover_photo"], rooms[0]["cover_photo"]["file"])
+
+    def test_full_list_queries(self):
+        # wishlists, rooms with cover photos, liked rooms, liked experiences
+        with self.assertNumQueries(4):
+            response = self.client.get(self.URL)
+
+        rooms = response.json()[0]["rooms"]
+        self.assertEqual(len(rooms), 5)
+        self.assertTrue(rooms[0]["is_liked"])
+        self.assertEqual(rooms[0]["rating"], 5)
+        self.assertEqual(rooms[0]["cover_photo"]["file"], "http://photo.com/0")
+
+
+class TestWishlistDetail(WishlistTestCase):
+    def test_paginated_rooms(self):
+        url = f"/api/v1/wishlists/{self.wishlist.pk}"
+
+        # wishlist, rooms with cover photos, liked rooms, liked experiences
+        with self.assertNumQueries(4):
+            data = self.client.get(url, {"page_size": 3}).json()
+
+        self.assertEqual(len(data["rooms"]), 3)
+        self.assertTrue(data["rooms"][0]["is_liked"])
+
+        data = self.client.get(url, {"page_size": 3, "cursor": data["next"]}).json()
+
+        self.assertEqual(
+            [room["name"] for room in data["rooms"]],
+            ["Room 3", "Room 4"],
+        )
+        self.assertIsNone(data["next"])
+
+
+class TestWishlistItems(WishlistTestCase):
+    def setUp(self):
+        super().setUp()
+        self.URL = f"/api/v1/wishlists/{self.wishlist.pk}/items"
+        self.other = Wishlist.objects.create(name="Other", user=self.user)
+
+    def test_bulk_add_and_remove(self):
+        url = f"/api/v1/wishlists/{self.other.pk}/items"
+        data = {
+            "add": {
+                "rooms": [room.pk for room in self.rooms],
+                "experiences": [self.experience.pk],
+            },
+        }
+
+        # wishlist, rooms, experiences, savepoint, one INSERT per kind, release
+        with self.assertNumQueries(7):
+            response = self.client.put(url, data, format="json")
+        self.assertEqual(response.status_code, 200)
+        # same request twice is fine
+        self.client.put(url, data, format="json")
+        self.assertEqual(self.other.rooms.count(), 5)
+        self.assertEqual(self.other.experiences.count(), 1)
+
+        response = self.client.put(
+            url,
+            {
+                "add": {"rooms": [self.rooms[0].pk]},
+                "remove": {
+                    "rooms": [room.pk for room in self.rooms[1:]],
+                    "experiences": [self.experience.pk],
+                },
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(self.other.rooms.all()), [self.rooms[0]])
+        self.assertEqual(self.other.experiences.count(), 0)
+
+    def test_unknown_items(self):
+        response = self.client.put(
+            self.URL,
+            {"add": {"rooms": [self.rooms[0].pk, 999]}},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_add_and_remove_same_item(self):
+        pk = self.rooms[0].pk
+        response = self.client.put(
+            self.URL,
+            {"add": {"rooms": [pk]}, "remove": {"rooms": [pk]}},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_only_own_wishlist(self):
+        wishlist = Wishlist.objects.create(name="Host's", user=self.host)
+
+        response = self.client.put(
+            f"/api/v1/wishlists/{wishlist.pk}/items",
+            {"add": {"rooms": [self.rooms[0].pk]}},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_toggle(self):
+        url = f"/api/v1/wishlists/{self.wishlist.pk}/experiences/{self.experience.pk}"
+
+        self.client.put(url)
+        self.assertEqual(self.wishlist.experiences.count(), 0)
+        self.client.put(url)
+        self.assertEqual(self.wishlist.experiences.count(), 1)
+
+
+class TestLikedCache(WishlistTestCase):
+    def test_liked_set_is_cached_and_invalidated(self):
+        room = self.rooms[0]
+        url = f"/api/v1/rooms/{room.pk}/"
+        self.assertTrue(self.client.get(url).json()["is_liked"])
+
+        # room, amenities, photos
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f"/api/v1/wishlists/{self.wishlist.pk}/rooms/{room.pk}")
+        self.assertFalse(self.client.get(url).json()["is_liked"])
+
+    def test_m2m_changes_invalidate(self):
+        url = f"/api/v1/experiences/{self.experience.pk}/"
+        self.assertTrue(self.client.get(url).json()["is_liked"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.experience.wishlists.clear()
+
+        self.assertFalse(self.client.get(url).json()["is_liked"])
+
+    def test_anonymous(self):
+        self.client.force_authenticate(None)
+
+        response = self.client.get("/api/v1/rooms/")
+
+        self.assertFalse(response.json()[0]["is_liked"])
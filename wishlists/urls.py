@@ -1,9 +1,20 @@
 from django.urls import path
 
-from .views import Wishlists, WishlistDetail, WishlistRoomToggle
+from .views import (
+    Wishlists,
+    WishlistDetail,
+    WishlistItems,
+    WishlistRoomToggle,
+    WishlistExperienceToggle,
+)
 
 urlpatterns = [
     path("", Wishlists.as_view()),
     path("<int:pk>", WishlistDetail.as_view()),
+    path("<int:pk>/items", WishlistItems.as_view()),
     path("<int:pk>/rooms/<int:room_pk>", WishlistRoomToggle.as_view()),
+    path(
+        "<int:pk>/experiences/<int:experience_pk>",
+        WishlistExperienceToggle.as_view(),
+    ),
 ]
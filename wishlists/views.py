@@ -1,21 +1,69 @@
+from django.db import transaction
+from django.db.models import Avg, Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.status import HTTP_200_OK
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.exceptions import NotFound
+from rest_framework.exceptions import NotFound, ParseError
 
 from .models import Wishlist
 from rooms.models import Room
-from .serializers import WishlistSerializer
+from experiences.models import Experience
+from .liked import invalidate_on_commit
+from .serializers import WishlistSerializer, WishlistSummarySerializer
+from rooms.serializers import RoomListSerializer
+from common.paginations import KeysetPagination
 
 # Create your views here.
 
 
+def count_of(through):
+    """Correlated COUNT(*) of a wishlist's rows in an m2m table"""
+    return Coalesce(
+        Subquery(
+            through.objects.filter(wishlist_id=OuterRef("pk"))
+            .values("wishlist_id")
+            .annotate(count=Count("*"))
+            .values("count"),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
 class Wishlists(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
         all_wishlists = Wishlist.objects.filter(user=request.user)
+        # ?summary=1 -> counts and a cover photo, in one query
+        if request.query_params.get("summary"):
+            # the cover of the first room, the one the full list shows first
+            cover_photo = (
+                Room.objects.filter(
+                    wishlists=OuterRef("pk"),
+                    cover_photo__isnull=False,
+                )
+                .order_by("pk")
+                .values("cover_photo__file")[:1]
+            )
+            all_wishlists = all_wishlists.annotate(
+                room_count=count_of(Wishlist.rooms.through),
+                experience_count=count_of(Wishlist.experiences.through),
+                cover_photo=Subquery(cover_photo),
+            )
+            serializer = WishlistSummarySerializer(all_wishlists, many=True)
+            return Response(serializer.data)
+        all_wishlists = all_wishlists.prefetch_related(
+            Prefetch(
+                "rooms",
+                queryset=Room.objects.annotate(
+                    avg_rating=Avg("reviews__rating"),
+                ).select_related("cover_photo"),
+            )
+        )
         serializer = WishlistSerializer(
             all_wishlists,
             many=True,
@@ -45,8 +93,27 @@ class WishlistDetail(APIView):
 
     def get(self, request, pk):
         wishlist = self.get_object(pk, request.user)
-        serializer = WishlistSerializer(wishlist, context={"request": request})
-        return Response(serializer.data)
+        # ?cursor=&page_size= for the rooms
+        paginator = KeysetPagination(ordering=("pk",))
+        rooms = paginator.paginate_queryset(
+            wishlist.rooms.annotate(
+                avg_rating=Avg("reviews__rating"),
+            ).select_related("cover_photo"),
+            request,
+        )
+        serializer = RoomListSerializer(
+            rooms,
+            many=True,
+            context={"request": request},
+        )
+        return Response(
+            {
+                "pk": wishlist.pk,
+                "name": wishlist.name,
+                "rooms": serializer.data,
+                "next": paginator.next_cursor,
+            }
+        )
 
     def delete(self, request, pk):
         wishlist = self.get_object(pk, request.user)
@@ -64,29 +131,98 @@ class WishlistDetail(APIView):
             return Response(serializer.errors)
 
 
-class WishlistRoomToggle(APIView):
-    permission_classes = [IsAuthenticated]
+# "rooms" / "experiences" -> (m2m table, its column, model)
+WISHLIST_ITEMS = {
+    "rooms": (Wishlist.rooms.through, "room_id", Room),
+    "experiences": (Wishlist.experiences.through, "experience_id", Experience),
+}
 
-    def get_wishlist(self, pk, user):
-        try:
-            wishlist = Wishlist.objects.get(pk=pk, user=user)
-            return wishlist
-        except Wishlist.DoesNotExist:
-            raise NotFound
 
-    def get_room(self, pk):
-        try:
-            room = Room.objects.get(pk=pk)
-            return room
-        except Room.DoesNotExist:
+def check_wishlist(pk, user):
+    if not Wishlist.objects.filter(pk=pk, user=user).exists():
+        raise NotFound
+
+
+def toggle_item(pk, kind, item_pk):
+    through, column, model = WISHLIST_ITEMS[kind]
+    # 지워진 게 없으면 없던 것이니 추가한다
+    deleted, _ = through.objects.filter(wishlist_id=pk, **{column: item_pk}).delete()
+    if not deleted:
+        if not model.objects.filter(pk=item_pk).exists():
             raise NotFound
+        through.objects.bulk_create(
+            [through(wishlist_id=pk, **{column: item_pk})],
+            ignore_conflicts=True,
+        )
+
+
+class WishlistRoomToggle(APIView):
+    permission_classes = [IsAuthenticated]
 
     def put(self, request, pk, room_pk):
-        wishlist = self.get_wishlist(pk, request.user)
-        room = self.get_room(room_pk)
+        check_wishlist(pk, request.user)
+        toggle_item(pk, "rooms", room_pk)
+        invalidate_on_commit([request.user.pk])
+        return Response(status=HTTP_200_OK)
 
-        if wishlist.rooms.filter(pk=room.pk).exists():
-            wishlist.rooms.remove(room)
-        else:
-            wishlist.rooms.add(room)
+
+class WishlistExperienceToggle(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def put(self, request, pk, experience_pk):
+        check_wishlist(pk, request.user)
+        toggle_item(pk, "experiences", experience_pk)
+        invalidate_on_commit([request.user.pk])
+        return Response(status=HTTP_200_OK)
+
+
+class WishlistItems(APIView):
+    """
+    Add and remove many rooms and experiences at once.
+    {"add": {"rooms": [1, 2]}, "remove": {"rooms": [3], "experiences": [4]}}
+    Adding what is already there or removing what is not is a no-op,
+    so sending the same request twice is safe.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get_pks(self, request, action, kind):
+        changes = request.data.get(action) or {}
+        if not isinstance(changes, dict):
+            raise ParseError(f"'{action}' should be an object")
+        pks = changes.get(kind) or []
+        if not isinstance(pks, list):
+            raise ParseError(f"'{action}.{kind}' should be a list")
+        try:
+            return {int(pk) for pk in pks}
+        except (TypeError, ValueError):
+            raise ParseError(f"'{action}.{kind}' should be a list of pks")
+
+    def put(self, request, pk):
+        check_wishlist(pk, request.user)
+        changes = {}
+        for kind, (through, column, model) in WISHLIST_ITEMS.items():
+            add = self.get_pks(request, "add", kind)
+            remove = self.get_pks(request, "remove", kind)
+            if add & remove:
+                raise ParseError(f"Can't add and remove the same {kind}")
+            if add and model.objects.filter(pk__in=add).count() != len(add):
+                raise NotFound(f"Some {kind} don't exist")
+            changes[kind] = (add, remove)
+        with transaction.atomic():
+            for kind, (add, remove) in changes.items():
+                through, column, model = WISHLIST_ITEMS[kind]
+                if remove:
+                    through.objects.filter(
+                        wishlist_id=pk,
+                        **{f"{column}__in": remove},
+                    ).delete()
+                if add:
+                    # the (wishlist, item) unique constraint makes double taps no-ops
+                    through.objects.bulk_create(
+                        [through(wishlist_id=pk, **{column: item}) for item in add],
+                        ignore_conflicts=True,
+                    )
+            # bulk_create and queryset delete don't send m2m_changed
+            invalidate_on_commit([request.user.pk])
         return Response(status=HTTP_200_OK)